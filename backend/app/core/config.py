@@ -42,19 +42,68 @@ class Settings(BaseSettings):
  
  # Container Runtime
  CONTAINER_RUNTIME: str = "podman" # or "docker"
+ RUNTIME_PROBE_TTL_SECONDS: int = 600 # Reuse a successful runtime capability probe this long
  
  # Paths
  ENVIRONMENTS_DIR: str = "../environments" # Go up one level from backend/
  PLAYBOOK_PATH: str = "../build_environments.yml" # Go up one level from backend/
+ ANSIBLE_CFG_TEMPLATE: str = "../templates/ansible.cfg.j2"
+ BUILD_CONTEXT_DIR: str = "~/.cache/ee-de-builder/contexts" # Per-environment contexts live in <dir>/ee-build-<env>, apart from the playbook's root-owned /tmp/ee-build-<env>
  
  # Build Configuration
  BUILD_CLEANUP_HOURS: int = 1 # Hours to keep completed builds
  MAX_CONCURRENT_BUILDS: int = 3
- BUILD_TIMEOUT_MINUTES: int = 30
+ MAX_CONCURRENT_ENVIRONMENT_SLOTS: int = 9 # Shared build slots, each build holds one per environment it builds
+ MAX_QUEUED_BUILDS: int = 50
+ BUILD_TIMEOUT_MINUTES: int = 30 # Wall-clock limit per running build, 0 disables
+ BUILD_IDLE_TIMEOUT_MINUTES: int = 15 # Limit without any new log output, 0 disables
+ BUILD_WATCHDOG_INTERVAL_SECONDS: int = 10
+ BUILD_KILL_GRACE_SECONDS: int = 10 # Time between SIGTERM and SIGKILL of a build's process groups
+ BUILD_LOG_BUFFER_LINES: int = 20000 # In-memory log lines kept per build and per environment job
+ RESOURCE_SAMPLE_SECONDS: float = 2.0 # Interval between CPU/memory/IO samples of running build process trees
+ 
+ # Build Executor
+ BUILD_EXECUTOR: str = "auto" # "playbook" (build_environments.yml), "parallel" (ansible-builder per environment) or "auto" (parallel once the host is bootstrapped)
+ HOST_READINESS_TTL_SECONDS: int = 300 # How long an "auto" executor host check is reused
+ HOST_BOOTSTRAP_STAMP: str = "~/.cache/ee-de-builder/host-bootstrap.stamp" # Host fingerprint written after the playbook bootstrap
+ MAX_PARALLEL_ENVIRONMENT_BUILDS: int = 4 # Worker pool size for the parallel executor
+ BUILD_STAGING_AHEAD: int = 2 # Environments staged and base-image pulled ahead of a free build slot
+ BUILD_MEMORY_BUDGET_GB: float = 0.0 # Peak memory concurrent environment jobs may add up to, 0 uses MemAvailable at build start
+ ANSIBLE_BUILDER_PATH: str = "ansible-builder"
+ ANSIBLE_BUILDER_VERBOSITY: int = 3
+ 
+ # Build Cache
+ BUILD_CACHE_ENABLED: bool = True # Reuse images whose build inputs are unchanged
+ BUILD_CACHE_INDEX: str = "~/.cache/ee-de-builder/build-cache.json"
+ IMAGE_CACHE_BUDGET_GB: float = 50.0 # Disk budget for labelled build images and layers, evicted LRU, 0 disables
+ 
+ # Wheelhouse (shared pip wheels mounted into podman builder stages)
+ WHEELHOUSE_ENABLED: bool = True
+ WHEELHOUSE_DIR: str = "~/.cache/ee-de-builder/wheelhouse"
+ WHEELHOUSE_OFFLINE: bool = False # Builder stages install only from the wheelhouse (pip --no-index)
+ WHEELHOUSE_PYTHON: str = "python3.11" # Interpreter matching the EE base images, used to pre-populate
+ 
+ # Collection cache (shared collection tarballs mounted into podman galaxy stages)
+ COLLECTION_CACHE_ENABLED: bool = True
+ COLLECTION_CACHE_DIR: str = "~/.cache/ee-de-builder/collections"
+ 
+ # Build History
+ BUILD_HISTORY_DB: str = "~/.cache/ee-de-builder/build-history.db" # SQLite (WAL) store of finished builds
+ BUILD_HISTORY_RETENTION_DAYS: int = 90
  
  # Red Hat Registry
  RH_REGISTRY_URL: str = "registry.redhat.io"
  
+ # Base Image Pre-pull (keeps base images warm so builds skip the pull)
+ BASE_IMAGE_PREPULL_ENABLED: bool = True
+ BASE_IMAGE_PREPULL_INTERVAL_MINUTES: int = 360 # Re-pull to pick up moved :latest tags
+ BASE_IMAGE_PREPULL_CONCURRENCY: int = 2
+ BASE_IMAGE_PREPULL_MIRROR: str = "" # Pull from this registry instead and tag under the original name, e.g. "localhost:5000"
+ BASE_IMAGE_PREPULL_TLS_VERIFY: bool = True # podman only
+ BASE_IMAGE_DIGEST_INDEX: str = "~/.cache/ee-de-builder/base-image-digests.json" # Tag-to-digest cache (skopeo)
+ BASE_IMAGE_DIGEST_TTL_MINUTES: int = 60 # Builds reuse a resolved digest this long before asking the registry again
+ BASE_IMAGE_DIGEST_TIMEOUT_SECONDS: int = 30
+ 
  # Available Base Images
  AVAILABLE_BASE_IMAGES: ClassVar[Dict[str, Dict[str, Any]]] = {
  "ee-minimal-rhel9": {
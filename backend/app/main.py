@@ -13,12 +13,17 @@ COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
 
 # backend/app/main.py - Clean FastAPI Application Entry Point
 
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.routers import auth, builds, environments, dashboard, custom_ee
+from app.services.metrics_service import metrics_service, METRICS_CONTENT_TYPE
+from app.services.runtime_service import runtime_service
+from app.services.image_prepull_service import image_prepull_service
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -27,10 +32,13 @@ async def lifespan(app: FastAPI):
  print(f"Quick Start Starting {settings.APP_NAME} v{settings.VERSION}")
  print(f"Installation Environment: {settings.ENVIRONMENT}")
  print(f" Container Runtime: {settings.CONTAINER_RUNTIME}")
+ await runtime_service.get_capabilities()
+ image_prepull_service.start()
  
  yield
  
  # Shutdown
+ await image_prepull_service.stop()
  print(" Shutting down EE-DE Builder...")
 
 # Create FastAPI application
@@ -50,6 +58,20 @@ app.add_middleware(
  allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+ """Observe per-route HTTP latency (streaming responses up to their first byte)"""
+ start = time.perf_counter()
+ response = await call_next(request)
+ route = request.scope.get("route")
+ metrics_service.http_request_duration.observe(
+ time.perf_counter() - start,
+ method=request.method,
+ route=route.path if route else "unmatched",
+ status=str(response.status_code)
+ )
+ return response
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(builds.router, prefix="/api/builds", tags=["builds"])
@@ -71,6 +93,11 @@ async def health_check():
  """Health check endpoint"""
  return {"status": "healthy", "service": settings.APP_NAME}
 
+@app.get("/metrics")
+async def metrics():
+ """Prometheus metrics endpoint"""
+ return Response(content=metrics_service.render(), media_type=METRICS_CONTENT_TYPE)
+
 if __name__ == "__main__":
  import uvicorn
  uvicorn.run(
@@ -14,32 +14,97 @@ COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
 # backend/app/models/build_models.py - Build-related models
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 
 class BuildRequest(BaseModel):
  environments: List[str]
  container_runtime: Optional[str] = "podman"
+ executor: Optional[str] = None # "auto", "playbook" or "parallel", defaults to settings.BUILD_EXECUTOR
+ force: Optional[bool] = False # Rebuild even when the build cache has an up-to-date image
+ priority: int = 0 # Higher priority builds leave the queue first
+
+
+class ResourceUsage(BaseModel):
+ cpu_seconds: float = 0.0 # User + system CPU time of the whole process tree
+ rss_bytes: int = 0 # Resident memory at the latest sample
+ peak_rss_bytes: int = 0 # Highest sampled resident memory
+ read_bytes: int = 0
+ write_bytes: int = 0
+ process_count: int = 0
+ peak_process_count: int = 0
+ samples: int = 0
+
+
+class BuildPhase(BaseModel):
+ phase: str # "prepare", "pull", "wait", "base", "galaxy", "builder", "bindep", "final", "cleanup"
+ start_time: datetime
+ end_time: Optional[datetime] = None
+ duration_seconds: Optional[float] = None
+
+
+class EnvironmentBuildStatus(BaseModel):
+ environment: str
+ status: str # "pending", "running", "completed", "failed", "cancelled", "timed_out", "cached"
+ image_tag: Optional[str] = None
+ fingerprint: Optional[str] = None
+ cache_hit: bool = False
+ layer_group: Optional[str] = None # Intermediate layers shared with other environments of the build
+ waits_for: Optional[str] = None # Environment that builds those shared layers first
+ predicted_duration_seconds: Optional[float] = None # From build history, orders the jobs longest first
+ estimated_completion_time: Optional[datetime] = None
+ start_time: Optional[datetime] = None
+ end_time: Optional[datetime] = None
+ return_code: Optional[int] = None
+ log_lines: int = 0
+ image_size_bytes: Optional[int] = None
+ resources: Optional[ResourceUsage] = None
 
 
 class BuildResponse(BaseModel):
  build_id: str
- status: str
+ status: str # "started", "queued", "cached" or "attached" (joined an identical in-flight build)
  environments: List[str]
  message: str
+ cached_environments: List[str] = []
+ image_tags: Dict[str, str] = {}
 
 
 class BuildStatus(BaseModel):
  build_id: str
- status: str # "running", "completed", "failed", "cancelled"
+ status: str # "queued", "running", "completed", "failed", "cancelled", "timed_out"
  environments: List[str]
  start_time: datetime
  end_time: Optional[datetime] = None
  return_code: Optional[int] = None
+ timeout_reason: Optional[str] = None
+ priority: int = 0
+ requesters: int = 1 # Requests coalesced into this build
+ queued_time: Optional[datetime] = None
+ queue_position: Optional[int] = None
+ estimated_start_time: Optional[datetime] = None
+ estimated_completion_time: Optional[datetime] = None
  logs: List[str] = []
+ log_cursor: int = 0 # Pass as `since` to fetch only newer lines
+ first_log_line: int = 0 # Oldest line still held, earlier lines were evicted
+ total_log_lines: int = 0
  successful_builds: List[str] = []
  failed_builds: List[str] = []
+ cached_builds: List[str] = []
+ executor: str = "playbook"
+ resources: Optional[ResourceUsage] = None
+ phases: Dict[str, List[BuildPhase]] = {} # Phase timeline per environment
+ environment_status: Dict[str, EnvironmentBuildStatus] = {}
+
+
+class EnvironmentBuildLogs(BaseModel):
+ build_id: str
+ environment: str
+ status: str
+ logs: List[str] = []
+ log_cursor: int = 0
+ first_log_line: int = 0
 
 
 class BuildListItem(BaseModel):
@@ -53,3 +118,60 @@ class BuildListItem(BaseModel):
 
 class BuildList(BaseModel):
  builds: List[BuildListItem]
+
+
+class BaseImagePullStatus(BaseModel):
+ image: str
+ sources: List[str] = [] # "base-images/<key>" for settings.AVAILABLE_BASE_IMAGES, else environment names
+ state: str = "queued" # "queued", "pulling", "pulled", "failed"
+ storage: str = "rootless" # "rootless", or "root" when builds run through the playbook's become tasks
+ started_at: Optional[datetime] = None
+ finished_at: Optional[datetime] = None
+ duration_seconds: Optional[float] = None
+ error: Optional[str] = None
+
+
+class BaseImageDigest(BaseModel):
+ image: str
+ digest: Optional[str] = None # Registry digest the tag resolved to, None when unresolvable
+ resolved_at: Optional[datetime] = None
+ previous_digest: Optional[str] = None
+ changed_at: Optional[datetime] = None # When the tag last moved
+ local_digest: Optional[str] = None # Digest of the locally pulled image
+ local_stale: bool = False # Local image is older than the registry's
+ environments: List[str] = []
+ rebuild_needed: List[str] = [] # Environments whose cached image was built from another digest
+
+
+class EnvironmentHistoryEntry(BaseModel):
+ build_id: str
+ environment: str
+ status: str
+ image_tag: Optional[str] = None
+ fingerprint: Optional[str] = None
+ start_time: Optional[datetime] = None
+ end_time: Optional[datetime] = None
+ duration_seconds: Optional[float] = None
+ return_code: Optional[int] = None
+ resources: Optional[ResourceUsage] = None
+ phase_durations: Dict[str, float] = {} # Seconds spent in each phase
+
+
+class PhaseStatistics(BaseModel):
+ phase: str
+ samples: int
+ p50_seconds: float
+ p90_seconds: float
+ p95_seconds: float
+ max_seconds: float
+
+
+class EnvironmentHistory(BaseModel):
+ environment: str
+ total_builds: int
+ successful_builds: int
+ average_duration_seconds: Optional[float] = None
+ average_cpu_seconds: Optional[float] = None
+ max_peak_rss_bytes: Optional[int] = None
+ phase_statistics: List[PhaseStatistics] = [] # Over the successful builds listed
+ builds: List[EnvironmentHistoryEntry] = []
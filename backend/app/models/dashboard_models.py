@@ -13,7 +13,8 @@ COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
 
 # backend/app/models/dashboard_models.py - Dashboard models
 
-from typing import Any, Dict, List
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -48,6 +49,18 @@ class SuccessRate(BaseModel):
  period_days: int
 
 
+class RuntimeCapabilities(BaseModel):
+ runtime: str
+ available: bool
+ version: Optional[str] = None
+ rootless: Optional[bool] = None
+ storage_driver: Optional[str] = None
+ buildah_available: bool = False
+ skopeo_available: bool = False
+ error: Optional[str] = None
+ probed_at: datetime
+
+
 class DashboardStats(BaseModel):
  ready_to_build: int
  build_issues: Dict[str, Any] # count + details
@@ -55,4 +68,5 @@ class DashboardStats(BaseModel):
  recently_updated: Dict[str, Any] # count + details
  currently_building: Dict[str, Any] # count + details
  success_rate: SuccessRate
+ container_runtime: Optional[RuntimeCapabilities] = None # Cached probe, refreshed by builds and at startup
  last_updated: str
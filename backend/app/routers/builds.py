@@ -13,10 +13,17 @@ COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
 
 # backend/app/routers/builds.py - Build management endpoints
 
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.models.build_models import BuildRequest, BuildResponse, BuildStatus, BuildListItem
-from app.services.build_service import build_service
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.models.build_models import (
+ BuildRequest, BuildResponse, BuildStatus, BuildListItem, EnvironmentBuildLogs, EnvironmentHistory, BaseImagePullStatus,
+ BaseImageDigest
+)
+from app.services.build_service import BuildQueueFullError, build_service
+from app.services.build_history_service import build_history_service
+from app.services.image_prepull_service import image_prepull_service
+from app.services.base_image_digest_service import base_image_digest_service
 
 router = APIRouter()
 
@@ -30,25 +37,89 @@ async def start_build(build_request: BuildRequest):
  raise HTTPException(status_code=400, detail=str(e))
  except FileNotFoundError as e:
  raise HTTPException(status_code=404, detail=str(e))
+ except BuildQueueFullError as e:
+ raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after_seconds)})
  except RuntimeError as e:
  raise HTTPException(status_code=500, detail=str(e))
  except Exception as e:
  raise HTTPException(status_code=500, detail=f"Failed to start build: {str(e)}")
 
 
+
+@router.get("/base-images", response_model=List[BaseImagePullStatus])
+async def get_base_image_pulls():
+ """Get the background pre-pull state of every known base image"""
+ return image_prepull_service.get_status()
+
+
+@router.get("/base-images/digests", response_model=List[BaseImageDigest])
+async def get_base_image_digests(refresh: bool = Query(False)):
+ """Get the digest each base image tag resolves to and which environments need a rebuild"""
+ return await base_image_digest_service.get_report(refresh)
+
+
+@router.post("/base-images/prepull")
+async def prepull_base_images():
+ """Start a base image pre-pull round now"""
+ image_prepull_service.trigger()
+ return {"message": "Base image pre-pull scheduled"}
+
 @router.get("/{build_id}/status", response_model=BuildStatus)
-async def get_build_status(build_id: str):
- """Get build status, logs, and results"""
+async def get_build_status(build_id: str, since: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=0)):
+ """Get build status, results, and log lines from cursor `since` on"""
+ try:
+ return await build_service.get_build_status(build_id, since, limit)
+ except ValueError as e:
+ raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/{build_id}/stream")
+async def stream_build(build_id: str, since: int = Query(0, ge=0), last_event_id: Optional[str] = Header(None)):
+ """Stream log lines from cursor `since` on and status changes as server-sent events"""
+ # EventSource reconnects send the last received offset as Last-Event-ID
+ if last_event_id and last_event_id.isdigit():
+ since = max(since, int(last_event_id))
+ 
  try:
- return await build_service.get_build_status(build_id)
+ events = build_service.open_build_stream(build_id, since)
+ except ValueError as e:
+ raise HTTPException(status_code=404, detail=str(e))
+ 
+ return StreamingResponse(
+ events,
+ media_type="text/event-stream",
+ headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+ )
+
+
+@router.get("/{build_id}/environments/{environment}/logs", response_model=EnvironmentBuildLogs)
+async def get_environment_logs(
+ build_id: str,
+ environment: str,
+ since: int = Query(0, ge=0),
+ limit: Optional[int] = Query(None, ge=0)
+):
+ """Get the log of a single environment job of a parallel build"""
+ try:
+ return build_service.get_environment_logs(build_id, environment, since, limit)
  except ValueError as e:
  raise HTTPException(status_code=404, detail=str(e))
 
 
 @router.get("", response_model=List[BuildListItem])
-async def list_builds():
- """List all builds (running and completed)"""
- return build_service.list_builds()
+async def list_builds(
+ limit: int = Query(100, ge=1, le=1000),
+ status: Optional[str] = None,
+ environment: Optional[str] = None
+):
+ """List running builds and build history, newest first"""
+ return build_service.list_builds(limit, status, environment)
+
+
+@router.get("/environments/{environment}/history", response_model=EnvironmentHistory)
+async def get_environment_history(environment: str, limit: int = Query(50, ge=1, le=1000)):
+ """Get recent build outcomes and durations for one environment"""
+ return build_history_service.environment_history(environment, limit)
 
 
 @router.delete("/{build_id}")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/services/base_image_digest_service.py - Base image tag-to-digest cache
+
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.models.build_models import BaseImageDigest
+from app.services.build_cache_service import build_cache_service
+from app.services.image_prepull_service import image_prepull_service, read_base_image
+from app.services.runtime_service import runtime_service
+
+class BaseImageDigestService:
+ """Resolves floating base image tags to registry digests, cached with a TTL"""
+ 
+ def __init__(self):
+ self.index_path = Path(os.path.expanduser(settings.BASE_IMAGE_DIGEST_INDEX))
+ self._index: Optional[Dict[str, dict]] = None
+ self._locks: Dict[str, asyncio.Lock] = {}
+ 
+ async def resolve(self, image: str, refresh: bool = False) -> Optional[str]:
+ """Digest a tag currently points to, from the cache unless it is older than the TTL"""
+ if "@" in image:
+ return image.split("@", 1)[1] # Already pinned
+ 
+ async with self._locks.setdefault(image, asyncio.Lock()):
+ entry = self._load_index().get(image)
+ if entry and not refresh and self._is_fresh(entry):
+ return entry["digest"]
+ 
+ digest = await self._inspect_remote(image)
+ if digest is None:
+ # Registry unreachable: keep using the last known digest rather than unpinning builds
+ return entry["digest"] if entry else None
+ 
+ now = datetime.now().isoformat()
+ if entry and entry["digest"] != digest:
+ print(f"[WARNING] Base image {image} moved from {entry['digest'][:19]} to {digest[:19]}")
+ entry.update(previous_digest=entry["digest"], changed_at=now)
+ entry = {**(entry or {}), "digest": digest, "resolved_at": now}
+ self._index[image] = entry
+ self._save_index()
+ return digest
+ 
+ async def resolve_environments(self, environments: List[str]) -> Dict[str, str]:
+ """Resolved base image digest of each environment that has one"""
+ images = {
+ env: read_base_image(Path(settings.ENVIRONMENTS_DIR) / env / "execution-environment.yml")
+ for env in environments
+ }
+ unique_images = sorted({image for image in images.values() if image and "{{" not in image})
+ digests = dict(zip(unique_images, await asyncio.gather(*(self.resolve(image) for image in unique_images))))
+ return {env: digests[image] for env, image in images.items() if digests.get(image)}
+ 
+ async def get_report(self, refresh: bool = False) -> List[BaseImageDigest]:
+ """Every known base image with its digest, local staleness and environments due for a rebuild"""
+ built_digests = build_cache_service.base_digests()
+ report = []
+ for image, sources in image_prepull_service.base_images().items():
+ digest = await self.resolve(image, refresh)
+ entry = self._load_index().get(image, {})
+ local_digests = await self._inspect_local(image)
+ environments = [source for source in sources if not source.startswith("base-images/")]
+ report.append(BaseImageDigest(
+ image=image,
+ digest=digest,
+ resolved_at=entry.get("resolved_at"),
+ previous_digest=entry.get("previous_digest"),
+ changed_at=entry.get("changed_at"),
+ local_digest=local_digests[0] if local_digests else None,
+ local_stale=bool(digest and local_digests and digest not in local_digests),
+ environments=environments,
+ rebuild_needed=[
+ env for env in environments
+ if digest and built_digests.get(env) and built_digests[env] != digest
+ ]
+ ))
+ return report
+ 
+ def _is_fresh(self, entry: dict) -> bool:
+ resolved_at = datetime.fromisoformat(entry["resolved_at"])
+ return datetime.now() - resolved_at < timedelta(minutes=settings.BASE_IMAGE_DIGEST_TTL_MINUTES)
+ 
+ async def _inspect_remote(self, image: str) -> Optional[str]:
+ """Registry digest of a tag via skopeo, without pulling"""
+ capabilities = await runtime_service.get_capabilities()
+ if not capabilities.skopeo_available:
+ return None
+ digest = await self._run("skopeo", "inspect", "--format", "{{.Digest}}", f"docker://{image}")
+ return digest if digest and digest.startswith("sha256:") else None
+ 
+ async def _inspect_local(self, image: str) -> List[str]:
+ """Digests the locally stored image is known by (manifest list and per-arch), empty when not pulled"""
+ # .Digest is podman only, docker knows an image by its RepoDigests alone
+ image_format = "{{range .RepoDigests}}{{.}} {{end}}"
+ if settings.CONTAINER_RUNTIME == "podman":
+ image_format = "{{.Digest}} " + image_format
+ output = await self._run(settings.CONTAINER_RUNTIME, "image", "inspect", "--format", image_format, image)
+ digests = [entry.rsplit("@", 1)[-1] for entry in output.split()] if output else []
+ return [digest for digest in digests if digest.startswith("sha256:")]
+ 
+ async def _run(self, *cmd: str) -> Optional[str]:
+ """Output of a command, None on failure or timeout"""
+ try:
+ process = await asyncio.create_subprocess_exec(
+ *cmd,
+ stdout=asyncio.subprocess.PIPE,
+ stderr=asyncio.subprocess.PIPE
+ )
+ stdout, _ = await asyncio.wait_for(process.communicate(), settings.BASE_IMAGE_DIGEST_TIMEOUT_SECONDS)
+ except FileNotFoundError:
+ return None
+ except asyncio.TimeoutError:
+ process.kill()
+ # Reap it, or every timed-out call leaves a zombie and an open transport behind
+ await process.wait()
+ print(f"[WARNING] Timed out: {' '.join(cmd)}")
+ return None
+ 
+ output = stdout.decode('utf-8', errors='replace').strip()
+ return output if process.returncode == 0 else None
+ 
+ def _load_index(self) -> Dict[str, dict]:
+ """Load the digest index from disk once"""
+ if self._index is None:
+ try:
+ with open(self.index_path, 'r') as f:
+ self._index = json.load(f)
+ except FileNotFoundError:
+ self._index = {}
+ except Exception as e:
+ print(f"[WARNING] Ignoring unreadable base image digest index {self.index_path}: {e}")
+ self._index = {}
+ return self._index
+ 
+ def _save_index(self):
+ """Atomically write the digest index"""
+ try:
+ self.index_path.parent.mkdir(parents=True, exist_ok=True)
+ temp_path = self.index_path.with_suffix(".tmp")
+ with open(temp_path, 'w') as f:
+ json.dump(self._index, f, indent=2, sort_keys=True)
+ os.replace(temp_path, self.index_path)
+ except Exception as e:
+ print(f"[WARNING] Could not write base image digest index {self.index_path}: {e}")
+
+# Create global service instance
+base_image_digest_service = BaseImageDigestService()
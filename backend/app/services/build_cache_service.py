@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/services/build_cache_service.py - Content-addressed build cache
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.utils.container_utils import get_image_label
+from app.utils.file_utils import render_ansible_cfg
+from app.utils.build_plan import shared_layer_group
+from app.services.runtime_service import runtime_service
+
+FINGERPRINT_LABEL = "ee-builder.fingerprint"
+ENVIRONMENT_LABEL = "ee-builder.environment" # Marks images and intermediate layers the image cache manages
+FINGERPRINT_VERSION = 1 # Bump to invalidate every cached fingerprint
+
+class BuildCacheService:
+ """Service mapping environment build inputs to previously built images"""
+ 
+ def __init__(self):
+ self.index_path = Path(os.path.expanduser(settings.BUILD_CACHE_INDEX))
+ self._index: Optional[Dict[str, dict]] = None
+ 
+ def fingerprint(self, env: str, container_runtime: str, base_digest: Optional[str] = None) -> str:
+ """Hash the full build input set of an environment, including the resolved base image digest"""
+ env_dir = Path(settings.ENVIRONMENTS_DIR) / env
+ digest = hashlib.sha256(f"v{FINGERPRINT_VERSION}\0{container_runtime}\0".encode())
+ 
+ for file_path in sorted(p for p in env_dir.rglob('*') if p.is_file()):
+ digest.update(file_path.relative_to(env_dir).as_posix().encode() + b"\0")
+ digest.update(hashlib.sha256(file_path.read_bytes()).digest())
+ 
+ # A moved base image tag is a new input even when no file changed
+ if base_digest:
+ digest.update(f"base_image@{base_digest}\0".encode())
+ 
+ # The templated ansible.cfg is part of every build context
+ template_path = Path(settings.ANSIBLE_CFG_TEMPLATE)
+ if template_path.exists():
+ digest.update(b"ansible.cfg\0")
+ digest.update(hashlib.sha256(render_ansible_cfg(template_path).encode()).digest())
+ 
+ return digest.hexdigest()
+ 
+ async def lookup(self, env: str, fingerprint: str, container_runtime: str) -> Optional[str]:
+ """Return the cached image tag for an environment if its inputs are unchanged"""
+ entry = self._load_index().get(env)
+ if not entry or entry.get("fingerprint") != fingerprint:
+ return None
+ 
+ # The image must still exist and carry the same fingerprint label, in the storage it was built in
+ image_tag = entry.get("image_tag")
+ root = entry.get("storage") == "root"
+ if await get_image_label(image_tag, FINGERPRINT_LABEL, container_runtime, root=root) != fingerprint:
+ print(f"[WARNING] Cached image {image_tag} for {env} is missing or relabelled, rebuilding")
+ return None
+ 
+ self.touch(env)
+ return image_tag
+ 
+ def touch(self, env: str):
+ """Mark an environment's cached image as used (image cache LRU order)"""
+ entry = self._load_index().get(env)
+ if entry:
+ entry["last_used"] = datetime.now().isoformat()
+ self._save_index()
+ 
+ def last_used(self) -> Dict[str, str]:
+ """Last use of each indexed fingerprint and shared layer key, keyed by fingerprint or layer key"""
+ last_used = {}
+ for entry in self._load_index().values():
+ used = entry.get("last_used") or entry.get("built_at", "")
+ if entry.get("fingerprint"):
+ last_used[entry["fingerprint"]] = used
+ # Shared layers live as long as the most recently used environment built on them
+ if entry.get("layer_key"):
+ last_used[entry["layer_key"]] = max(used, last_used.get(entry["layer_key"], ""))
+ return last_used
+ 
+ def base_digests(self) -> Dict[str, str]:
+ """Base image digest each environment's cached image was built from"""
+ return {env: entry["base_digest"] for env, entry in self._load_index().items() if entry.get("base_digest")}
+ 
+ def record(
+ self,
+ env: str,
+ fingerprint: str,
+ image_tag: str,
+ build_id: str,
+ base_digest: Optional[str] = None,
+ layer_key: Optional[str] = None,
+ storage: str = "rootless"
+ ):
+ """Remember the image produced by a successful build
+
+ storage is "root" for playbook builds (become) and "rootless" for the backend's own builds.
+ """
+ index = self._load_index()
+ index[env] = {
+ "fingerprint": fingerprint,
+ "image_tag": image_tag,
+ "build_id": build_id,
+ "storage": storage,
+ "base_digest": base_digest,
+ "layer_key": layer_key,
+ "built_at": datetime.now().isoformat(),
+ "last_used": datetime.now().isoformat()
+ }
+ self._save_index()
+ print(f"[PASS] Cached {env} as {image_tag} ({fingerprint[:12]})")
+ 
+ def label_args(self, env: str, fingerprint: str, container_runtime: str, layer_key: Optional[str] = None) -> List[str]:
+ """Container build arguments that stamp the fingerprint and environment onto the built image"""
+ labels = [f"{FINGERPRINT_LABEL}={fingerprint}", f"{ENVIRONMENT_LABEL}={env}"]
+ cli_args = [f"--label {label}" for label in labels]
+ 
+ # Label the builder-stage and intermediate images too so the image cache can own them (podman 4+)
+ capabilities = runtime_service.cached_capabilities(container_runtime)
+ major_version = (capabilities.version or "").split(".")[0] if capabilities else ""
+ if container_runtime == "podman" and major_version.isdigit() and int(major_version) >= 4:
+ # Layer labels are part of the layer cache key: they carry the stable base stage key, never the
+ # fingerprint, so a changed requirement still reuses the base layers; shared layers label alike
+ if layer_key:
+ layer_labels = [f"{FINGERPRINT_LABEL}={layer_key}", f"{ENVIRONMENT_LABEL}={shared_layer_group(layer_key)}"]
+ else:
+ layer_labels = [f"{ENVIRONMENT_LABEL}={env}"]
+ cli_args.extend(f"--layer-label {label}" for label in layer_labels)
+ 
+ return cli_args
+ 
+ def _load_index(self) -> Dict[str, dict]:
+ """Load the local cache index from disk once"""
+ if self._index is None:
+ try:
+ with open(self.index_path, 'r') as f:
+ self._index = json.load(f)
+ except FileNotFoundError:
+ self._index = {}
+ except Exception as e:
+ print(f"[WARNING] Ignoring unreadable build cache index {self.index_path}: {e}")
+ self._index = {}
+ return self._index
+ 
+ def _save_index(self):
+ """Atomically write the cache index"""
+ try:
+ self.index_path.parent.mkdir(parents=True, exist_ok=True)
+ temp_path = self.index_path.with_suffix(".tmp")
+ with open(temp_path, 'w') as f:
+ json.dump(self._index, f, indent=2, sort_keys=True)
+ os.replace(temp_path, self.index_path)
+ except Exception as e:
+ print(f"[WARNING] Could not write build cache index {self.index_path}: {e}")
+
+# Create global service instance
+build_cache_service = BuildCacheService()
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/services/build_history_service.py - Persistent Build History Service
+
+import json
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.models.build_models import (
+ BuildListItem, EnvironmentHistory, EnvironmentHistoryEntry, PhaseStatistics, ResourceUsage
+)
+from app.core.config import settings
+from app.utils.build_phases import BUILD_PHASES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+ build_id TEXT PRIMARY KEY,
+ status TEXT NOT NULL,
+ executor TEXT,
+ container_runtime TEXT,
+ environments TEXT NOT NULL,
+ start_time TEXT NOT NULL,
+ end_time TEXT,
+ duration_seconds REAL,
+ return_code INTEGER,
+ successful_builds TEXT,
+ failed_builds TEXT,
+ cached_builds TEXT,
+ cpu_seconds REAL,
+ peak_rss_bytes INTEGER,
+ read_bytes INTEGER,
+ write_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_builds_start_time ON builds (start_time);
+CREATE INDEX IF NOT EXISTS idx_builds_status ON builds (status, start_time);
+
+CREATE TABLE IF NOT EXISTS build_environments (
+ build_id TEXT NOT NULL REFERENCES builds (build_id) ON DELETE CASCADE,
+ environment TEXT NOT NULL,
+ status TEXT NOT NULL,
+ image_tag TEXT,
+ fingerprint TEXT,
+ start_time TEXT,
+ end_time TEXT,
+ duration_seconds REAL,
+ return_code INTEGER,
+ cpu_seconds REAL,
+ peak_rss_bytes INTEGER,
+ read_bytes INTEGER,
+ write_bytes INTEGER,
+ PRIMARY KEY (build_id, environment)
+);
+CREATE INDEX IF NOT EXISTS idx_build_environments_environment ON build_environments (environment, start_time);
+CREATE INDEX IF NOT EXISTS idx_build_environments_status ON build_environments (status, start_time);
+
+CREATE TABLE IF NOT EXISTS build_phases (
+ build_id TEXT NOT NULL REFERENCES builds (build_id) ON DELETE CASCADE,
+ environment TEXT NOT NULL,
+ seq INTEGER NOT NULL,
+ phase TEXT NOT NULL,
+ start_time TEXT NOT NULL,
+ end_time TEXT,
+ duration_seconds REAL,
+ PRIMARY KEY (build_id, environment, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_build_phases_environment ON build_phases (environment, phase);
+"""
+
+RESOURCE_COLUMNS = {"cpu_seconds": "REAL", "peak_rss_bytes": "INTEGER", "read_bytes": "INTEGER", "write_bytes": "INTEGER"}
+
+# Columns added after the first schema version, created on databases that predate them
+MIGRATED_COLUMNS = {
+ "builds": RESOURCE_COLUMNS,
+ "build_environments": RESOURCE_COLUMNS
+}
+
+class BuildHistoryService:
+ """Service persisting finished builds in an embedded SQLite database"""
+ 
+ def __init__(self):
+ self.db_path = Path(os.path.expanduser(settings.BUILD_HISTORY_DB))
+ self._connection: Optional[sqlite3.Connection] = None
+ self._lock = threading.Lock()
+ 
+ def _connect(self) -> sqlite3.Connection:
+ """Open the database on first use and make sure the schema exists"""
+ if self._connection is None:
+ self.db_path.parent.mkdir(parents=True, exist_ok=True)
+ connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+ connection.row_factory = sqlite3.Row
+ connection.execute("PRAGMA journal_mode=WAL")
+ connection.execute("PRAGMA synchronous=NORMAL")
+ connection.execute("PRAGMA foreign_keys=ON")
+ connection.executescript(SCHEMA)
+ self._migrate(connection)
+ self._connection = connection
+ return self._connection
+ 
+ def _migrate(self, connection: sqlite3.Connection):
+ """Add columns missing from a database created by an older version"""
+ with connection:
+ for table, columns in MIGRATED_COLUMNS.items():
+ existing = {row["name"] for row in connection.execute(f"PRAGMA table_info({table})")}
+ for name, column_type in columns.items():
+ if name not in existing:
+ connection.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+ 
+ def record_build(self, build_id: str, build_info: dict):
+ """Insert or update a finished build and its per-environment outcomes"""
+ start_time = build_info["start_time"]
+ end_time = build_info.get("end_time")
+ status = build_info.get("status")
+ if status in (None, "running"):
+ status = "completed" if build_info.get("return_code") == 0 else "failed"
+ 
+ build_row = {
+ "build_id": build_id,
+ "status": status,
+ "executor": build_info.get("executor", "playbook"),
+ "container_runtime": build_info.get("container_runtime"),
+ "environments": json.dumps(build_info["environments"]),
+ "start_time": start_time.isoformat(),
+ "end_time": end_time.isoformat() if end_time else None,
+ "duration_seconds": (end_time - start_time).total_seconds() if end_time else None,
+ "return_code": build_info.get("return_code"),
+ "successful_builds": json.dumps(build_info.get("successful_builds", [])),
+ "failed_builds": json.dumps(build_info.get("failed_builds", [])),
+ "cached_builds": json.dumps(build_info.get("cached_builds", [])),
+ **self._resource_values(build_info.get("resources"))
+ }
+ environment_rows = [
+ {"build_id": build_id, "environment": env, **self._environment_outcome(env, build_info)}
+ for env in build_info["environments"]
+ ]
+ phase_rows = [
+ (
+ build_id, env, seq, phase["phase"],
+ phase["start_time"].isoformat(),
+ phase["end_time"].isoformat() if phase["end_time"] else None,
+ phase["duration_seconds"]
+ )
+ for env, timeline in build_info.get("phases", {}).items()
+ for seq, phase in enumerate(timeline.snapshot())
+ ]
+ 
+ try:
+ with self._lock:
+ connection = self._connect()
+ with connection:
+ connection.execute(self._insert_statement("builds", build_row), build_row)
+ if environment_rows:
+ connection.executemany(
+ self._insert_statement("build_environments", environment_rows[0]),
+ environment_rows
+ )
+ connection.execute("DELETE FROM build_phases WHERE build_id = ?", (build_id,))
+ connection.executemany("INSERT INTO build_phases VALUES (?, ?, ?, ?, ?, ?, ?)", phase_rows)
+ except Exception as e:
+ print(f"[WARNING] Could not record build {build_id} in history: {e}")
+ 
+ def _insert_statement(self, table: str, row: dict) -> str:
+ """INSERT OR REPLACE with named parameters for the keys of `row`"""
+ columns = ", ".join(row)
+ values = ", ".join(f":{column}" for column in row)
+ return f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({values})"
+ 
+ def _resource_values(self, resources: Optional[dict]) -> dict:
+ """Resource usage columns of a build or environment job"""
+ resources = resources or {}
+ return {column: resources.get(column) for column in RESOURCE_COLUMNS}
+ 
+ def _resource_usage(self, row: sqlite3.Row) -> Optional[ResourceUsage]:
+ """Resource usage model of a stored row, None if it was never sampled"""
+ if row["cpu_seconds"] is None:
+ return None
+ return ResourceUsage(**{column: row[column] or 0 for column in RESOURCE_COLUMNS})
+ 
+ def _environment_outcome(self, env: str, build_info: dict) -> dict:
+ """Per-environment row values, from the environment job or the build-level result lists"""
+ env_info = build_info.get("environment_status", {}).get(env)
+ if env_info:
+ status = env_info["status"]
+ start_time = env_info.get("start_time")
+ end_time = env_info.get("end_time")
+ duration_seconds = (end_time - start_time).total_seconds() if start_time and end_time else None
+ return_code = env_info.get("return_code")
+ image_tag = env_info.get("image_tag")
+ fingerprint = env_info.get("fingerprint")
+ resources = env_info.get("resources")
+ else:
+ # The playbook executor only reports build-level results
+ if env in build_info.get("successful_builds", []):
+ status = "completed"
+ elif env in build_info.get("failed_builds", []) or build_info.get("status") == "failed":
+ status = "failed"
+ else:
+ status = build_info.get("status") or "unknown"
+ # Per-environment span from the phase timeline, the build's own span would count every
+ # environment of the loop; unknown spans keep end and duration NULL so average_durations skips them
+ timeline = build_info.get("phases", {}).get(env)
+ phases = getattr(timeline, "phases", None)
+ if phases and phases[-1]["end_time"]:
+ start_time, end_time = phases[0]["start_time"], phases[-1]["end_time"]
+ duration_seconds = (end_time - start_time).total_seconds()
+ else:
+ start_time, end_time, duration_seconds = None, None, None
+ return_code = build_info.get("return_code")
+ build_tag = build_info.get("build_tag")
+ image_tag = f"{env}:{build_tag}" if build_tag else None
+ fingerprint = build_info.get("fingerprints", {}).get(env)
+ # A single playbook process builds every environment, usage is only known per build
+ resources = None
+ 
+ # Rows are ordered and retained by start_time, where NULL would sort as oldest
+ start_time = start_time or build_info.get("start_time")
+ return {
+ "status": status,
+ "image_tag": image_tag,
+ "fingerprint": fingerprint,
+ "start_time": start_time.isoformat() if start_time else None,
+ "end_time": end_time.isoformat() if end_time else None,
+ "duration_seconds": duration_seconds,
+ "return_code": return_code,
+ **self._resource_values(resources)
+ }
+ 
+ def list_builds(self, limit: int = 100, status: Optional[str] = None, environment: Optional[str] = None) -> List[BuildListItem]:
+ """Most recent builds first, optionally filtered by status or environment"""
+ query = "SELECT b.* FROM builds b"
+ conditions, params = [], []
+ if environment:
+ query += " JOIN build_environments e ON e.build_id = b.build_id"
+ conditions.append("e.environment = ?")
+ params.append(environment)
+ if status:
+ conditions.append("b.status = ?")
+ params.append(status)
+ if conditions:
+ query += " WHERE " + " AND ".join(conditions)
+ query += " ORDER BY b.start_time DESC LIMIT ?"
+ params.append(limit)
+ 
+ return [
+ BuildListItem(
+ build_id=row["build_id"],
+ status=row["status"],
+ environments=json.loads(row["environments"]),
+ start_time=datetime.fromisoformat(row["start_time"]),
+ end_time=datetime.fromisoformat(row["end_time"]) if row["end_time"] else None,
+ environment_count=len(json.loads(row["environments"]))
+ ) for row in self._query(query, params)
+ ]
+ 
+ def get_build(self, build_id: str) -> Optional[dict]:
+ """Load a finished build in the in-memory build_info layout (without logs)"""
+ rows = self._query("SELECT * FROM builds WHERE build_id = ?", (build_id,))
+ if not rows:
+ return None
+ 
+ row = rows[0]
+ environment_rows = self._query("SELECT * FROM build_environments WHERE build_id = ?", (build_id,))
+ phases: Dict[str, List[dict]] = {}
+ for phase_row in self._query("SELECT * FROM build_phases WHERE build_id = ? ORDER BY environment, seq", (build_id,)):
+ phases.setdefault(phase_row["environment"], []).append({
+ "phase": phase_row["phase"],
+ "start_time": datetime.fromisoformat(phase_row["start_time"]),
+ "end_time": datetime.fromisoformat(phase_row["end_time"]) if phase_row["end_time"] else None
+ })
+ return {
+ "build_id": build_id,
+ "status": row["status"],
+ "executor": row["executor"],
+ "container_runtime": row["container_runtime"],
+ "environments": json.loads(row["environments"]),
+ "start_time": datetime.fromisoformat(row["start_time"]),
+ "end_time": datetime.fromisoformat(row["end_time"]) if row["end_time"] else None,
+ "return_code": row["return_code"],
+ "successful_builds": json.loads(row["successful_builds"] or "[]"),
+ "failed_builds": json.loads(row["failed_builds"] or "[]"),
+ "cached_builds": json.loads(row["cached_builds"] or "[]"),
+ "resources": self._resource_values(dict(row)) if row["cpu_seconds"] is not None else None,
+ "phases": phases,
+ "environment_status": {
+ env_row["environment"]: {
+ "status": env_row["status"],
+ "image_tag": env_row["image_tag"],
+ "fingerprint": env_row["fingerprint"],
+ "cache_hit": env_row["status"] == "cached",
+ "start_time": datetime.fromisoformat(env_row["start_time"]) if env_row["start_time"] else None,
+ "end_time": datetime.fromisoformat(env_row["end_time"]) if env_row["end_time"] else None,
+ "return_code": env_row["return_code"],
+ "resources": self._resource_values(dict(env_row)) if env_row["cpu_seconds"] is not None else None
+ } for env_row in environment_rows
+ }
+ }
+ 
+ def success_rate(self, days: int) -> Tuple[int, int]:
+ """Successful and total finished builds started within the last `days` days"""
+ cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+ rows = self._query(
+ "SELECT COUNT(*) AS total, COALESCE(SUM(return_code = 0), 0) AS successful "
+ "FROM builds WHERE start_time > ?",
+ (cutoff,)
+ )
+ return (rows[0]["successful"], rows[0]["total"]) if rows else (0, 0)
+ 
+ def average_durations(self, environments: List[str], samples: int = 10) -> Dict[str, float]:
+ """Mean duration of the most recent successful builds of each environment"""
+ if not environments:
+ return {}
+ 
+ placeholders = ", ".join("?" for _ in environments)
+ rows = self._query(
+ "SELECT environment, AVG(duration_seconds) AS average FROM ("
+ " SELECT environment, duration_seconds,"
+ " ROW_NUMBER() OVER (PARTITION BY environment ORDER BY start_time DESC) AS n"
+ " FROM build_environments"
+ f" WHERE status = 'completed' AND duration_seconds IS NOT NULL AND environment IN ({placeholders})"
+ ") WHERE n <= ? GROUP BY environment",
+ (*environments, samples)
+ )
+ return {row["environment"]: row["average"] for row in rows}
+ 
+ def peak_memory(self, environments: List[str], samples: int = 10) -> Dict[str, int]:
+ """Highest peak resident memory over the most recent successful builds of each environment"""
+ if not environments:
+ return {}
+ 
+ placeholders = ", ".join("?" for _ in environments)
+ rows = self._query(
+ "SELECT environment, MAX(peak_rss_bytes) AS peak FROM ("
+ " SELECT environment, peak_rss_bytes,"
+ " ROW_NUMBER() OVER (PARTITION BY environment ORDER BY start_time DESC) AS n"
+ " FROM build_environments"
+ f" WHERE status = 'completed' AND peak_rss_bytes IS NOT NULL AND environment IN ({placeholders})"
+ ") WHERE n <= ? GROUP BY environment",
+ (*environments, samples)
+ )
+ return {row["environment"]: row["peak"] for row in rows}
+ 
+ def environment_history(self, environment: str, limit: int = 50) -> EnvironmentHistory:
+ """Recent outcomes of one environment with summary statistics"""
+ rows = self._query(
+ "SELECT * FROM build_environments WHERE environment = ? ORDER BY start_time DESC LIMIT ?",
+ (environment, limit)
+ )
+ phase_durations = self._phase_durations(environment, [row["build_id"] for row in rows])
+ builds = [
+ EnvironmentHistoryEntry(
+ build_id=row["build_id"],
+ environment=row["environment"],
+ status=row["status"],
+ image_tag=row["image_tag"],
+ fingerprint=row["fingerprint"],
+ start_time=datetime.fromisoformat(row["start_time"]) if row["start_time"] else None,
+ end_time=datetime.fromisoformat(row["end_time"]) if row["end_time"] else None,
+ duration_seconds=row["duration_seconds"],
+ return_code=row["return_code"],
+ resources=self._resource_usage(row),
+ phase_durations=phase_durations.get(row["build_id"], {})
+ ) for row in rows
+ ]
+ 
+ durations = [b.duration_seconds for b in builds if b.status == "completed" and b.duration_seconds is not None]
+ usage = [b.resources for b in builds if b.status == "completed" and b.resources is not None]
+ return EnvironmentHistory(
+ environment=environment,
+ total_builds=len(builds),
+ successful_builds=sum(1 for b in builds if b.status in ("completed", "cached")),
+ average_duration_seconds=round(sum(durations) / len(durations), 1) if durations else None,
+ average_cpu_seconds=round(sum(u.cpu_seconds for u in usage) / len(usage), 1) if usage else None,
+ max_peak_rss_bytes=max(u.peak_rss_bytes for u in usage) if usage else None,
+ phase_statistics=self._phase_statistics([b.phase_durations for b in builds if b.status == "completed"]),
+ builds=builds
+ )
+ 
+ def _phase_durations(self, environment: str, build_ids: List[str]) -> Dict[str, Dict[str, float]]:
+ """Seconds spent per phase for each of the given builds of an environment"""
+ if not build_ids:
+ return {}
+ 
+ placeholders = ", ".join("?" for _ in build_ids)
+ rows = self._query(
+ "SELECT build_id, phase, SUM(duration_seconds) AS duration FROM build_phases"
+ f" WHERE environment = ? AND build_id IN ({placeholders}) GROUP BY build_id, phase",
+ (environment, *build_ids)
+ )
+ durations: Dict[str, Dict[str, float]] = {}
+ for row in rows:
+ durations.setdefault(row["build_id"], {})[row["phase"]] = round(row["duration"] or 0.0, 1)
+ return durations
+ 
+ def _phase_statistics(self, builds: List[Dict[str, float]]) -> List[PhaseStatistics]:
+ """Nearest-rank percentiles of each phase's duration across builds"""
+ samples: Dict[str, List[float]] = {}
+ for durations in builds:
+ for phase, duration in durations.items():
+ samples.setdefault(phase, []).append(duration)
+ 
+ def percentile(values: List[float], fraction: float) -> float:
+ return values[max(0, math.ceil(fraction * len(values)) - 1)]
+ 
+ known_order = {phase: index for index, phase in enumerate(BUILD_PHASES)}
+ statistics = []
+ for phase in sorted(samples, key=lambda p: (known_order.get(p, len(known_order)), p)):
+ values = sorted(samples[phase])
+ statistics.append(PhaseStatistics(
+ phase=phase,
+ samples=len(values),
+ p50_seconds=percentile(values, 0.50),
+ p90_seconds=percentile(values, 0.90),
+ p95_seconds=percentile(values, 0.95),
+ max_seconds=values[-1]
+ ))
+ return statistics
+ 
+ def prune(self, days: int):
+ """Drop builds started more than `days` days ago"""
+ cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+ try:
+ with self._lock:
+ connection = self._connect()
+ with connection:
+ connection.execute("DELETE FROM builds WHERE start_time < ?", (cutoff,))
+ except Exception as e:
+ print(f"[WARNING] Could not prune build history: {e}")
+ 
+ def _query(self, query: str, params=()) -> List[sqlite3.Row]:
+ """Run a read query, returning no rows if the database is unavailable"""
+ try:
+ with self._lock:
+ return self._connect().execute(query, params).fetchall()
+ except Exception as e:
+ print(f"[WARNING] Build history query failed: {e}")
+ return []
+
+# Create global service instance
+build_history_service = BuildHistoryService()
@@ -14,6 +14,10 @@ COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
 # backend/app/services/build_service.py - Build Management Service
 
 import asyncio
+import heapq
+import itertools
+import json
+import signal
 import uuid
 import os
 import tempfile
@@ -21,12 +25,46 @@ import yaml
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from app.models.build_models import BuildRequest, BuildResponse, BuildStatus, BuildListItem
+from app.models.build_models import (
+ BuildRequest, BuildResponse, BuildStatus, BuildListItem, BuildPhase, EnvironmentBuildStatus, EnvironmentBuildLogs,
+ ResourceUsage
+)
 from app.core.config import settings
-from app.utils.container_utils import validate_container_runtime
-from app.utils.file_utils import cleanup_temp_file
+from app.utils.file_utils import cleanup_temp_file, load_build_definition, pin_image_digest, prepare_build_context
+from app.utils.build_plan import LayerKeys, layer_keys, plan_shared_layers, shared_base_keys, shared_layer_group
+from app.utils.host_utils import check_build_host
+from app.utils.container_utils import get_image_size
+from app.utils.build_phases import PhaseTimeline, split_timestamp
+from app.utils.log_buffer import LogBuffer
+from app.utils.stream_utils import open_pipe_reader, read_line_batches
+from app.utils.wheelhouse import wheelhouse_volume_args
+from app.utils.collection_cache import collection_cache_volume_args
+from app.utils.resource_utils import ProcessTreeTracker, read_memory_available, read_process_table
+from app.utils.build_schedule import BuildSlots, JobEstimate, lpt_order, makespan, simulate_schedule
+from app.services.build_cache_service import build_cache_service
+from app.services.build_history_service import build_history_service
+from app.services.image_cache_service import image_cache_service
+from app.services.base_image_digest_service import base_image_digest_service
+from app.services.image_prepull_service import image_prepull_service, read_base_image
+from app.services.metrics_service import metrics_service
+from app.services.runtime_service import runtime_service
+
+BUILD_EXECUTORS = ("auto", "playbook", "parallel")
+STREAM_BATCH_LINES = 500 # Maximum log lines per server-sent event
+STREAM_HEARTBEAT_SECONDS = 15
+DEFAULT_ENVIRONMENT_BUILD_SECONDS = 900 # Duration estimate for environments without build history
+DEFAULT_ENVIRONMENT_PEAK_RSS_BYTES = 2 * 1024 ** 3 # Memory estimate for environments without build history
+PLAYBOOK_BUILD_REGISTER = "build_results" # register of the ansible-builder loop task in build_environments.yml
+MIN_QUEUE_RETRY_SECONDS = 30 # Retry-After floor when the build queue is full
+
+class BuildQueueFullError(RuntimeError):
+ """The build queue already holds MAX_QUEUED_BUILDS builds"""
+ 
+ def __init__(self, message: str, retry_after_seconds: int):
+ super().__init__(message)
+ self.retry_after_seconds = retry_after_seconds
 
 class BuildService:
  """Service for managing container builds"""
@@ -36,6 +74,18 @@ class BuildService:
  self.running_builds: Dict[str, dict] = {}
  self.completed_builds: Dict[str, dict] = {}
  
+ # Builds waiting for free build slots, ordered by (-priority, arrival)
+ self.queued_builds: Dict[str, dict] = {}
+ self.build_queue: List[tuple] = []
+ self._queue_counter = itertools.count()
+ 
+ self._watchdog_task: Optional[asyncio.Task] = None
+ 
+ # Host readiness per container runtime: (checked at, problems)
+ self._host_readiness: Dict[str, tuple] = {}
+ 
+ metrics_service.register_collector(self.collect_metrics)
+ 
  def cleanup_old_builds(self):
  """Remove completed builds older than configured hours"""
  cutoff_time = datetime.now() - timedelta(hours=settings.BUILD_CLEANUP_HOURS)
@@ -49,36 +99,99 @@ class BuildService:
  print(f" Cleaning up old build: {build_id}")
  del self.completed_builds[build_id]
  
+ build_history_service.prune(settings.BUILD_HISTORY_RETENTION_DAYS)
+ 
  def get_build_info(self, build_id: str) -> Optional[dict]:
- """Get build info from either running or completed builds"""
+ """Get build info from queued, running or completed builds"""
+ if build_id in self.queued_builds:
+ return self.queued_builds[build_id]
+ 
  if build_id in self.running_builds:
  return self.running_builds[build_id]
  
  if build_id in self.completed_builds:
  return self.completed_builds[build_id]
  
- return None
+ # Older builds (or builds from before a restart) only survive in the history store
+ build_info = build_history_service.get_build(build_id)
+ if build_info:
+ build_info["logs"] = LogBuffer(1, ["Logs are only kept in memory and are no longer available for this build"])
+ for env_info in build_info["environment_status"].values():
+ env_info["logs"] = LogBuffer(1)
+ build_info["phases"] = {env: PhaseTimeline(phases) for env, phases in build_info["phases"].items()}
+ 
+ return build_info
  
  def move_to_completed(self, build_id: str):
  """Move a build from running to completed storage"""
  if build_id in self.running_builds:
  build_info = self.running_builds[build_id]
  build_info["end_time"] = datetime.now()
+ for timeline in build_info.get("phases", {}).values():
+ timeline.finish(build_info["end_time"])
+ if build_info.get("status") in (None, "running"):
+ build_info["status"] = "completed" if build_info.get("return_code") == 0 else "failed"
+ if build_info["status"] == "failed":
+ # The runtime may be what broke, probe it again before the next build
+ runtime_service.invalidate(build_info["container_runtime"])
  self.completed_builds[build_id] = build_info
  del self.running_builds[build_id]
+ build_history_service.record_build(build_id, build_info)
+ metrics_service.record_build(build_info)
+ self._schedule_image_gc(build_info["container_runtime"])
+ self._notify_build_update(build_info)
  print(f"[PASS] Moved build {build_id} to completed builds")
  print(f"Professional Reporting Running builds: {len(self.running_builds)}, Completed: {len(self.completed_builds)}")
+ 
+ # The freed slots may let queued builds start
+ self._dispatch_queued_builds()
  else:
  print(f"[WARNING] Attempted to move non-existent build {build_id}")
  
+ def _schedule_image_gc(self, container_runtime: str):
+ """Enforce the image cache budget in the background after a build finishes"""
+ try:
+ asyncio.get_running_loop().create_task(
+ image_cache_service.collect_garbage(container_runtime, self._in_flight_environments)
+ )
+ except RuntimeError:
+ pass # No event loop (e.g. during shutdown), the next finished build collects instead
+ 
+ def _in_flight_environments(self) -> set:
+ """Environments and shared layer groups of running and queued builds, whose images garbage collection must keep"""
+ in_flight = set()
+ for build_info in [*self.running_builds.values(), *self.queued_builds.values()]:
+ in_flight.update(build_info["environments"])
+ in_flight.update(shared_layer_group(layer_key) for layer_key in build_info.get("layer_keys", {}).values())
+ return in_flight
+ 
+ def collect_metrics(self):
+ """Refresh the scheduler gauges before a metrics scrape"""
+ metrics_service.queued_builds.set(len(self.queued_builds))
+ metrics_service.running_builds.set(len(self.running_builds))
+ metrics_service.build_slots_in_use.set(self._used_slots())
+ 
+ def is_build_active(self, build_info: dict) -> bool:
+ """Check whether a build's background work (playbook or environment jobs) is still running"""
+ task = build_info.get("task")
+ if task is not None:
+ return not task.done()
+ 
+ process = build_info.get("process")
+ return bool(process and process.returncode is None)
+ 
  async def start_build(self, build_request: BuildRequest) -> BuildResponse:
- """Start building selected environments using ansible-playbook"""
+ """Queue a build of the selected environments, starting it right away if slots are free"""
  selected_environments = build_request.environments
  container_runtime = build_request.container_runtime or settings.CONTAINER_RUNTIME
+ executor = (build_request.executor or settings.BUILD_EXECUTOR).lower()
  
  if not selected_environments:
  raise ValueError("No environments specified")
  
+ if executor not in BUILD_EXECUTORS:
+ raise ValueError(f"Unknown build executor '{executor}', expected one of: {', '.join(BUILD_EXECUTORS)}")
+ 
  # Validate environments exist
  environments_dir = Path(settings.ENVIRONMENTS_DIR)
  if not environments_dir.exists():
@@ -94,85 +207,615 @@ class BuildService:
  if not ee_file.exists():
  raise FileNotFoundError(f"execution-environment.yml not found in '{env}'")
  
- # Validate container runtime
- await validate_container_runtime()
+ # Validate container runtime (cached probe)
+ await runtime_service.validate_runtime(container_runtime)
+ 
+ # "auto" takes the fast path when the host is already bootstrapped
+ executor_logs = []
+ if executor == "auto":
+ host_problems = await self._check_build_host(container_runtime)
+ if host_problems:
+ executor = "playbook"
+ executor_logs = [f"[WARNING] Host not ready for direct builds, running the bootstrap playbook: {'; '.join(host_problems)}"]
+ else:
+ executor = "parallel"
+ executor_logs = ["Quick Start Host already bootstrapped, building directly with ansible-builder"]
+ 
+ # Skip environments whose inputs match an existing image
+ # Floating base tags resolve to digests (cached with a TTL) so a moved tag invalidates the cache
+ base_digests = await base_image_digest_service.resolve_environments(selected_environments)
+ # A digest only counts as a build input where the build is really pinned to it
+ base_images = self._pinned_base_images(base_digests)
+ base_digests = {env: digest for env, digest in base_digests.items() if env in base_images}
+ fingerprints = {
+ env: build_cache_service.fingerprint(env, container_runtime, base_digests.get(env))
+ for env in selected_environments
+ }
+ cached_images = {}
+ if settings.BUILD_CACHE_ENABLED and not build_request.force:
+ for env in selected_environments:
+ image_tag = await build_cache_service.lookup(env, fingerprints[env], container_runtime)
+ if image_tag:
+ cached_images[env] = image_tag
+ 
+ environments_to_build = [env for env in selected_environments if env not in cached_images]
+ if not environments_to_build:
+ return self._record_cached_build(selected_environments, container_runtime, executor, fingerprints, cached_images)
+ 
+ # Environments with identical base stages and stage prefixes build those layers once
+ # Planned before the coalescing check: no await may separate that check from _enqueue_build
+ planned_keys = await self._plan_shared_layers(environments_to_build, container_runtime, base_digests, executor)
+ shared_keys = shared_base_keys(planned_keys)
+ build_dependencies = plan_shared_layers(planned_keys) if executor == "parallel" else {}
+ 
+ # Duplicate requests share the in-flight build instead of racing on the same contexts and tags
+ in_flight = self._find_coalescable_build(environments_to_build, fingerprints, container_runtime)
+ if in_flight:
+ return self._attach_to_build(in_flight, build_request, cached_images)
+ 
+ # Builds wait in the priority queue until enough build slots are free
+ if len(self.queued_builds) >= settings.MAX_QUEUED_BUILDS:
+ raise BuildQueueFullError(
+ f"Build queue is full ({settings.MAX_QUEUED_BUILDS} builds waiting)", self._queue_retry_after_seconds()
+ )
+ 
+ build_id = str(uuid.uuid4())
+ 
+ print(f"Quick Start Created build ID: {build_id}")
+ 
+ environment_status = self._cached_environment_status(fingerprints, cached_images)
+ if executor == "parallel":
+ for env in environments_to_build:
+ environment_status[env] = {
+ "status": "pending",
+ "image_tag": None,
+ "fingerprint": fingerprints[env],
+ "layer_group": shared_layer_group(shared_keys[env]) if env in shared_keys else None,
+ "waits_for": build_dependencies.get(env),
+ "cache_hit": False,
+ "start_time": None,
+ "end_time": None,
+ "return_code": None,
+ "logs": LogBuffer(settings.BUILD_LOG_BUFFER_LINES)
+ }
+ 
+ # Store build info for scheduling and monitoring
+ build_info = {
+ "build_id": build_id,
+ "process": None,
+ "processes": {},
+ "environments": selected_environments,
+ "container_runtime": container_runtime,
+ "temp_vars_file": None,
+ "status": "queued",
+ "priority": build_request.priority,
+ "slots": self._slot_weight(environments_to_build),
+ "queued_time": datetime.now(),
+ "start_time": datetime.now(),
+ "end_time": None,
+ "return_code": None,
+ "logs": LogBuffer(settings.BUILD_LOG_BUFFER_LINES, [
+ f"Quick Start Build requested at {datetime.now().strftime('%H:%M:%S')}",
+ f" Building environments: {', '.join(selected_environments)}",
+ f"Installation Container runtime: {container_runtime}",
+ *executor_logs,
+ *self._cache_hit_logs(cached_images),
+ *self._shared_layer_logs(shared_keys, build_dependencies)
+ ]),
+ "successful_builds": list(cached_images),
+ "failed_builds": [],
+ "cached_builds": list(cached_images),
+ "executor": executor,
+ "fingerprints": fingerprints,
+ "base_digests": base_digests,
+ "base_images": base_images,
+ # Base stage key of every environment, labels its intermediate layers whether shared or not
+ "layer_keys": {env: keys.base for env, keys in planned_keys.items() if keys},
+ "build_dependencies": build_dependencies,
+ "environment_status": environment_status,
+ "phases": {},
+ "cancel_requested": False,
+ "requesters": 1,
+ "created_at": time.time()
+ }
+ 
+ self._enqueue_build(build_info)
+ 
+ # Cleanup old builds
+ self.cleanup_old_builds()
+ 
+ if build_info["status"] == "queued":
+ position = self._queue_estimates()[build_id]["queue_position"]
+ message = f"Queued building {len(environments_to_build)} environments at position {position}"
+ else:
+ message = f"Started building {len(environments_to_build)} environments"
+ 
+ return BuildResponse(
+ build_id=build_id,
+ status="queued" if build_info["status"] == "queued" else "started",
+ environments=selected_environments,
+ message=message,
+ cached_environments=list(cached_images),
+ image_tags=dict(cached_images)
+ )
+ 
+ def _slot_weight(self, environments_to_build: List[str]) -> int:
+ """Build slots a build occupies: one per environment, capped so any build can run alone"""
+ return min(max(1, len(environments_to_build)), max(1, settings.MAX_CONCURRENT_ENVIRONMENT_SLOTS))
+ 
+ def _used_slots(self) -> int:
+ """Build slots held by running builds"""
+ return sum(build_info.get("slots", 1) for build_info in self.running_builds.values())
+ 
+ def _enqueue_build(self, build_info: dict):
+ """Add a build to the priority queue and start whatever fits"""
+ build_id = build_info["build_id"]
+ self.queued_builds[build_id] = build_info
+ self._push_queue_entry(build_info)
+ 
+ print(f"[PASS] Queued build {build_id} (priority {build_info['priority']}, {build_info['slots']} slots)")
+ self._dispatch_queued_builds()
+ 
+ def _push_queue_entry(self, build_info: dict):
+ """Push a heap entry for a queued build, superseding any earlier entry for it"""
+ # Higher priority first, FIFO within a priority
+ build_info["queue_entry"] = next(self._queue_counter)
+ heapq.heappush(self.build_queue, (-build_info["priority"], build_info["queue_entry"], build_info["build_id"]))
+ 
+ def _is_current_queue_entry(self, entry: tuple) -> bool:
+ """Heap entries of cancelled or re-prioritised builds are stale and skipped"""
+ _, sequence, build_id = entry
+ build_info = self.queued_builds.get(build_id)
+ return build_info is not None and build_info["queue_entry"] == sequence
+ 
+ async def _check_build_host(self, container_runtime: str) -> List[str]:
+ """Host readiness problems for a runtime, re-checked after HOST_READINESS_TTL_SECONDS"""
+ checked_at, problems = self._host_readiness.get(container_runtime, (None, None))
+ if checked_at is None or time.monotonic() - checked_at > settings.HOST_READINESS_TTL_SECONDS:
+ problems = await check_build_host(container_runtime)
+ self._host_readiness[container_runtime] = (time.monotonic(), problems)
+ return problems
+ 
+ def _find_coalescable_build(
+ self,
+ environments_to_build: List[str],
+ fingerprints: Dict[str, str],
+ container_runtime: str
+ ) -> Optional[dict]:
+ """Find an in-flight build already producing every requested environment from identical inputs"""
+ for build_info in [*self.running_builds.values(), *self.queued_builds.values()]:
+ if build_info.get("cancel_requested") or build_info["container_runtime"] != container_runtime:
+ continue
+ 
+ if build_info["build_id"] in self.running_builds and not self.is_build_active(build_info):
+ continue
+ 
+ in_flight = {
+ env: build_info["fingerprints"][env]
+ for env in build_info["environments"]
+ if env not in build_info.get("cached_builds", [])
+ }
+ if all(in_flight.get(env) == fingerprints[env] for env in environments_to_build):
+ return build_info
+ 
+ return None
+ 
+ def _attach_to_build(self, build_info: dict, build_request: BuildRequest, cached_images: Dict[str, str]) -> BuildResponse:
+ """Attach a duplicate request to an in-flight build instead of starting another one"""
+ build_id = build_info["build_id"]
+ build_info["requesters"] = build_info.get("requesters", 1) + 1
+ 
+ # A more urgent duplicate pulls the queued build forward
+ if build_id in self.queued_builds and build_request.priority > build_info["priority"]:
+ build_info["priority"] = build_request.priority
+ self._push_queue_entry(build_info)
+ 
+ self._append_log(
+ build_info,
+ f"Attached duplicate request for {', '.join(build_request.environments)} "
+ f"({build_info['requesters']} requesters)"
+ )
+ print(f"[PASS] Coalesced duplicate request into build {build_id} ({build_info['requesters']} requesters)")
+ 
+ return BuildResponse(
+ build_id=build_id,
+ status="attached",
+ environments=build_info["environments"],
+ message=f"Identical build {build_id} is already {build_info['status']}, attached to it",
+ cached_environments=list(cached_images),
+ image_tags=dict(cached_images)
+ )
+ 
+ def _dispatch_queued_builds(self):
+ """Start queued builds in priority order while the head of the queue fits in the free slots"""
+ while self.build_queue:
+ # Stale entries of cancelled or re-prioritised builds are dropped lazily
+ if not self._is_current_queue_entry(self.build_queue[0]):
+ heapq.heappop(self.build_queue)
+ continue
+ 
+ _, _, build_id = self.build_queue[0]
+ build_info = self.queued_builds[build_id]
+ 
+ # Strict ordering: a large build at the head is not overtaken by smaller ones
+ if (len(self.running_builds) >= settings.MAX_CONCURRENT_BUILDS
+ or self._used_slots() + build_info["slots"] > settings.MAX_CONCURRENT_ENVIRONMENT_SLOTS):
+ break
+ 
+ heapq.heappop(self.build_queue)
+ del self.queued_builds[build_id]
+ self._launch_build(build_info)
+ 
+ def _launch_build(self, build_info: dict):
+ """Move a build from the queue into the running builds and start its executor"""
+ build_id = build_info["build_id"]
+ waited = (datetime.now() - build_info["queued_time"]).total_seconds()
+ 
+ build_info["status"] = "running"
+ build_info["start_time"] = datetime.now()
+ build_info["last_output_time"] = build_info["start_time"]
+ self.running_builds[build_id] = build_info
+ 
+ if waited >= 1:
+ self._append_log(build_info, f"⏳ Started after waiting {int(waited)}s in the build queue")
+ 
+ if build_info["executor"] == "parallel":
+ workers = max(1, settings.MAX_PARALLEL_ENVIRONMENT_BUILDS)
+ self._append_log(build_info, f"Role Variables Executor: parallel ansible-builder ({workers} workers)")
+ build_info["task"] = asyncio.create_task(self._run_parallel_build(build_id, workers))
+ else:
+ build_info["task"] = asyncio.create_task(self._run_playbook_build(build_id))
+ build_info["resource_task"] = asyncio.create_task(self._sample_resources(build_id))
+ self._ensure_watchdog()
+ 
+ print(f"[PASS] Started build {build_id}. Running builds: {len(self.running_builds)}, slots in use: {self._used_slots()}")
+ print(f"Distribution-Specific Features Started build {build_id} for environments: {build_info['environments']}")
+ 
+ def _ensure_watchdog(self):
+ """Start the timeout watchdog unless it is already watching the running builds"""
+ if self._watchdog_task is None or self._watchdog_task.done():
+ self._watchdog_task = asyncio.create_task(self._watch_build_timeouts())
+ 
+ async def _watch_build_timeouts(self):
+ """Background task timing out builds that exceed the wall-clock or idle limit"""
+ while self.running_builds:
+ await asyncio.sleep(settings.BUILD_WATCHDOG_INTERVAL_SECONDS)
+ now = datetime.now()
+ 
+ for build_id, build_info in list(self.running_builds.items()):
+ if build_info.get("cancel_requested"):
+ continue
+ 
+ running_minutes = (now - build_info["start_time"]).total_seconds() / 60
+ idle_minutes = (now - build_info.get("last_output_time", build_info["start_time"])).total_seconds() / 60
+ 
+ if settings.BUILD_TIMEOUT_MINUTES > 0 and running_minutes >= settings.BUILD_TIMEOUT_MINUTES:
+ reason = f"exceeded the {settings.BUILD_TIMEOUT_MINUTES} minute build timeout"
+ elif settings.BUILD_IDLE_TIMEOUT_MINUTES > 0 and idle_minutes >= settings.BUILD_IDLE_TIMEOUT_MINUTES:
+ reason = f"produced no output for {settings.BUILD_IDLE_TIMEOUT_MINUTES} minutes"
+ else:
+ continue
+ 
+ await self._time_out_build(build_id, reason)
+ 
+ async def _time_out_build(self, build_id: str, reason: str):
+ """Stop a hung build, release its slots and kill its process groups"""
+ build_info = self.running_builds[build_id]
+ print(f"[FAIL] Build {build_id} {reason}, stopping it")
  
- # Check for concurrent build limit
- if len(self.running_builds) >= settings.MAX_CONCURRENT_BUILDS:
- raise RuntimeError(f"Maximum concurrent builds ({settings.MAX_CONCURRENT_BUILDS}) reached")
+ build_info["cancel_requested"] = True
+ build_info["status"] = "timed_out"
+ build_info["timeout_reason"] = reason
+ if build_info.get("return_code") is None:
+ build_info["return_code"] = -1
+ self._append_log(build_info, f"[FAIL] Build timed out at {datetime.now().strftime('%H:%M:%S')}: {reason}")
+ 
+ # Free the slots first so queued builds do not wait for the kill grace period
+ processes = self._build_processes(build_info)
+ self.move_to_completed(build_id)
+ await self._terminate_process_groups(processes)
+ 
+ def _build_processes(self, build_info: dict) -> list:
+ """Live top-level processes of a build (ansible-playbook or ansible-builder jobs)"""
+ processes = [build_info.get("process")] + list(build_info.get("processes", {}).values())
+ return [p for p in processes if p and p.returncode is None]
+ 
+ async def _terminate_process_groups(self, processes: list):
+ """SIGTERM every process group, then SIGKILL whatever is left after the grace period"""
+ if not processes:
+ return
+ 
+ for process in processes:
+ self._signal_process_group(process, signal.SIGTERM)
+ 
+ try:
+ await asyncio.wait_for(
+ asyncio.gather(*(process.wait() for process in processes)),
+ timeout=settings.BUILD_KILL_GRACE_SECONDS
+ )
+ except asyncio.TimeoutError:
+ pass
+ 
+ # Children (podman, sudo'ed ansible-builder) can outlive the group leader
+ for process in processes:
+ self._signal_process_group(process, signal.SIGKILL)
+ 
+ def _signal_process_group(self, process, sig: int):
+ """Signal the session a build process leads, falling back to the process itself"""
+ try:
+ os.killpg(process.pid, sig)
+ except ProcessLookupError:
+ pass
+ except PermissionError:
+ if process.returncode is None:
+ process.send_signal(sig)
+ 
+ async def _sample_resources(self, build_id: str):
+ """Background task sampling CPU, memory and IO of a running build's process trees"""
+ build_info = self.running_builds.get(build_id)
+ build_tracker = ProcessTreeTracker()
+ environment_trackers: Dict[str, ProcessTreeTracker] = {}
+ 
+ while build_id in self.running_builds:
+ # ansible-playbook for playbook builds, one ansible-builder per environment job for parallel builds
+ environment_pids = {env: process.pid for env, process in build_info["processes"].items()}
+ root_pids = list(environment_pids.values())
+ if build_info.get("process") is not None:
+ root_pids.append(build_info["process"].pid)
+ 
+ if root_pids:
+ try:
+ await asyncio.to_thread(
+ self._sample_process_trees, build_tracker, environment_trackers, root_pids, environment_pids
+ )
+ except Exception as e:
+ print(f"[WARNING] Stopped resource sampling for build {build_id}: {e}")
+ return
+ 
+ build_info["resources"] = build_tracker.snapshot()
+ for env, tracker in environment_trackers.items():
+ build_info["environment_status"][env]["resources"] = tracker.snapshot()
+ 
+ await asyncio.sleep(settings.RESOURCE_SAMPLE_SECONDS)
+ 
+ def _sample_process_trees(
+ self,
+ build_tracker: ProcessTreeTracker,
+ environment_trackers: Dict[str, ProcessTreeTracker],
+ root_pids: List[int],
+ environment_pids: Dict[str, int]
+ ):
+ """Take one sample of the whole build and of each environment job from a single /proc scan"""
+ table = read_process_table()
+ build_tracker.sample(root_pids, table)
+ for env, pid in environment_pids.items():
+ environment_trackers.setdefault(env, ProcessTreeTracker()).sample([pid], table)
+ 
+ async def _run_playbook_build(self, build_id: str):
+ """Background task running build_environments.yml for a build"""
+ build_info = self.running_builds[build_id]
+ environments_to_build = [env for env in build_info["environments"] if env not in build_info["cached_builds"]]
+ build_info["build_tag"] = datetime.now().strftime('%Y%m%d-%H%M%S')
  
  # Create temporary variables file
  variables = {
- "selected_environments": selected_environments,
- "container_runtime": container_runtime
+ "selected_environments": environments_to_build,
+ "container_runtime": build_info["container_runtime"],
+ "build_tag": build_info["build_tag"],
+ "build_fingerprints": {env: build_info["fingerprints"][env] for env in environments_to_build},
+ "build_base_images": {
+ env: image for env, image in build_info.get("base_images", {}).items() if env in environments_to_build
+ },
+ "build_layer_labels": {
+ env: {"fingerprint": layer_key, "environment": shared_layer_group(layer_key)}
+ for env, layer_key in build_info.get("layer_keys", {}).items()
+ },
+ "host_bootstrap_stamp": str(Path(settings.HOST_BOOTSTRAP_STAMP).expanduser())
  }
  
  with tempfile.NamedTemporaryFile(mode='w', suffix='.yml', delete=False) as temp_file:
  yaml.dump(variables, temp_file, default_flow_style=False)
- temp_vars_file = temp_file.name
+ build_info["temp_vars_file"] = temp_file.name
  
  # Prepare ansible-playbook command
  cmd = [
  "ansible-playbook",
  settings.PLAYBOOK_PATH,
- "-e", f"@{temp_vars_file}",
+ "-e", f"@{build_info['temp_vars_file']}",
  "-v"
  ]
  
+ self._append_log(build_info, f"Role Variables Command: {' '.join(cmd[:3])} [...]")
+ self._append_log(build_info, "⏳ Starting ansible-playbook...")
+ 
+ # Task results arrive as JSON lines on a pipe written by callback_plugins/ee_builder_events.py
+ events_fd, events_write_fd = os.pipe()
+ 
  # Start build process
- process = await asyncio.create_subprocess_exec(
+ try:
+ build_info["process"] = await asyncio.create_subprocess_exec(
  *cmd,
  stdout=asyncio.subprocess.PIPE,
  stderr=asyncio.subprocess.STDOUT,
- cwd=os.getcwd()
+ cwd=os.getcwd(),
+ start_new_session=True, # Own process group, so timeouts and cancels reach every child
+ env={**os.environ, "EE_BUILDER_EVENTS_FD": str(events_write_fd)},
+ pass_fds=(events_write_fd,)
  )
+ except Exception as e:
+ print(f"[FAIL] Could not start ansible-playbook for build {build_id}: {e}")
+ self._append_log(build_info, f"[FAIL] Could not start ansible-playbook: {str(e)}")
+ build_info["status"] = "failed"
+ build_info["return_code"] = -1
+ build_info["failed_builds"].extend(environments_to_build)
+ cleanup_temp_file(build_info["temp_vars_file"])
+ os.close(events_fd)
+ self.move_to_completed(build_id)
+ return
+ finally:
+ os.close(events_write_fd)
  
- # Generate unique build ID
- build_id = str(uuid.uuid4())
+ events_task = asyncio.create_task(self._consume_playbook_events(build_info, events_fd))
+ await self._capture_build_output(build_id, events_task)
  
- print(f"Quick Start Created build ID: {build_id}")
+ async def _consume_playbook_events(self, build_info: dict, events_fd: int):
+ """Apply the structured task results ansible-playbook writes to the events pipe"""
+ reader, transport = await open_pipe_reader(events_fd)
+ try:
+ async for lines in read_line_batches(reader, build_info["process"]):
+ for line_text in lines:
+ try:
+ event = json.loads(line_text)
+ except ValueError:
+ continue
+ self._handle_playbook_event(build_info, event)
+ except Exception as e:
+ print(f"[WARNING] Stopped reading playbook events for build {build_info['build_id']}: {e}")
+ finally:
+ transport.close()
  
- # Store process info for monitoring
- self.running_builds[build_id] = {
- "process": process,
+ def _handle_playbook_event(self, build_info: dict, event: dict):
+ """Record the outcome of one ansible-builder loop item, keyed by its exact environment name"""
+ if event.get("event") != "item" or event.get("register") != PLAYBOOK_BUILD_REGISTER:
+ return
+ 
+ env = event.get("item")
+ if env not in build_info["environments"]:
+ return
+ 
+ if event.get("status") == "ok":
+ results = build_info["successful_builds"]
+ elif event.get("status") == "failed":
+ results = build_info["failed_builds"]
+ else:
+ return
+ 
+ if env not in results:
+ results.append(env)
+ received = datetime.fromtimestamp(event["time"]) if event.get("time") else datetime.now()
+ self._replay_playbook_phases(build_info, env, event.get("stdout_lines") or [], received)
+ 
+ def _record_cached_build(
+ self,
+ selected_environments: List[str],
+ container_runtime: str,
+ executor: str,
+ fingerprints: Dict[str, str],
+ cached_images: Dict[str, str]
+ ) -> BuildResponse:
+ """Record a build whose every environment was served from the build cache"""
+ build_id = str(uuid.uuid4())
+ now = datetime.now()
+ 
+ self.completed_builds[build_id] = {
+ "build_id": build_id,
+ "process": None,
  "environments": selected_environments,
  "container_runtime": container_runtime,
- "temp_vars_file": temp_vars_file,
- "status": "running",
- "start_time": datetime.now(),
- "end_time": None,
- "return_code": None,
- "logs": [
- f"Quick Start Build started at {datetime.now().strftime('%H:%M:%S')}",
- f" Building environments: {', '.join(selected_environments)}",
- f"Installation Container runtime: {container_runtime}",
- f"Role Variables Command: {' '.join(cmd[:3])} [...]",
- "⏳ Starting ansible-playbook..."
- ],
- "successful_builds": [],
+ "temp_vars_file": None,
+ "status": "completed",
+ "start_time": now,
+ "end_time": now,
+ "return_code": 0,
+ "logs": LogBuffer(settings.BUILD_LOG_BUFFER_LINES, [
+ f"Quick Start Build requested at {now.strftime('%H:%M:%S')}",
+ *self._cache_hit_logs(cached_images),
+ "[PASS] All environments are up to date, nothing to build"
+ ]),
+ "successful_builds": list(selected_environments),
  "failed_builds": [],
+ "cached_builds": list(selected_environments),
+ "executor": executor,
+ "fingerprints": fingerprints,
+ "environment_status": self._cached_environment_status(fingerprints, cached_images),
  "created_at": time.time()
  }
  
- print(f"[PASS] Stored build {build_id}. Total running builds: {len(self.running_builds)}")
- 
- # Start background task to capture output
- asyncio.create_task(self._capture_build_output(build_id))
+ build_history_service.record_build(build_id, self.completed_builds[build_id])
+ metrics_service.record_build(self.completed_builds[build_id])
  
- # Cleanup old builds
- self.cleanup_old_builds()
- 
- print(f"Distribution-Specific Features Started build {build_id} for environments: {selected_environments}")
+ print(f"[PASS] Build cache hit for all environments: {selected_environments}")
  
  return BuildResponse(
  build_id=build_id,
- status="started",
+ status="cached",
  environments=selected_environments,
- message=f"Started building {len(selected_environments)} environments"
+ message=f"All {len(selected_environments)} environments unchanged, reusing cached images",
+ cached_environments=list(selected_environments),
+ image_tags=dict(cached_images)
  )
  
- async def get_build_status(self, build_id: str) -> BuildStatus:
- """Get build status, logs, and results"""
+ def _cached_environment_status(self, fingerprints: Dict[str, str], cached_images: Dict[str, str]) -> Dict[str, dict]:
+ """Per-environment records for environments served from the build cache"""
+ now = datetime.now()
+ return {
+ env: {
+ "status": "cached",
+ "image_tag": image_tag,
+ "fingerprint": fingerprints[env],
+ "cache_hit": True,
+ "start_time": now,
+ "end_time": now,
+ "return_code": 0,
+ "logs": LogBuffer(
+ settings.BUILD_LOG_BUFFER_LINES,
+ [f"Cache hit: inputs unchanged since {image_tag} was built ({fingerprints[env][:12]})"]
+ )
+ } for env, image_tag in cached_images.items()
+ }
+ 
+ def _cache_hit_logs(self, cached_images: Dict[str, str]) -> List[str]:
+ """Build log lines announcing cache hits"""
+ return [f"Cache Hit {env}: inputs unchanged, reusing {image_tag}" for env, image_tag in cached_images.items()]
+ 
+ def _pinned_base_images(self, base_digests: Dict[str, str]) -> Dict[str, str]:
+ """repository@digest base image of each environment, passed to both executors as the EE_BASE_IMAGE build arg"""
+ pinned = {}
+ for env, digest in base_digests.items():
+ base_image = read_base_image(Path(settings.ENVIRONMENTS_DIR) / env / "execution-environment.yml")
+ # Templated names are only known at build time
+ if base_image and "{{" not in base_image:
+ pinned[env] = base_image if "@" in base_image else pin_image_digest(base_image, digest)
+ return pinned
+ 
+ def _shared_layer_logs(self, shared_keys: Dict[str, str], build_dependencies: Dict[str, str]) -> List[str]:
+ """Build log lines announcing which environments share base layers"""
+ groups: Dict[str, List[str]] = {}
+ for env, layer_key in shared_keys.items():
+ groups.setdefault(shared_layer_group(layer_key), []).append(env)
+ lines = [f"Shared Layers {group}: {', '.join(envs)}" for group, envs in groups.items()]
+ lines.extend(f"Shared Layers {env} starts after {dependency}" for env, dependency in build_dependencies.items())
+ return lines
+ 
+ async def _plan_shared_layers(
+ self,
+ environments: List[str],
+ container_runtime: str,
+ base_digests: Dict[str, str],
+ executor: str
+ ) -> Dict[str, Optional[LayerKeys]]:
+ """Layer keys of each environment, computed over the definition its executor will stage"""
+ # The playbook syncs definitions as they are, the parallel executor renders in the digest and caches
+ rendered = executor == "parallel"
+ use_build_volumes = rendered and container_runtime == "podman"
+ collection_cache = Path(settings.COLLECTION_CACHE_DIR).expanduser()
+ 
+ planned_keys = {}
+ for env in environments:
+ ee_definition = await asyncio.to_thread(
+ load_build_definition,
+ Path(settings.ENVIRONMENTS_DIR) / env,
+ Path(settings.PLAYBOOK_PATH).resolve().parent,
+ use_build_volumes and settings.WHEELHOUSE_ENABLED,
+ settings.WHEELHOUSE_OFFLINE,
+ collection_cache if use_build_volumes and settings.COLLECTION_CACHE_ENABLED else None,
+ base_digests.get(env) if rendered else None
+ )
+ planned_keys[env] = layer_keys(ee_definition) if ee_definition else None
+ return planned_keys
+ 
+ async def get_build_status(self, build_id: str, since: int = 0, limit: Optional[int] = None) -> BuildStatus:
+ """Get build status, results, and the log lines from cursor `since` on (at most `limit`)"""
  print(f"Search Looking for build: {build_id}")
  
  build_info = self.get_build_info(build_id)
@@ -182,11 +825,15 @@ class BuildService:
  
  print(f"[PASS] Found build {build_id} with status: {build_info.get('status')}")
  
- process = build_info.get("process")
+ queue_estimate = {}
  
  # Determine status
- if build_id in self.running_builds:
- if process and process.returncode is None:
+ if build_id in self.queued_builds:
+ status = "queued"
+ end_time = None
+ queue_estimate = self._queue_estimates().get(build_id, {})
+ elif build_id in self.running_builds:
+ if self.is_build_active(build_info):
  status = "running"
  end_time = None
  else:
@@ -196,6 +843,9 @@ class BuildService:
  # Move to completed if not already moved
  if build_id in self.running_builds:
  self.move_to_completed(build_id)
+ elif build_info.get("status") in ("cancelled", "timed_out"):
+ status = build_info["status"]
+ end_time = build_info.get("end_time")
  else:
  status = "completed" if build_info.get("return_code") == 0 else "failed"
  end_time = build_info.get("end_time")
@@ -203,6 +853,8 @@ class BuildService:
  # Update status in build_info
  build_info["status"] = status
  
+ logs, log_cursor = build_info["logs"].read(since, limit)
+ 
  return BuildStatus(
  build_id=build_id,
  status=status,
@@ -210,30 +862,257 @@ class BuildService:
  start_time=build_info["start_time"],
  end_time=end_time,
  return_code=build_info.get("return_code"),
- logs=build_info.get("logs", []),
+ timeout_reason=build_info.get("timeout_reason"),
+ priority=build_info.get("priority", 0),
+ requesters=build_info.get("requesters", 1),
+ queued_time=build_info.get("queued_time"),
+ queue_position=queue_estimate.get("queue_position"),
+ estimated_start_time=queue_estimate.get("estimated_start_time"),
+ estimated_completion_time=queue_estimate.get("estimated_completion_time") or (
+ build_info.get("estimated_completion_time") if status == "running" else None
+ ),
+ logs=logs,
+ log_cursor=log_cursor,
+ first_log_line=build_info["logs"].first_seq,
+ total_log_lines=build_info["logs"].next_seq,
  successful_builds=build_info.get("successful_builds", []),
- failed_builds=build_info.get("failed_builds", [])
+ failed_builds=build_info.get("failed_builds", []),
+ cached_builds=build_info.get("cached_builds", []),
+ executor=build_info.get("executor", "playbook"),
+ resources=ResourceUsage(**build_info["resources"]) if build_info.get("resources") else None,
+ phases={
+ env: [BuildPhase(**phase) for phase in timeline.snapshot()]
+ for env, timeline in build_info.get("phases", {}).items()
+ },
+ environment_status={
+ env: self._environment_status(env, env_info)
+ for env, env_info in build_info.get("environment_status", {}).items()
+ }
+ )
+ 
+ def _predict_duration(self, build_info: dict) -> float:
+ """Expected build duration in seconds from the history of its environments"""
+ environments = [env for env in build_info["environments"] if env not in build_info.get("cached_builds", [])]
+ estimates = self._environment_estimates(environments)
+ if not estimates:
+ return 0
+ 
+ if build_info.get("executor") == "parallel":
+ # Replay the longest-first dispatcher, shared layer waits and memory packing included
+ return makespan(simulate_schedule(
+ estimates,
+ settings.MAX_PARALLEL_ENVIRONMENT_BUILDS,
+ self._memory_budget_bytes(),
+ build_info.get("build_dependencies")
+ ))
+ return sum(estimate.duration_seconds for estimate in estimates.values())
+ 
+ def _environment_estimates(self, environments: List[str]) -> Dict[str, JobEstimate]:
+ """Predicted duration and peak memory of each environment job from its build history"""
+ durations = build_history_service.average_durations(environments)
+ peaks = build_history_service.peak_memory(environments)
+ return {
+ env: JobEstimate(
+ duration_seconds=durations.get(env, DEFAULT_ENVIRONMENT_BUILD_SECONDS),
+ peak_rss_bytes=peaks.get(env) or DEFAULT_ENVIRONMENT_PEAK_RSS_BYTES,
+ from_history=env in durations
+ )
+ for env in environments
+ }
+ 
+ def _memory_budget_bytes(self) -> int:
+ """Memory the concurrent environment jobs of one build may add up to, 0 for no limit"""
+ if settings.BUILD_MEMORY_BUDGET_GB > 0:
+ return int(settings.BUILD_MEMORY_BUDGET_GB * 1024 ** 3)
+ return read_memory_available()
+ 
+ def _queue_estimates(self) -> Dict[str, dict]:
+ """Queue position and expected start/completion of every queued build"""
+ now = datetime.now()
+ 
+ # (expected finish, slots) of every build currently holding slots
+ holders = []
+ for build_info in self.running_builds.values():
+ elapsed = (now - build_info["start_time"]).total_seconds()
+ remaining = max(self._predict_duration(build_info) - elapsed, 0)
+ holders.append((now + timedelta(seconds=remaining), build_info.get("slots", 1)))
+ 
+ estimates = {}
+ clock = now
+ position = 0
+ for entry in sorted(self.build_queue):
+ if not self._is_current_queue_entry(entry):
+ continue
+ build_info = self.queued_builds[entry[2]]
+ build_id = build_info["build_id"]
+ 
+ # Replay the dispatcher: wait for the earliest finishers until the build fits
+ holders.sort(key=lambda holder: holder[0])
+ while holders and (
+ len(holders) >= settings.MAX_CONCURRENT_BUILDS
+ or sum(slots for _, slots in holders) + build_info["slots"] > settings.MAX_CONCURRENT_ENVIRONMENT_SLOTS
+ ):
+ finish, _ = holders.pop(0)
+ clock = max(clock, finish)
+ 
+ position += 1
+ completion = clock + timedelta(seconds=self._predict_duration(build_info))
+ holders.append((completion, build_info["slots"]))
+ estimates[build_id] = {
+ "queue_position": position,
+ "estimated_start_time": clock,
+ "estimated_completion_time": completion
+ }
+ 
+ return estimates
+ 
+ def _queue_retry_after_seconds(self) -> int:
+ """Seconds until the first queued build is expected to start and free a queue place"""
+ starts = [estimate["estimated_start_time"] for estimate in self._queue_estimates().values()]
+ if not starts:
+ return MIN_QUEUE_RETRY_SECONDS
+ return max(int((min(starts) - datetime.now()).total_seconds()), MIN_QUEUE_RETRY_SECONDS)
+ 
+ def open_build_stream(self, build_id: str, offset: int = 0) -> AsyncIterator[str]:
+ """Return a server-sent event stream of a build's log lines from the given offset"""
+ if not self.get_build_info(build_id):
+ raise ValueError(f"Build {build_id} not found")
+ 
+ return self._build_event_stream(build_id, max(0, offset))
+ 
+ async def _build_event_stream(self, build_id: str, offset: int) -> AsyncIterator[str]:
+ """Push new log lines and status changes until the build has finished"""
+ build_info = self.get_build_info(build_id)
+ last_status = None
+ 
+ while True:
+ # Grab the event before reading state so no update can slip in between
+ updated = build_info.setdefault("updated", asyncio.Event())
+ 
+ lines, next_offset = build_info["logs"].read(offset, STREAM_BATCH_LINES)
+ if lines:
+ # Lines evicted from the ring buffer before we got to them are skipped
+ first = next_offset - len(lines)
+ offset = next_offset
+ yield self._format_event("log", {"offset": offset, "first": first, "lines": lines}, event_id=offset)
+ continue
+ 
+ status = self._stream_status(build_info)
+ if status != last_status:
+ last_status = status
+ yield self._format_event("status", status, event_id=offset)
+ 
+ if status["status"] not in ("queued", "running"):
+ yield self._format_event("end", {"offset": offset, "status": status["status"]}, event_id=offset)
+ return
+ 
+ try:
+ await asyncio.wait_for(updated.wait(), timeout=STREAM_HEARTBEAT_SECONDS)
+ except asyncio.TimeoutError:
+ yield ": keep-alive\n\n"
+ 
+ def _stream_status(self, build_info: dict) -> dict:
+ """Status snapshot sent to stream subscribers whenever it changes"""
+ return {
+ "status": (
+ "running" if self.is_build_active(build_info) and not build_info.get("cancel_requested")
+ else build_info.get("status")
+ ),
+ "return_code": build_info.get("return_code"),
+ "timeout_reason": build_info.get("timeout_reason"),
+ "successful_builds": list(build_info.get("successful_builds", [])),
+ "failed_builds": list(build_info.get("failed_builds", [])),
+ "cached_builds": list(build_info.get("cached_builds", [])),
+ "queue_position": (
+ self._queue_estimates().get(build_info["build_id"], {}).get("queue_position")
+ if build_info.get("status") == "queued" else None
+ ),
+ "environment_status": {
+ env: env_info["status"] for env, env_info in build_info.get("environment_status", {}).items()
+ }
+ }
+ 
+ def _format_event(self, event: str, data: dict, event_id: Optional[int] = None) -> str:
+ """Format one server-sent event"""
+ message = f"event: {event}\n"
+ if event_id is not None:
+ message += f"id: {event_id}\n"
+ return message + f"data: {json.dumps(data, default=str)}\n\n"
+ 
+ def get_environment_logs(
+ self,
+ build_id: str,
+ environment: str,
+ since: int = 0,
+ limit: Optional[int] = None
+ ) -> EnvironmentBuildLogs:
+ """Get the log of a single environment job of a parallel build"""
+ build_info = self.get_build_info(build_id)
+ if not build_info:
+ raise ValueError(f"Build {build_id} not found")
+ 
+ env_info = build_info.get("environment_status", {}).get(environment)
+ if env_info is None:
+ raise ValueError(f"Environment '{environment}' has no per-environment job in build {build_id}")
+ 
+ logs, log_cursor = env_info["logs"].read(since, limit)
+ 
+ return EnvironmentBuildLogs(
+ build_id=build_id,
+ environment=environment,
+ status=env_info["status"],
+ logs=logs,
+ log_cursor=log_cursor,
+ first_log_line=env_info["logs"].first_seq
+ )
+ 
+ def _environment_status(self, environment: str, env_info: dict) -> EnvironmentBuildStatus:
+ """Convert a per-environment job record into its API model"""
+ return EnvironmentBuildStatus(
+ environment=environment,
+ status=env_info["status"],
+ image_tag=env_info.get("image_tag"),
+ fingerprint=env_info.get("fingerprint"),
+ cache_hit=env_info.get("cache_hit", False),
+ layer_group=env_info.get("layer_group"),
+ waits_for=env_info.get("waits_for"),
+ predicted_duration_seconds=env_info.get("predicted_duration_seconds"),
+ estimated_completion_time=env_info.get("estimated_completion_time"),
+ start_time=env_info.get("start_time"),
+ end_time=env_info.get("end_time"),
+ return_code=env_info.get("return_code"),
+ log_lines=env_info["logs"].next_seq,
+ image_size_bytes=env_info.get("image_size_bytes"),
+ resources=ResourceUsage(**env_info["resources"]) if env_info.get("resources") else None
  )
  
  async def cancel_build(self, build_id: str) -> dict:
- """Cancel a running build"""
+ """Cancel a queued or running build"""
  build_info = self.get_build_info(build_id)
  if not build_info:
  raise ValueError("Build not found")
  
- process = build_info.get("process")
+ if build_id in self.queued_builds:
+ # The heap entry is skipped by the dispatcher once the build is gone
+ del self.queued_builds[build_id]
+ build_info["cancel_requested"] = True
+ build_info["status"] = "cancelled"
+ build_info["end_time"] = datetime.now()
+ self._append_log(build_info, f"[FAIL] Build cancelled while queued at {datetime.now().strftime('%H:%M:%S')}")
+ self.completed_builds[build_id] = build_info
+ build_history_service.record_build(build_id, build_info)
+ metrics_service.record_build(build_info)
+ return {"message": "Queued build cancelled successfully"}
  
- if build_id in self.running_builds and process and process.returncode is None:
+ if build_id in self.running_builds and self.is_build_active(build_info):
  try:
- process.terminate()
- await asyncio.sleep(2)
- if process.returncode is None:
- process.kill()
- 
+ build_info["cancel_requested"] = True
  build_info["status"] = "cancelled"
- build_info["logs"].append(f"[FAIL] Build cancelled at {datetime.now().strftime('%H:%M:%S')}")
+ self._append_log(build_info, f"[FAIL] Build cancelled at {datetime.now().strftime('%H:%M:%S')}")
  
+ processes = self._build_processes(build_info)
  self.move_to_completed(build_id)
+ await self._terminate_process_groups(processes)
  
  return {"message": "Build cancelled successfully"}
  except Exception as e:
@@ -241,44 +1120,46 @@ class BuildService:
  else:
  raise ValueError("Build is not running")
  
- def list_builds(self) -> List[BuildListItem]:
- """List all builds (running and completed)"""
+ def list_builds(
+ self,
+ limit: int = 100,
+ status: Optional[str] = None,
+ environment: Optional[str] = None
+ ) -> List[BuildListItem]:
+ """List queued and running builds followed by finished builds from the history store"""
  builds = []
  
- # Add running builds
- for build_id, build_info in self.running_builds.items():
- process = build_info.get("process")
- if process and process.returncode is None:
- status = "running"
+ # Add queued and running builds
+ for build_id, build_info in {**self.queued_builds, **self.running_builds}.items():
+ if environment and environment not in build_info["environments"]:
+ continue
+ 
+ if build_id in self.queued_builds:
+ build_status = "queued"
+ elif self.is_build_active(build_info):
+ build_status = "running"
  elif build_info.get("return_code") == 0:
- status = "completed"
+ build_status = "completed"
  else:
- status = "failed"
+ build_status = "failed"
  
- builds.append(BuildListItem(
- build_id=build_id,
- status=status,
- environments=build_info["environments"],
- start_time=build_info["start_time"],
- environment_count=len(build_info["environments"])
- ))
- 
- # Add completed builds
- for build_id, build_info in self.completed_builds.items():
- status = "completed" if build_info.get("return_code") == 0 else "failed"
+ if status and build_status != status:
+ continue
  
  builds.append(BuildListItem(
  build_id=build_id,
- status=status,
+ status=build_status,
  environments=build_info["environments"],
  start_time=build_info["start_time"],
- end_time=build_info.get("end_time"),
  environment_count=len(build_info["environments"])
  ))
  
+ # Completed builds are recorded in the history store by move_to_completed
+ builds.extend(build_history_service.list_builds(limit, status, environment))
+ 
  return builds
  
- async def _capture_build_output(self, build_id: str):
+ async def _capture_build_output(self, build_id: str, events_task: Optional[asyncio.Task] = None):
  """Background task to capture real-time output from ansible-playbook"""
  if build_id not in self.running_builds:
  print(f"[FAIL] Build {build_id} not found when trying to capture output")
@@ -291,74 +1172,370 @@ class BuildService:
  print(f" Starting output capture for build {build_id}")
  line_count = 0
  
- # Read output line by line
- while True:
- try:
- line = await asyncio.wait_for(process.stdout.readline(), timeout=1.0)
- except asyncio.TimeoutError:
- if process.returncode is not None:
- break
- continue
- 
- if not line:
- break
- 
- line_text = line.decode('utf-8').strip()
- if line_text:
- build_info["logs"].append(line_text)
- line_count += 1
- 
- if line_count % 10 == 0:
- print(f"Professional Reporting Build {build_id}: captured {line_count} lines")
+ # Read output in chunks and ingest whole batches of lines
+ async for lines in read_line_batches(process.stdout, process):
+ self._append_log_lines(build_info, lines)
  
- # Parse for successful/failed builds
- self._parse_build_results(line_text, build_info)
+ if (line_count + len(lines)) // 1000 > line_count // 1000:
+ print(f"Professional Reporting Build {build_id}: captured {line_count + len(lines)} lines")
+ line_count += len(lines)
  
  # Wait for process to complete
  await process.wait()
  
+ # Per-environment results come from the events pipe, which closes with the playbook
+ if events_task is not None:
+ await events_task
+ 
  print(f" Build {build_id} completed with return code: {process.returncode}")
  
  # Update final status
  build_info["return_code"] = process.returncode
  
- if process.returncode == 0:
+ built_environments = [env for env in build_info["environments"] if env not in build_info.get("cached_builds", [])]
+ attributed = any(
+ env in build_info["successful_builds"] or env in build_info["failed_builds"]
+ for env in built_environments
+ )
+ 
+ if process.returncode == 0 and not build_info.get("cancel_requested"):
  build_info["status"] = "completed"
- build_info["logs"].append(f"[PASS] Build completed successfully at {datetime.now().strftime('%H:%M:%S')}")
- if not build_info["successful_builds"] and not build_info["failed_builds"]:
- build_info["successful_builds"] = build_info["environments"].copy()
- else:
+ self._append_log(build_info, f"[PASS] Build completed successfully at {datetime.now().strftime('%H:%M:%S')}")
+ # The playbook bootstrapped the host, later "auto" builds can take the fast path
+ self._host_readiness.pop(build_info["container_runtime"], None)
+ if not attributed:
+ build_info["successful_builds"].extend(built_environments)
+ elif not build_info.get("cancel_requested"):
  build_info["status"] = "failed"
- build_info["logs"].append(f"[FAIL] Build failed at {datetime.now().strftime('%H:%M:%S')} with return code {process.returncode}")
- if not build_info["failed_builds"] and not build_info["successful_builds"]:
- build_info["failed_builds"] = build_info["environments"].copy()
+ self._append_log(build_info, f"[FAIL] Build failed at {datetime.now().strftime('%H:%M:%S')} with return code {process.returncode}")
+ if not attributed:
+ build_info["failed_builds"].extend(built_environments)
+ 
+ # Images of environments that finished before a failure or cancel are still valid
+ for env in built_environments:
+ if env in build_info["successful_builds"]:
+ build_cache_service.record(
+ env, build_info["fingerprints"][env], f"{env}:{build_info['build_tag']}", build_id,
+ build_info.get("base_digests", {}).get(env), build_info.get("layer_keys", {}).get(env),
+ storage="root" # build_environments.yml builds with become
+ )
  
  # Clean up temporary file
  cleanup_temp_file(build_info.get("temp_vars_file"))
  
- # Move to completed builds
+ # Move to completed builds (cancel_build may already have moved it)
+ if build_id in self.running_builds:
  self.move_to_completed(build_id)
  
  except Exception as e:
  print(f"[FAIL] Error capturing output for build {build_id}: {e}")
- build_info["logs"].append(f"Error capturing output: {str(e)}")
+ self._append_log(build_info, f"Error capturing output: {str(e)}")
  build_info["status"] = "failed"
  build_info["return_code"] = -1
  
  cleanup_temp_file(build_info.get("temp_vars_file"))
  self.move_to_completed(build_id)
  
- def _parse_build_results(self, line_text: str, build_info: dict):
- """Parse output line for build success/failure indicators"""
- if "[PASS] Successfully built" in line_text or "Complete!" in line_text:
- for env in build_info["environments"]:
- if env in line_text and env not in build_info["successful_builds"]:
- build_info["successful_builds"].append(env)
+ async def _run_parallel_build(self, build_id: str, workers: int):
+ """Background task running every selected environment as its own ansible-builder job"""
+ build_info = self.running_builds[build_id]
+ environments_to_build = [env for env, env_info in build_info["environment_status"].items() if not env_info["cache_hit"]]
+ built = {env: asyncio.Event() for env in environments_to_build}
+ 
+ try:
+ # Longest predicted job first, packed within the memory budget (LPT)
+ estimates = self._environment_estimates(environments_to_build)
+ memory_budget = self._memory_budget_bytes()
+ dependencies = build_info.get("build_dependencies", {})
+ ready = [env for env in environments_to_build if env not in dependencies]
+ # Staging and base image pulls for the next jobs in LPT order, overlapping the running builds
+ staging = BuildSlots(estimates, settings.BUILD_STAGING_AHEAD, 0, ready)
+ # Jobs only queue for a build slot once staged, so an unstaged job can't hold a reservation
+ # that a staged one waits behind under the memory budget
+ slots = BuildSlots(estimates, workers, memory_budget)
+ self._log_schedule(build_info, estimates, workers, memory_budget)
+ 
+ return_codes = await asyncio.gather(*(
+ self._build_environment_after(build_info, env, slots, staging, built)
+ for env in environments_to_build
+ ))
+ await asyncio.gather(*build_info.get("post_build_tasks", []))
+ build_info["return_code"] = 0 if all(rc == 0 for rc in return_codes) else 1
+ except Exception as e:
+ print(f"[FAIL] Error running parallel build {build_id}: {e}")
+ self._append_log(build_info, f"Error running parallel build: {str(e)}")
+ build_info["return_code"] = -1
+ 
+ if not build_info.get("cancel_requested"):
+ if build_info["return_code"] == 0:
+ build_info["status"] = "completed"
+ self._append_log(build_info, f"[PASS] Build completed successfully at {datetime.now().strftime('%H:%M:%S')}")
+ else:
+ build_info["status"] = "failed"
+ self._append_log(build_info, 
+ f"[FAIL] Build failed at {datetime.now().strftime('%H:%M:%S')}: "
+ f"{len(build_info['failed_builds'])} of {len(build_info['environments'])} environments failed"
+ )
+ 
+ # cancel_build may already have moved it
+ if build_id in self.running_builds:
+ self.move_to_completed(build_id)
+ 
+ async def _build_environment_after(
+ self,
+ build_info: dict,
+ env: str,
+ slots: BuildSlots,
+ staging: BuildSlots,
+ built: Dict[str, asyncio.Event]
+ ) -> int:
+ """Build one environment once the environment whose shared layers it reuses has finished"""
+ try:
+ dependency = build_info.get("build_dependencies", {}).get(env)
+ if dependency in built and not built[dependency].is_set():
+ self._append_environment_log(build_info, env, f"Waiting for {dependency} to build the shared layers")
+ await built[dependency].wait()
+ # A failed dependency leaves whatever layers it got through in the cache, the rest build here
+ return await self._build_environment(build_info, env, slots, staging)
+ finally:
+ built[env].set()
+ 
+ def _log_schedule(self, build_info: dict, estimates: Dict[str, JobEstimate], workers: int, memory_budget: int):
+ """Log the start order and the predicted completion of a parallel build"""
+ schedule = simulate_schedule(estimates, workers, memory_budget, build_info.get("build_dependencies"))
+ predicted = makespan(schedule)
+ build_info["estimated_completion_time"] = build_info["start_time"] + timedelta(seconds=predicted)
+ 
+ for env, job in schedule.items():
+ env_info = build_info["environment_status"][env]
+ env_info["predicted_duration_seconds"] = estimates[env].duration_seconds
+ env_info["estimated_completion_time"] = build_info["start_time"] + timedelta(seconds=job.finish_seconds)
+ 
+ order = ", ".join(
+ f"{env} ({estimates[env].duration_seconds / 60:.0f}m{'' if estimates[env].from_history else ', no history'})"
+ for env in lpt_order(estimates)
+ )
+ budget = f"{memory_budget / 1024 ** 3:.1f} GiB memory" if memory_budget > 0 else "no memory limit"
+ self._append_log_lines(build_info, [
+ f"Schedule Longest first: {order}",
+ f"Schedule Predicted completion at {build_info['estimated_completion_time'].strftime('%H:%M:%S')} "
+ f"({predicted / 60:.0f}m with {workers} workers, {budget})"
+ ])
+ 
+ async def _build_environment(self, build_info: dict, env: str, slots: BuildSlots, staging: BuildSlots) -> int:
+ """Stage and pull ahead of a free build slot, hold the slot only while ansible-builder runs"""
+ env_info = build_info["environment_status"][env]
+ 
+ # Pipeline: up to BUILD_STAGING_AHEAD environments prepare while others hold the build slots
+ await staging.acquire(env)
+ try:
+ if build_info.get("cancel_requested"):
+ env_info["status"] = build_info["status"] # "cancelled" or "timed_out"
+ return -1
+ 
+ try:
+ self._append_environment_log(build_info, env, f"=== Staging {env} at {datetime.now().strftime('%H:%M:%S')} ===")
+ context_dir, build_cli_args = await self._stage_environment(build_info, env)
+ await self._pull_base_image(build_info, env, context_dir)
+ except Exception as e:
+ print(f"[FAIL] Error staging environment {env}: {e}")
+ self._append_environment_log(build_info, env, f"Error staging environment: {str(e)}")
+ env_info["status"] = "failed"
+ env_info["return_code"] = -1
+ build_info["failed_builds"].append(env)
+ return -1
  
- elif "[FAIL] Failed to build" in line_text or "Error:" in line_text:
- for env in build_info["environments"]:
- if env in line_text and env not in build_info["failed_builds"]:
+ self._append_environment_log(build_info, env, "=== Waiting for a build slot ===")
+ await slots.acquire(env)
+ finally:
+ await staging.release(env)
+ 
+ try:
+ if build_info.get("cancel_requested"):
+ env_info["status"] = build_info["status"]
+ return -1
+ 
+ env_info["status"] = "running"
+ env_info["start_time"] = datetime.now()
+ env_info["image_tag"] = f"{env}:{env_info['start_time'].strftime('%Y%m%d-%H%M%S')}"
+ self._append_environment_log(build_info, env, f"=== Building {env} at {env_info['start_time'].strftime('%H:%M:%S')} ===")
+ 
+ return_code = await self._run_ansible_builder(build_info, env, context_dir, build_cli_args)
+ finally:
+ await slots.release(env)
+ 
+ env_info["return_code"] = return_code
+ env_info["end_time"] = datetime.now()
+ 
+ if build_info.get("cancel_requested"):
+ env_info["status"] = build_info["status"]
+ elif return_code == 0:
+ env_info["status"] = "completed"
+ build_info["successful_builds"].append(env)
+ # Bookkeeping runs beside the next environment's build instead of ahead of it
+ build_info.setdefault("post_build_tasks", []).append(
+ asyncio.create_task(self._finish_environment(build_info, env))
+ )
+ else:
+ env_info["status"] = "failed"
  build_info["failed_builds"].append(env)
+ 
+ self._append_environment_log(
+ build_info, env,
+ f"=== Done {env} at {env_info['end_time'].strftime('%H:%M:%S')} (return code {return_code}) ==="
+ )
+ return return_code
+ 
+ async def _stage_environment(self, build_info: dict, env: str) -> Tuple[Path, List[str]]:
+ """Sync an environment's build context and assemble its extra container build arguments"""
+ env_info = build_info["environment_status"][env]
+ 
+ # Build-time volumes are a podman feature
+ use_wheelhouse = settings.WHEELHOUSE_ENABLED and build_info["container_runtime"] == "podman"
+ use_collection_cache = settings.COLLECTION_CACHE_ENABLED and build_info["container_runtime"] == "podman"
+ wheelhouse = Path(settings.WHEELHOUSE_DIR).expanduser()
+ collection_cache = Path(settings.COLLECTION_CACHE_DIR).expanduser()
+ 
+ context_dir, staged, staging_notes = await asyncio.to_thread(
+ prepare_build_context,
+ Path(settings.ENVIRONMENTS_DIR) / env,
+ Path(settings.BUILD_CONTEXT_DIR).expanduser() / f"ee-build-{env}",
+ Path(settings.ANSIBLE_CFG_TEMPLATE),
+ Path(settings.PLAYBOOK_PATH).resolve().parent,
+ use_wheelhouse,
+ settings.WHEELHOUSE_OFFLINE,
+ collection_cache if use_collection_cache else None,
+ build_info.get("base_digests", {}).get(env)
+ )
+ self._append_environment_lines(build_info, env, [
+ f"Staged build context: {staged.changed} files changed ({staged.reflinked} reflinked, {staged.hardlinked} hardlinked, "
+ f"{staged.copied} copied, {staged.removed} removed), {staged.unchanged} unchanged",
+ *staging_notes
+ ])
+ 
+ build_cli_args = build_cache_service.label_args(
+ env, env_info["fingerprint"], build_info["container_runtime"], build_info.get("layer_keys", {}).get(env)
+ )
+ if use_wheelhouse:
+ wheelhouse.mkdir(parents=True, exist_ok=True)
+ build_cli_args.extend(wheelhouse_volume_args(wheelhouse))
+ if use_collection_cache:
+ collection_cache.mkdir(parents=True, exist_ok=True)
+ build_cli_args.extend(collection_cache_volume_args(collection_cache))
+ # Pins the build even when the definition could not be rendered with the digest
+ if env in build_info.get("base_images", {}):
+ build_cli_args.append(f"--build-arg EE_BASE_IMAGE={build_info['base_images'][env]}")
+ 
+ return context_dir, build_cli_args
+ 
+ async def _pull_base_image(self, build_info: dict, env: str, context_dir: Path):
+ """Pull the staged definition's base image so the build slot is not spent downloading it"""
+ base_image = read_base_image(context_dir / "execution-environment.yml")
+ if not base_image or "{{" in base_image:
+ return
+ 
+ self._append_environment_log(build_info, env, f"Trying to pull {base_image} ahead of the build")
+ available, output = await image_prepull_service.ensure_pulled(base_image, build_info["container_runtime"])
+ if not available:
+ # Not fatal, ansible-builder pulls it itself and reports the real error
+ self._append_environment_log(build_info, env, f"[WARNING] Could not pull {base_image}: {output.strip()[-300:]}")
+ 
+ async def _run_ansible_builder(self, build_info: dict, env: str, context_dir: Path, build_cli_args: List[str]) -> int:
+ """Run ansible-builder in a staged context, streaming its output into the environment log"""
+ env_info = build_info["environment_status"][env]
+ cmd = [
+ settings.ANSIBLE_BUILDER_PATH, "build",
+ "--container-runtime", build_info["container_runtime"],
+ "--file", "execution-environment.yml",
+ "--tag", env_info["image_tag"],
+ "--verbosity", str(settings.ANSIBLE_BUILDER_VERBOSITY),
+ "--extra-build-cli-args", " ".join(build_cli_args)
+ ]
+ 
+ return_code = -1
+ try:
+ process = await asyncio.create_subprocess_exec(
+ *cmd,
+ stdout=asyncio.subprocess.PIPE,
+ stderr=asyncio.subprocess.STDOUT,
+ cwd=str(context_dir),
+ start_new_session=True
+ )
+ build_info["processes"][env] = process
+ 
+ async for lines in read_line_batches(process.stdout, process):
+ self._append_environment_lines(build_info, env, lines)
+ 
+ await process.wait()
+ return_code = process.returncode
+ 
+ except Exception as e:
+ print(f"[FAIL] Error building environment {env}: {e}")
+ self._append_environment_log(build_info, env, f"Error building environment: {str(e)}")
+ finally:
+ build_info["processes"].pop(env, None)
+ 
+ return return_code
+ 
+ async def _finish_environment(self, build_info: dict, env: str):
+ """Post-build work of a successful environment: cache index and image size"""
+ env_info = build_info["environment_status"][env]
+ try:
+ build_cache_service.record(
+ env, env_info["fingerprint"], env_info["image_tag"], build_info["build_id"],
+ build_info.get("base_digests", {}).get(env), build_info.get("layer_keys", {}).get(env)
+ )
+ 
+ size = await get_image_size(env_info["image_tag"], build_info["container_runtime"])
+ if size is not None:
+ env_info["image_size_bytes"] = size
+ self._append_log(build_info, f"[{env}] Image {env_info['image_tag']}: {size / 1024 ** 2:.0f} MiB")
+ except Exception as e:
+ print(f"[WARNING] Post-build step for {env} failed: {e}")
+ 
+ def _append_environment_log(self, build_info: dict, env: str, line_text: str):
+ """Record a log line for one environment job and in the combined build log"""
+ self._append_environment_lines(build_info, env, [line_text])
+ 
+ def _append_environment_lines(self, build_info: dict, env: str, lines: List[str]):
+ """Record a batch of log lines for one environment job and in the combined build log"""
+ build_info["environment_status"][env]["logs"].extend(lines)
+ timeline = self._phase_timeline(build_info, env)
+ received = datetime.now()
+ for line_text in lines:
+ timeline.feed(line_text, received)
+ self._append_log_lines(build_info, [f"[{env}] {line_text}" for line_text in lines])
+ 
+ def _phase_timeline(self, build_info: dict, env: str) -> PhaseTimeline:
+ """Phase timeline of one environment, created on its first log line"""
+ return build_info.setdefault("phases", {}).setdefault(env, PhaseTimeline())
+ 
+ def _replay_playbook_phases(self, build_info: dict, env: str, output_lines: List[str], received: datetime):
+ """Replay the timestamped ansible-builder output of a finished playbook loop item"""
+ # ansible-playbook only reports the shell task output once an environment is done
+ timeline = self._phase_timeline(build_info, env)
+ for output_line in output_lines:
+ timestamp, text = split_timestamp(output_line)
+ timeline.feed(text, timestamp or received)
+ timeline.finish(received)
+ 
+ def _append_log(self, build_info: dict, line_text: str):
+ """Append a line to the combined build log and wake up stream subscribers"""
+ self._append_log_lines(build_info, [line_text])
+ 
+ def _append_log_lines(self, build_info: dict, lines: List[str]):
+ """Append a batch of lines to the combined build log, waking stream subscribers once"""
+ build_info["logs"].extend(lines)
+ build_info["last_output_time"] = datetime.now()
+ metrics_service.record_log_lines(len(lines))
+ self._notify_build_update(build_info)
+ 
+ def _notify_build_update(self, build_info: dict):
+ """Wake every stream waiting on this build by swapping in a fresh event"""
+ updated = build_info.get("updated")
+ build_info["updated"] = asyncio.Event()
+ if updated is not None:
+ updated.set()
 
 # Create global service instance
 build_service = BuildService()
@@ -21,6 +21,9 @@ from app.models.dashboard_models import DashboardStats, SuccessRate, BuildIssue,
 from app.core.config import settings
 from app.services.environment_service import EnvironmentService
 from app.services.build_service import build_service
+from app.services.build_history_service import build_history_service
+from app.services.metrics_service import metrics_service
+from app.services.runtime_service import runtime_service
 
 class DashboardService:
  """Service for dashboard analytics and statistics"""
@@ -28,6 +31,7 @@ class DashboardService:
  def __init__(self):
  self.environment_service = EnvironmentService()
  
+ @metrics_service.dashboard_stats_duration.time()
  def get_dashboard_stats(self) -> DashboardStats:
  """Get comprehensive dashboard statistics"""
  try:
@@ -85,8 +89,7 @@ class DashboardService:
  
  # Get currently building environments
  for build_id, build_info in build_service.running_builds.items():
- process = build_info.get("process")
- if process and process.returncode is None:
+ if build_service.is_build_active(build_info):
  current_builds.append(CurrentBuild(
  build_id=build_id,
  environments=build_info["environments"],
@@ -116,6 +119,7 @@ class DashboardService:
  "details": current_builds
  },
  success_rate=success_rate,
+ container_runtime=runtime_service.cached_capabilities(),
  last_updated=datetime.now().isoformat()
  )
  
@@ -128,15 +132,8 @@ class DashboardService:
  try:
  cutoff_date = datetime.now() - timedelta(days=30)
  
- total_builds = 0
- successful_builds = 0
- 
- # Check completed builds
- for build_id, build_info in build_service.completed_builds.items():
- if build_info.get("start_time") and build_info["start_time"] > cutoff_date:
- total_builds += 1
- if build_info.get("return_code") == 0:
- successful_builds += 1
+ # Finished builds come from an indexed query on the history store
+ successful_builds, total_builds = build_history_service.success_rate(30)
  
  # Check running builds (count as in-progress)
  for build_id, build_info in build_service.running_builds.items():
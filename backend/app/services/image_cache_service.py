@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/services/image_cache_service.py - Build image cache retention
+
+import asyncio
+import json
+from typing import Callable, Dict, List, Set
+
+from app.core.config import settings
+from app.services.build_cache_service import build_cache_service, ENVIRONMENT_LABEL, FINGERPRINT_LABEL
+
+class ImageCacheService:
+ """Keeps labelled build images and intermediate layers within a disk budget, evicting LRU"""
+ 
+ def __init__(self):
+ self._gc_lock = asyncio.Lock()
+ 
+ async def list_cached_images(self, container_runtime: str) -> List[dict]:
+ """Images (final, builder-stage and intermediate) carrying the environment label"""
+ ids = await self._run(
+ container_runtime, "images", "--all", "--quiet", "--no-trunc",
+ "--filter", f"label={ENVIRONMENT_LABEL}"
+ )
+ image_ids = sorted(set(ids.split())) if ids else []
+ if not image_ids:
+ return []
+ 
+ inspected = await self._run(container_runtime, "image", "inspect", *image_ids)
+ try:
+ details = json.loads(inspected or "[]")
+ except json.JSONDecodeError:
+ return []
+ 
+ images = []
+ for image in details:
+ labels = image.get("Labels") or (image.get("Config") or {}).get("Labels") or {}
+ images.append({
+ "id": image.get("Id"),
+ "tags": [tag for tag in image.get("RepoTags") or [] if not tag.startswith("<none>")],
+ "size": image.get("Size", 0),
+ "created": str(image.get("Created", "")),
+ "environment": labels.get(ENVIRONMENT_LABEL),
+ "fingerprint": labels.get(FINGERPRINT_LABEL, "")
+ })
+ return images
+ 
+ async def collect_garbage(self, container_runtime: str, protected_environments: Callable[[], Set[str]]) -> int:
+ """Evict least recently used image groups until the cache fits IMAGE_CACHE_BUDGET_GB"""
+ budget_bytes = int(settings.IMAGE_CACHE_BUDGET_GB * 1024 ** 3)
+ if budget_bytes <= 0 or self._gc_lock.locked():
+ return 0
+ 
+ async with self._gc_lock:
+ # One group per (environment, fingerprint): the final image plus its builder and intermediate layers
+ groups: Dict[tuple, List[dict]] = {}
+ for image in await self.list_cached_images(container_runtime):
+ groups.setdefault((image["environment"], image["fingerprint"]), []).append(image)
+ 
+ # Layers are shared down a chain, so the largest image approximates a group's footprint
+ sizes = {key: max(image["size"] for image in images) for key, images in groups.items()}
+ total = sum(sizes.values())
+ if total <= budget_bytes:
+ return 0
+ 
+ # Fingerprints no longer in the build cache index go first, then least recently used
+ last_used = build_cache_service.last_used()
+ eviction_order = sorted(
+ groups,
+ key=lambda key: (key[1] in last_used, last_used.get(key[1]) or max(i["created"] for i in groups[key]))
+ )
+ 
+ evicted = 0
+ for key in eviction_order:
+ if total <= budget_bytes:
+ break
+ 
+ # Re-checked per group, builds may have started since the collection began
+ if key[0] in protected_environments():
+ continue
+ 
+ # Newest first so children go before the layers they are built on
+ removed = 0
+ for image in sorted(groups[key], key=lambda i: i["created"], reverse=True):
+ # rmi by id refuses images with several tags; untagging all of them in one call removes the image
+ if await self._run(container_runtime, "rmi", *(image["tags"] or [image["id"]])) is not None:
+ removed += 1
+ 
+ if removed:
+ total -= sizes[key]
+ evicted += removed
+ print(f"️ Evicted {removed} cached images of {key[0]} ({key[1][:12] or 'unlabelled'})")
+ 
+ print(f"Professional Reporting Image cache: {total / 1024 ** 3:.1f} GiB of {settings.IMAGE_CACHE_BUDGET_GB} GiB after evicting {evicted} images")
+ return evicted
+ 
+ async def _run(self, container_runtime: str, *args: str):
+ """Run a runtime command, returning stdout or None on failure"""
+ try:
+ process = await asyncio.create_subprocess_exec(
+ container_runtime, *args,
+ stdout=asyncio.subprocess.PIPE,
+ stderr=asyncio.subprocess.PIPE
+ )
+ stdout, _ = await process.communicate()
+ except FileNotFoundError:
+ return None
+ return stdout.decode('utf-8', errors='replace') if process.returncode == 0 else None
+
+# Create global service instance
+image_cache_service = ImageCacheService()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/services/image_prepull_service.py - Background base image pre-pull
+
+import asyncio
+import re
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from app.core.config import settings
+from app.models.build_models import BaseImagePullStatus
+from app.utils.container_utils import get_image_size
+from app.utils.host_utils import check_build_host
+
+BASE_IMAGE_PATTERN = re.compile(r'base_image:.*?name:\s*[\'"]?([^\s\'"]+)', re.S)
+
+def read_base_image(ee_file: Path) -> Optional[str]:
+ """Base image of an execution-environment.yml (version 3 images.base_image or older EE_BASE_IMAGE)"""
+ try:
+ content = ee_file.read_text()
+ except OSError:
+ return None
+ 
+ try:
+ ee_config = yaml.safe_load(content) or {}
+ base_image = ((ee_config.get("images") or {}).get("base_image") or {}).get("name") \
+ or (ee_config.get("build_arg_defaults") or {}).get("EE_BASE_IMAGE")
+ if base_image:
+ return base_image
+ except (yaml.YAMLError, AttributeError):
+ pass
+ 
+ # Hand-edited files that do not parse still name their base image
+ match = BASE_IMAGE_PATTERN.search(content)
+ return match.group(1) if match else None
+
+class ImagePrepullService:
+ """Keeps base images warm by pulling them in the background with bounded concurrency and low IO priority"""
+ 
+ def __init__(self):
+ self.pulls: Dict[str, BaseImagePullStatus] = {}
+ self._task: Optional[asyncio.Task] = None
+ self._wakeup = asyncio.Event()
+ self._pull_locks: Dict[str, asyncio.Lock] = {} # One pull per image at a time, background or for a build
+ 
+ def base_images(self) -> Dict[str, List[str]]:
+ """Every known base image, de-duplicated, with what references it"""
+ images: Dict[str, List[str]] = {}
+ for key, image in settings.AVAILABLE_BASE_IMAGES.items():
+ images.setdefault(image["name"], []).append(f"base-images/{key}")
+ 
+ environments_dir = Path(settings.ENVIRONMENTS_DIR)
+ if environments_dir.exists():
+ for env_dir in sorted(environments_dir.iterdir()):
+ if not env_dir.is_dir() or env_dir.name.startswith('.'):
+ continue
+ base_image = read_base_image(env_dir / "execution-environment.yml")
+ # Templated names can only be resolved at build time
+ if base_image and "{{" not in base_image:
+ images.setdefault(base_image, []).append(env_dir.name)
+ return images
+ 
+ def start(self):
+ """Start the periodic pre-pull loop"""
+ if settings.BASE_IMAGE_PREPULL_ENABLED and (self._task is None or self._task.done()):
+ self._task = asyncio.create_task(self._prepull_loop())
+ 
+ async def stop(self):
+ if self._task:
+ self._task.cancel()
+ try:
+ await self._task
+ except asyncio.CancelledError:
+ pass
+ 
+ def trigger(self):
+ """Run a pre-pull round now instead of waiting for the interval"""
+ self._wakeup.set()
+ 
+ def get_status(self) -> List[BaseImagePullStatus]:
+ return list(self.pulls.values())
+ 
+ async def prepull_all(self):
+ """Pull every base image once, at most BASE_IMAGE_PREPULL_CONCURRENCY at a time"""
+ semaphore = asyncio.Semaphore(max(1, settings.BASE_IMAGE_PREPULL_CONCURRENCY))
+ images = self.base_images()
+ storage = await self._build_storage()
+ for image, sources in images.items():
+ status = self.pulls.setdefault(image, BaseImagePullStatus(image=image))
+ status.sources = sources
+ if status.state != "pulling":
+ status.state = "queued"
+ 
+ await asyncio.gather(*(self._pull(image, storage, semaphore) for image in images))
+ pulled = sum(1 for image in images if self.pulls[image].state == "pulled")
+ print(f"Professional Reporting Base image pre-pull: {pulled}/{len(images)} images up to date")
+ 
+ async def _prepull_loop(self):
+ while True:
+ try:
+ await self.prepull_all()
+ except Exception as e:
+ print(f"[WARNING] Base image pre-pull round failed: {e}")
+ 
+ try:
+ await asyncio.wait_for(self._wakeup.wait(), settings.BASE_IMAGE_PREPULL_INTERVAL_MINUTES * 60)
+ except asyncio.TimeoutError:
+ pass
+ self._wakeup.clear()
+ 
+ async def ensure_pulled(self, image: str, container_runtime: str) -> Tuple[bool, str]:
+ """Pull an image a build is about to use unless it is local already; returns (available, output)"""
+ async with self._pull_locks.setdefault(image, asyncio.Lock()):
+ if await get_image_size(image, container_runtime) is not None:
+ return True, ""
+ 
+ # Digest references can't be tagged, they are pulled from their own registry
+ source = image if "@" in image else self._pull_source(image)
+ returncode, output = await self._run(container_runtime, "pull", "--quiet", *self._tls_args(container_runtime), source)
+ if returncode == 0 and source != image:
+ returncode, output = await self._run(container_runtime, "tag", source, image)
+ return returncode == 0, output
+ 
+ async def _build_storage(self) -> str:
+ """Image storage the next builds read base images from, "root" when they run through the playbook"""
+ # docker builds share the daemon's storage whoever runs them
+ if settings.CONTAINER_RUNTIME != "podman":
+ return "rootless"
+ executor = settings.BUILD_EXECUTOR.lower()
+ if executor == "auto":
+ # Same choice start_build makes: the playbook until the host is bootstrapped
+ executor = "playbook" if await check_build_host(settings.CONTAINER_RUNTIME) else "parallel"
+ return "root" if executor == "playbook" else "rootless"
+ 
+ async def _pull(self, image: str, storage: str, semaphore: asyncio.Semaphore):
+ status = self.pulls[image]
+ async with semaphore, self._pull_locks.setdefault(image, asyncio.Lock()):
+ status.state = "pulling"
+ status.storage = storage
+ status.started_at = datetime.now()
+ start = time.monotonic()
+ 
+ # Playbook builds run podman as root, so their base images must be in root's storage (sudo, non-interactive)
+ runtime = ["sudo", "-n", settings.CONTAINER_RUNTIME] if storage == "root" else [settings.CONTAINER_RUNTIME]
+ source = self._pull_source(image)
+ returncode, output = await self._run_low_priority(*runtime, "pull", "--quiet", *self._tls_args(), source)
+ if returncode == 0 and source != image:
+ # Pulled from the stand-in registry, tag it under the name builds ask for
+ returncode, output = await self._run_low_priority(*runtime, "tag", source, image)
+ 
+ status.finished_at = datetime.now()
+ status.duration_seconds = round(time.monotonic() - start, 1)
+ if returncode == 0:
+ status.state = "pulled"
+ status.error = None
+ else:
+ status.state = "failed"
+ status.error = output.strip()[-500:] or f"exit code {returncode}"
+ print(f"[WARNING] Could not pre-pull {image}: {status.error}")
+ 
+ def _pull_source(self, image: str) -> str:
+ """Image reference to pull, redirected to BASE_IMAGE_PREPULL_MIRROR when set (e.g. a local test registry)"""
+ mirror = settings.BASE_IMAGE_PREPULL_MIRROR.rstrip('/')
+ if not mirror:
+ return image
+ registry, _, path = image.partition('/')
+ return f"{mirror}/{path}" if '.' in registry or ':' in registry else f"{mirror}/{image}"
+ 
+ def _tls_args(self, container_runtime: Optional[str] = None) -> List[str]:
+ # docker has no per-pull TLS switch, it relies on the daemon's insecure-registries
+ if (container_runtime or settings.CONTAINER_RUNTIME) == "podman" and not settings.BASE_IMAGE_PREPULL_TLS_VERIFY:
+ return ["--tls-verify=false"]
+ return []
+ 
+ async def _run_low_priority(self, *cmd: str):
+ """Run a command in the idle IO class at the lowest CPU priority; returns (returncode, output)"""
+ prefix = []
+ if shutil.which("ionice"):
+ prefix += ["ionice", "-c", "3"]
+ if shutil.which("nice"):
+ prefix += ["nice", "-n", "19"]
+ return await self._run(*prefix, *cmd)
+ 
+ async def _run(self, *cmd: str):
+ """Run a command; returns (returncode, output)"""
+ try:
+ process = await asyncio.create_subprocess_exec(
+ *cmd,
+ stdout=asyncio.subprocess.PIPE,
+ stderr=asyncio.subprocess.STDOUT
+ )
+ stdout, _ = await process.communicate()
+ except FileNotFoundError as e:
+ return 127, str(e)
+ return process.returncode, stdout.decode('utf-8', errors='replace')
+
+# Create global service instance
+image_prepull_service = ImagePrepullService()
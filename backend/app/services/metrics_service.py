@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/services/metrics_service.py - Prometheus Metrics Service
+
+import time
+from collections import deque
+from typing import Callable, List
+
+from app.utils.metrics import Counter, Gauge, Histogram, render_metrics
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+BUILD_DURATION_BUCKETS = (60, 120, 300, 600, 900, 1200, 1800, 2700, 3600, 5400, 7200)
+LOG_RATE_WINDOW_SECONDS = 60
+
+class MetricsService:
+ """Service collecting build and API metrics for the /metrics endpoint"""
+ 
+ def __init__(self):
+ self.builds_total = Counter(
+ "ee_builder_builds_total", "Finished builds by outcome", ["status"]
+ )
+ self.environment_build_duration = Histogram(
+ "ee_builder_environment_build_duration_seconds",
+ "Wall-clock time to build one environment (cache hits excluded)",
+ ["environment", "status"],
+ buckets=BUILD_DURATION_BUCKETS
+ )
+ self.queued_builds = Gauge("ee_builder_queued_builds", "Builds waiting for free build slots")
+ self.running_builds = Gauge("ee_builder_running_builds", "Builds currently running")
+ self.build_slots_in_use = Gauge("ee_builder_build_slots_in_use", "Environment build slots held by running builds")
+ self.log_lines_total = Counter("ee_builder_log_lines_total", "Build log lines ingested")
+ self.log_lines_per_second = Gauge(
+ "ee_builder_log_lines_per_second", f"Build log lines ingested per second over the last {LOG_RATE_WINDOW_SECONDS}s"
+ )
+ self.http_request_duration = Histogram(
+ "ee_builder_http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+ )
+ self.dashboard_stats_duration = Histogram(
+ "ee_builder_dashboard_stats_duration_seconds", "Time spent computing dashboard statistics"
+ )
+ 
+ self._collectors: List[Callable[[], None]] = []
+ self._log_rate = deque(maxlen=LOG_RATE_WINDOW_SECONDS) # [second, lines] per second with log output
+ 
+ def register_collector(self, collector: Callable[[], None]):
+ """Register a callback that refreshes gauges right before each scrape"""
+ self._collectors.append(collector)
+ 
+ def record_build(self, build_info: dict):
+ """Count a finished build and observe the duration of each environment it built"""
+ self.builds_total.inc(status=build_info.get("status") or "unknown")
+ 
+ for env in build_info["environments"]:
+ if env in build_info.get("cached_builds", []):
+ continue
+ 
+ env_info = build_info.get("environment_status", {}).get(env) or {}
+ start_time, end_time = env_info.get("start_time"), env_info.get("end_time")
+ timeline = build_info.get("phases", {}).get(env)
+ if not (start_time and end_time) and timeline and timeline.phases:
+ # Playbook builds only know per-environment times from the phase timeline
+ start_time, end_time = timeline.phases[0]["start_time"], timeline.phases[-1]["end_time"]
+ if not (start_time and end_time):
+ continue
+ 
+ if env in build_info.get("successful_builds", []):
+ status = "completed"
+ elif env in build_info.get("failed_builds", []):
+ status = "failed"
+ else:
+ status = env_info.get("status") or build_info.get("status") or "unknown"
+ self.environment_build_duration.observe((end_time - start_time).total_seconds(), environment=env, status=status)
+ 
+ def record_log_lines(self, count: int = 1):
+ """Count build log lines for the ingest counter and rate"""
+ self.log_lines_total.inc(count)
+ second = int(time.monotonic())
+ if self._log_rate and self._log_rate[-1][0] == second:
+ self._log_rate[-1][1] += count
+ else:
+ self._log_rate.append([second, count])
+ 
+ def render(self) -> str:
+ """Refresh gauges and return every metric in the Prometheus text format"""
+ for collector in self._collectors:
+ try:
+ collector()
+ except Exception as e:
+ print(f"[WARNING] Metrics collector failed: {e}")
+ 
+ now = int(time.monotonic())
+ recent_lines = sum(lines for second, lines in self._log_rate if now - second < LOG_RATE_WINDOW_SECONDS)
+ self.log_lines_per_second.set(round(recent_lines / LOG_RATE_WINDOW_SECONDS, 2))
+ 
+ return render_metrics([
+ self.builds_total,
+ self.environment_build_duration,
+ self.queued_builds,
+ self.running_builds,
+ self.build_slots_in_use,
+ self.log_lines_total,
+ self.log_lines_per_second,
+ self.http_request_duration,
+ self.dashboard_stats_duration
+ ])
+
+# Create global service instance
+metrics_service = MetricsService()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/services/runtime_service.py - Container Runtime Capability Service
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.models.dashboard_models import RuntimeCapabilities
+from app.utils.container_utils import probe_container_runtime
+
+class RuntimeService:
+ """Cached container runtime capabilities, probed once and refreshed on a TTL or after a failure"""
+ 
+ def __init__(self):
+ # runtime -> (probed at monotonic time, capabilities)
+ self._capabilities: Dict[str, tuple] = {}
+ self._probe_locks: Dict[str, asyncio.Lock] = {}
+ 
+ async def get_capabilities(self, runtime: Optional[str] = None, refresh: bool = False) -> RuntimeCapabilities:
+ """Capabilities of a runtime, probing it only when the cached entry is missing, stale or failed"""
+ runtime = runtime or settings.CONTAINER_RUNTIME
+ if not refresh and self._is_fresh(runtime):
+ return self._capabilities[runtime][1]
+ 
+ # Concurrent requests share a single probe
+ async with self._probe_locks.setdefault(runtime, asyncio.Lock()):
+ if not refresh and self._is_fresh(runtime):
+ return self._capabilities[runtime][1]
+ 
+ capabilities = RuntimeCapabilities(**await probe_container_runtime(runtime), probed_at=datetime.now())
+ self._capabilities[runtime] = (time.monotonic(), capabilities)
+ 
+ if capabilities.available:
+ print(f"[PASS] {runtime} {capabilities.version} ({'rootless' if capabilities.rootless else 'rootful'}, {capabilities.storage_driver} storage)")
+ else:
+ print(f"[WARNING] {runtime} unavailable: {capabilities.error}")
+ return capabilities
+ 
+ def cached_capabilities(self, runtime: Optional[str] = None) -> Optional[RuntimeCapabilities]:
+ """Last probe result without running a subprocess, None before the first probe"""
+ cached = self._capabilities.get(runtime or settings.CONTAINER_RUNTIME)
+ return cached[1] if cached else None
+ 
+ def invalidate(self, runtime: Optional[str] = None):
+ """Force a new probe on the next lookup, e.g. after a runtime error"""
+ self._capabilities.pop(runtime or settings.CONTAINER_RUNTIME, None)
+ 
+ async def validate_runtime(self, runtime: Optional[str] = None) -> RuntimeCapabilities:
+ """Raise RuntimeError when the runtime is not usable"""
+ capabilities = await self.get_capabilities(runtime)
+ if not capabilities.available:
+ raise RuntimeError(capabilities.error or f"{capabilities.runtime} not working properly")
+ return capabilities
+ 
+ def _is_fresh(self, runtime: str) -> bool:
+ cached = self._capabilities.get(runtime)
+ if cached is None:
+ return False
+ 
+ probed_at, capabilities = cached
+ # Failed probes are retried right away instead of waiting for the TTL
+ return capabilities.available and time.monotonic() - probed_at < settings.RUNTIME_PROBE_TTL_SECONDS
+
+# Create global service instance
+runtime_service = RuntimeService()
@@ -14,3 +14,14 @@ COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
 # backend/app/utils/__init__.py
 from .file_utils import *
 from .container_utils import *
+from .log_buffer import *
+from .resource_utils import *
+from .build_phases import *
+from .metrics import *
+from .stream_utils import *
+from .host_utils import *
+from .context_utils import *
+from .wheelhouse import *
+from .collection_cache import *
+from .build_plan import *
+from .build_schedule import *
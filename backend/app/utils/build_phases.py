@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/build_phases.py - Build phase timeline parsed from ansible-builder output
+
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+# Phases in the order they normally occur
+BUILD_PHASES = ("prepare", "pull", "wait", "base", "galaxy", "builder", "bindep", "final", "cleanup")
+
+BANNER_STAGING = re.compile(r"=== Staging (\S+) at .* ===")
+BANNER_WAITING = re.compile(r"=== Waiting for a build slot ===")
+BANNER_START = re.compile(r"=== Building (\S+) at .* ===")
+BANNER_CLEANUP = re.compile(r"=== Cleaning up (\S+) ===")
+BANNER_DONE = re.compile(r"=== Done (\S+) at .* ===")
+CONTAINERFILE_STEP = re.compile(r"\bSTEP \d+(?:/\d+)? ?: (.*)", re.IGNORECASE)
+FROM_STAGE = re.compile(r"^FROM\s+\S+(?:\s+AS\s+(\S+))?", re.IGNORECASE)
+TIMESTAMP_PREFIX = re.compile(r"^\[(\d{9,11})\] ")
+
+PULL_MARKERS = ("Trying to pull", "Getting image source signatures", "Copying blob", "Pulling from")
+CLEANUP_MARKERS = ("image prune", "podman rmi", "docker rmi")
+BINDEP_MARKERS = ("install-from-bindep",)
+
+def split_timestamp(line: str) -> Tuple[Optional[datetime], str]:
+ """Strip the `[<epoch>] ` prefix build_environments.yml puts on ansible-builder output"""
+ match = TIMESTAMP_PREFIX.match(line)
+ if not match:
+ return None, line
+ return datetime.fromtimestamp(int(match.group(1))), line[match.end():]
+
+class PhaseTimeline:
+ """Per-environment timeline of build phases recognised in the build log"""
+ 
+ def __init__(self, phases: Optional[List[dict]] = None):
+ # A timeline restored from recorded phases is already finished
+ self.phases: List[dict] = list(phases) if phases is not None else []
+ self._stage: Optional[str] = None
+ self._finished = phases is not None
+ 
+ @property
+ def current_phase(self) -> Optional[str]:
+ """Name of the phase still in progress, None before the first or after the last"""
+ if self.phases and self.phases[-1]["end_time"] is None:
+ return self.phases[-1]["phase"]
+ return None
+ 
+ def feed(self, line: str, timestamp: datetime):
+ """Advance the timeline with one log line observed at `timestamp`"""
+ if self._finished:
+ return
+ 
+ if BANNER_STAGING.search(line) or BANNER_START.search(line):
+ self._enter("prepare", timestamp)
+ return
+ if BANNER_WAITING.search(line):
+ self._enter("wait", timestamp)
+ return
+ if BANNER_DONE.search(line):
+ self.finish(timestamp)
+ return
+ if BANNER_CLEANUP.search(line) or any(marker in line for marker in CLEANUP_MARKERS):
+ self._enter("cleanup", timestamp)
+ return
+ 
+ step = CONTAINERFILE_STEP.search(line)
+ if step:
+ instruction = step.group(1).strip()
+ stage = FROM_STAGE.match(instruction)
+ if stage:
+ self._stage = (stage.group(1) or "build").lower()
+ if any(marker in instruction for marker in BINDEP_MARKERS):
+ self._enter("bindep", timestamp)
+ else:
+ self._enter(self._stage or "build", timestamp)
+ return
+ 
+ if any(marker in line for marker in PULL_MARKERS):
+ self._enter("pull", timestamp)
+ 
+ def finish(self, timestamp: datetime):
+ """Close the open phase, later lines are ignored"""
+ self._close(timestamp)
+ self._finished = True
+ 
+ def snapshot(self) -> List[dict]:
+ """Phases with durations, the open phase measured up to now"""
+ now = datetime.now()
+ return [
+ {
+ **phase,
+ "duration_seconds": round(((phase["end_time"] or now) - phase["start_time"]).total_seconds(), 1)
+ } for phase in self.phases
+ ]
+ 
+ def durations(self) -> dict:
+ """Total seconds spent in each phase"""
+ totals = {}
+ for phase in self.snapshot():
+ totals[phase["phase"]] = round(totals.get(phase["phase"], 0.0) + phase["duration_seconds"], 1)
+ return totals
+ 
+ def _enter(self, phase: str, timestamp: datetime):
+ """Close the open phase and start `phase`, unless it is already open"""
+ if self.current_phase == phase:
+ return
+ self._close(timestamp)
+ self.phases.append({"phase": phase, "start_time": timestamp, "end_time": None})
+ 
+ def _close(self, timestamp: datetime):
+ """End the open phase at `timestamp`"""
+ if self.phases and self.phases[-1]["end_time"] is None:
+ self.phases[-1]["end_time"] = max(timestamp, self.phases[-1]["start_time"])
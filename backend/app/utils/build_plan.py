@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/build_plan.py - Shared layer planning across environment builds
+
+import hashlib
+import json
+from typing import Dict, List, NamedTuple, Optional
+
+SHARED_LAYER_PREFIX = "shared-" # Environment label of intermediate layers several environments build on
+
+# Definition parts that shape the base stage, which the galaxy, builder and final stages are built FROM
+BASE_STAGE_DEPENDENCIES = ("ansible_core", "ansible_runner", "python_interpreter")
+BASE_STAGE_STEPS = ("prepend_base", "append_base")
+# Steps that open the builder and final stages, ahead of anything environment specific
+STAGE_PREFIX_STEPS = ("prepend_builder", "prepend_final")
+
+class LayerKeys(NamedTuple):
+ base: str # Equal when the base stage layers are identical
+ stage: str # Equal when the builder and final stage prefixes are identical too
+
+def _normalize_steps(steps) -> List[str]:
+ """Build steps as a list of non-empty lines, whether given as a block string or a list"""
+ if not steps:
+ return []
+ if isinstance(steps, str):
+ steps = steps.splitlines()
+ return [str(step).strip() for step in steps if str(step).strip()]
+
+def _digest(value) -> str:
+ return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+def layer_keys(ee_definition: dict) -> Optional[LayerKeys]:
+ """Hash the inputs of the layers an environment can share with others, None without a base image"""
+ images = ee_definition.get("images") or {}
+ build_args = ee_definition.get("build_arg_defaults") or {}
+ base_image = ((images.get("base_image") or {}).get("name") if isinstance(images, dict) else None) or build_args.get("EE_BASE_IMAGE")
+ if not base_image:
+ return None
+ 
+ dependencies = ee_definition.get("dependencies") or {}
+ steps = ee_definition.get("additional_build_steps") or {}
+ options = {key: value for key, value in (ee_definition.get("options") or {}).items() if key != "tags"}
+ 
+ base_inputs = {
+ "version": ee_definition.get("version", 1),
+ "base_image": base_image,
+ "build_arg_defaults": build_args,
+ "options": options,
+ "dependencies": {key: dependencies.get(key) for key in BASE_STAGE_DEPENDENCIES},
+ "additional_build_files": ee_definition.get("additional_build_files") or [],
+ "steps": {key: _normalize_steps(steps.get(key)) for key in BASE_STAGE_STEPS}
+ }
+ stage_inputs = {key: _normalize_steps(steps.get(key)) for key in STAGE_PREFIX_STEPS}
+ 
+ base = _digest(base_inputs)
+ return LayerKeys(base=base, stage=_digest([base, stage_inputs]))
+
+def shared_layer_group(base_key: str) -> str:
+ """Environment label value for the layers of every environment with this base key"""
+ return f"{SHARED_LAYER_PREFIX}{base_key[:12]}"
+
+def shared_base_keys(keys: Dict[str, Optional[LayerKeys]]) -> Dict[str, str]:
+ """Base key of each environment whose base stage is shared with another selected environment"""
+ counts: Dict[str, int] = {}
+ for env_keys in keys.values():
+ if env_keys:
+ counts[env_keys.base] = counts.get(env_keys.base, 0) + 1
+ return {env: env_keys.base for env, env_keys in keys.items() if env_keys and counts[env_keys.base] > 1}
+
+def plan_shared_layers(keys: Dict[str, Optional[LayerKeys]]) -> Dict[str, str]:
+ """Map each environment to the environment whose layers it waits for
+ 
+ The first environment of each base key builds the base stage. The first of each
+ stage key group builds the stage prefixes on top of it, and the other members
+ start once those layers are in the runtime's layer cache. Order follows `keys`.
+ """
+ base_leaders: Dict[str, str] = {}
+ stage_groups: Dict[str, List[str]] = {}
+ for env, env_keys in keys.items():
+ if env_keys:
+ base_leaders.setdefault(env_keys.base, env)
+ stage_groups.setdefault(env_keys.stage, []).append(env)
+ 
+ dependencies = {}
+ for members in stage_groups.values():
+ base_leader = base_leaders[keys[members[0]].base]
+ stage_leader = base_leader if base_leader in members else members[0]
+ if stage_leader != base_leader:
+ dependencies[stage_leader] = base_leader
+ for env in members:
+ if env != stage_leader:
+ dependencies[env] = stage_leader
+ return dependencies
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/build_schedule.py - Longest-first, memory-aware scheduling of environment jobs
+
+import asyncio
+from typing import Collection, Dict, Iterable, List, NamedTuple, Optional
+
+class JobEstimate(NamedTuple):
+ duration_seconds: float
+ peak_rss_bytes: int
+ from_history: bool = True # False when no successful build was recorded yet
+
+class ScheduledJob(NamedTuple):
+ start_seconds: float # Offsets from the start of the batch
+ finish_seconds: float
+
+def lpt_order(estimates: Dict[str, JobEstimate]) -> List[str]:
+ """Longest predicted duration first, the larger memory footprint breaking ties"""
+ return sorted(estimates, key=lambda env: (-estimates[env].duration_seconds, -estimates[env].peak_rss_bytes, env))
+
+def next_job(
+ order: List[str],
+ ready: Collection[str],
+ running: Iterable[str],
+ estimates: Dict[str, JobEstimate],
+ memory_budget_bytes: int
+) -> Optional[str]:
+ """First ready job in `order` whose peak memory fits next to the running jobs
+ 
+ A job that does not fit is passed over for shorter ones that do. With nothing
+ running the first ready job always starts, so an oversized job still runs alone.
+ """
+ running = list(running)
+ used = sum(estimates[env].peak_rss_bytes for env in running)
+ for env in order:
+ if env not in ready:
+ continue
+ if not running or memory_budget_bytes <= 0 or used + estimates[env].peak_rss_bytes <= memory_budget_bytes:
+ return env
+ return None
+
+def simulate_schedule(
+ estimates: Dict[str, JobEstimate],
+ workers: int,
+ memory_budget_bytes: int = 0,
+ dependencies: Optional[Dict[str, str]] = None
+) -> Dict[str, ScheduledJob]:
+ """Replay the dispatcher over the predicted durations to get each job's start and finish"""
+ dependencies = {env: dependency for env, dependency in (dependencies or {}).items() if dependency in estimates}
+ order = lpt_order(estimates)
+ schedule: Dict[str, ScheduledJob] = {}
+ running: Dict[str, float] = {} # env -> predicted finish
+ done = set()
+ clock = 0.0
+ 
+ while len(done) < len(estimates):
+ ready = {
+ env for env in estimates
+ if env not in schedule and (env not in dependencies or dependencies[env] in done)
+ }
+ env = next_job(order, ready, running, estimates, memory_budget_bytes) if len(running) < max(1, workers) else None
+ if env:
+ running[env] = clock + estimates[env].duration_seconds
+ schedule[env] = ScheduledJob(clock, running[env])
+ continue
+ 
+ # Nothing else can start before the next job finishes
+ finished = min(running, key=running.get)
+ clock = running.pop(finished)
+ done.add(finished)
+ 
+ return schedule
+
+def makespan(schedule: Dict[str, ScheduledJob]) -> float:
+ """Predicted duration of the whole batch"""
+ return max((job.finish_seconds for job in schedule.values()), default=0.0)
+
+class BuildSlots:
+ """Admits environment jobs longest first within a worker count and a memory budget"""
+ 
+ def __init__(
+ self,
+ estimates: Dict[str, JobEstimate],
+ workers: int,
+ memory_budget_bytes: int = 0,
+ ready: Iterable[str] = ()
+ ):
+ self._estimates = estimates
+ self._order = lpt_order(estimates)
+ self._workers = max(1, workers)
+ self._memory_budget_bytes = memory_budget_bytes
+ # Jobs that may start right away, so whichever task runs first can't jump the order
+ self._waiting = set(ready)
+ self._running = set()
+ self._condition = asyncio.Condition()
+ 
+ def _next(self) -> Optional[str]:
+ if len(self._running) >= self._workers:
+ return None
+ return next_job(self._order, self._waiting, self._running, self._estimates, self._memory_budget_bytes)
+ 
+ async def acquire(self, env: str):
+ """Wait until `env` is the job to start next and take its slot"""
+ async with self._condition:
+ self._waiting.add(env)
+ try:
+ await self._condition.wait_for(lambda: self._next() == env)
+ finally:
+ self._waiting.discard(env)
+ self._running.add(env)
+ # A small job may still fit beside this one
+ self._condition.notify_all()
+ 
+ async def release(self, env: str):
+ """Free the slot of `env`, or withdraw it if it will never ask for one"""
+ async with self._condition:
+ self._running.discard(env)
+ self._waiting.discard(env)
+ self._condition.notify_all()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/collection_cache.py - Shared Ansible collection tarball cache
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import yaml
+
+COLLECTION_CACHE_MOUNT = "/collection-cache" # Where builds see the host collection cache
+VERSION_CONSTRAINT = re.compile(r'^\s*(==|!=|>=|<=|>|<|=)?\s*(\S+)\s*$')
+
+class CachedCollection(NamedTuple):
+ name: str # namespace.name
+ version: str
+ file_name: str
+ dependencies: Dict[str, str]
+
+def version_key(version: str) -> Tuple:
+ """Sort key for semantic versions, pre-releases before their release"""
+ core, _, prerelease = version.partition('-')
+ numbers = tuple(int(part) if part.isdigit() else 0 for part in core.split('+')[0].split('.'))
+ return numbers + (0,) * (3 - len(numbers)), prerelease == "", prerelease
+
+def version_matches(version: str, requirement: Optional[str]) -> bool:
+ """Check a version against a galaxy constraint such as '>=1.5.0,<2.0.0' or '*'"""
+ if not requirement or requirement.strip() == '*':
+ return '-' not in version # Like ansible-galaxy, '*' skips pre-releases
+ 
+ for constraint in requirement.split(','):
+ match = VERSION_CONSTRAINT.match(constraint)
+ if not match:
+ return False
+ operator, wanted = match.group(1) or '==', match.group(2)
+ have, want = version_key(version), version_key(wanted)
+ if not {
+ '==': have == want, '=': have == want, '!=': have != want,
+ '>=': have >= want, '<=': have <= want, '>': have > want, '<': have < want
+ }[operator]:
+ return False
+ return True
+
+def read_collection_manifest(tarball: Path) -> Optional[CachedCollection]:
+ """Identify a collection tarball from its MANIFEST.json"""
+ try:
+ with tarfile.open(tarball, 'r:gz') as tar:
+ member = tar.extractfile("MANIFEST.json")
+ info = json.load(member)["collection_info"]
+ except (OSError, KeyError, ValueError, tarfile.TarError):
+ return None
+ return CachedCollection(
+ f"{info['namespace']}.{info['name']}", info['version'], tarball.name, info.get('dependencies') or {}
+ )
+
+def scan_collection_cache(cache_dir: Path) -> Dict[str, List[CachedCollection]]:
+ """Cached collections by name, newest version first"""
+ collections: Dict[str, List[CachedCollection]] = {}
+ for tarball in sorted(cache_dir.glob("*.tar.gz")) if cache_dir.is_dir() else []:
+ collection = read_collection_manifest(tarball)
+ if collection:
+ collections.setdefault(collection.name, []).append(collection)
+ for versions in collections.values():
+ versions.sort(key=lambda c: version_key(c.version), reverse=True)
+ return collections
+
+def add_to_collection_cache(tarball: Path, cache_dir: Path) -> Optional[CachedCollection]:
+ """Store a tarball under its namespace-name-version file name, skipping identical content"""
+ collection = read_collection_manifest(tarball)
+ if collection is None:
+ print(f"[WARNING] Skipping {tarball}, not a collection tarball")
+ return None
+ 
+ cache_dir.mkdir(parents=True, exist_ok=True)
+ target = cache_dir / f"{collection.name.replace('.', '-')}-{collection.version}.tar.gz"
+ if target.exists() and _sha256(target) == _sha256(tarball):
+ return collection._replace(file_name=target.name)
+ 
+ temp_path = target.with_name(f".{target.name}.tmp")
+ shutil.copyfile(tarball, temp_path)
+ os.replace(temp_path, target)
+ return collection._replace(file_name=target.name)
+
+def galaxy_requirements(env_dir: Path, ee_definition: dict) -> dict:
+ """The galaxy requirements of an environment, inline or from the file its definition names"""
+ galaxy = (ee_definition.get("dependencies") or {}).get("galaxy")
+ if isinstance(galaxy, str):
+ try:
+ galaxy = yaml.safe_load((env_dir / galaxy).read_text())
+ except (OSError, yaml.YAMLError):
+ return {}
+ return galaxy if isinstance(galaxy, dict) else {}
+
+def _collection_entries(galaxy: dict) -> List[dict]:
+ entries = []
+ for entry in galaxy.get("collections") or []:
+ entry = {"name": entry} if isinstance(entry, str) else dict(entry)
+ entries.append(entry)
+ return entries
+
+def resolve_from_cache(galaxy: dict, cache: Dict[str, List[CachedCollection]]) -> Tuple[List[CachedCollection], List[str]]:
+ """Pick cached tarballs for the requested collections and their dependencies; returns (picked, missing)"""
+ picked: Dict[str, CachedCollection] = {}
+ missing = []
+ pending = [(entry.get("name"), entry.get("version")) for entry in _collection_entries(galaxy)]
+ 
+ while pending:
+ name, constraint = pending.pop()
+ # Only galaxy-style names can come from the cache (not git URLs, local paths or other types)
+ if not name or not re.match(r'^\w+\.\w+$', name):
+ missing.append(str(name))
+ continue
+ 
+ if name in picked:
+ if not version_matches(picked[name].version, constraint):
+ missing.append(f"{name}:{constraint}")
+ continue
+ 
+ candidate = next((c for c in cache.get(name, []) if version_matches(c.version, constraint)), None)
+ if candidate is None:
+ missing.append(f"{name}:{constraint or '*'}")
+ continue
+ 
+ picked[name] = candidate
+ pending.extend(candidate.dependencies.items())
+ 
+ return list(picked.values()), missing
+
+def use_collection_cache(ee_definition: dict, env_dir: Path, cache_dir: Path) -> List[str]:
+ """Point a version 3 definition's collections at cached tarballs; returns what is missing from the cache"""
+ if str(ee_definition.get("version")) != "3":
+ return ["a version 3 execution-environment.yml"]
+ 
+ galaxy = galaxy_requirements(env_dir, ee_definition)
+ if not _collection_entries(galaxy):
+ return []
+ 
+ picked, missing = resolve_from_cache(galaxy, scan_collection_cache(cache_dir))
+ if missing:
+ return missing
+ 
+ # Every collection and dependency is local, so the galaxy stage installs without contacting a server
+ ee_definition.setdefault("dependencies", {})["galaxy"] = {
+ **({"roles": galaxy["roles"]} if galaxy.get("roles") else {}),
+ "collections": [
+ {"name": f"{COLLECTION_CACHE_MOUNT}/{collection.file_name}", "type": "file"}
+ for collection in sorted(picked)
+ ]
+ }
+ build_args = ee_definition.setdefault("build_arg_defaults", {})
+ options = build_args.get("ANSIBLE_GALAXY_CLI_COLLECTION_OPTS") or ""
+ if "--offline" not in options.split():
+ build_args["ANSIBLE_GALAXY_CLI_COLLECTION_OPTS"] = f"{options} --offline".strip()
+ return []
+
+def collection_cache_volume_args(cache_dir: Path) -> List[str]:
+ """podman build arguments mounting the collection cache into every RUN step"""
+ return [f"--volume {cache_dir}:{COLLECTION_CACHE_MOUNT}:z"]
+
+def collect_collection_requirements(environments_dir: Path) -> List[dict]:
+ """Union of the collection requirements of every environment"""
+ requirements = []
+ for env_dir in sorted(p for p in environments_dir.iterdir() if p.is_dir() and not p.name.startswith('.')):
+ try:
+ ee_definition = yaml.safe_load((env_dir / "execution-environment.yml").read_text()) or {}
+ except (OSError, yaml.YAMLError):
+ continue
+ if not isinstance(ee_definition, dict):
+ continue
+ 
+ for entry in _collection_entries(galaxy_requirements(env_dir, ee_definition)):
+ if entry not in requirements:
+ requirements.append(entry)
+ return requirements
+
+def populate_collection_cache(requirements: Iterable[dict], cache_dir: Path, source: Optional[Path] = None) -> int:
+ """Download the requirements (with dependencies) into the cache, or import a local tarball directory offline"""
+ if source:
+ added = [add_to_collection_cache(tarball, cache_dir) for tarball in sorted(source.glob("*.tar.gz"))]
+ print(f"[PASS] Imported {len([c for c in added if c])} collection tarballs from {source}")
+ return 0
+ 
+ requirements = list(requirements)
+ if not requirements:
+ return 0
+ 
+ returncode = 0
+ with tempfile.TemporaryDirectory() as download_dir:
+ # One download per entry so conflicting constraints across environments all get cached
+ for entry in requirements:
+ requirements_file = Path(download_dir) / "requirements.yml"
+ requirements_file.write_text(yaml.dump({"collections": [entry]}))
+ result = subprocess.run([
+ "ansible-galaxy", "collection", "download", "-r", str(requirements_file),
+ "-p", str(Path(download_dir) / "collections")
+ ])
+ returncode = returncode or result.returncode
+ 
+ for tarball in sorted((Path(download_dir) / "collections").glob("*.tar.gz")):
+ add_to_collection_cache(tarball, cache_dir)
+ return returncode
+
+def _sha256(file_path: Path) -> str:
+ digest = hashlib.sha256()
+ with open(file_path, 'rb') as f:
+ for block in iter(lambda: f.read(1024 * 1024), b""):
+ digest.update(block)
+ return digest.hexdigest()
+
+def main(argv: Optional[List[str]] = None) -> int:
+ # cd backend && python -m app.utils.collection_cache [--source DIR]
+ from app.core.config import settings
+ 
+ parser = argparse.ArgumentParser(description="Pre-fill the collection cache from every environment's galaxy requirements")
+ parser.add_argument("--cache-dir", default=settings.COLLECTION_CACHE_DIR)
+ parser.add_argument("--source", help="Directory of collection tarballs to import without Galaxy access")
+ args = parser.parse_args(argv)
+ 
+ requirements = collect_collection_requirements(Path(settings.ENVIRONMENTS_DIR))
+ print(f"Installation Filling {args.cache_dir} for {len(requirements)} collection requirements")
+ return populate_collection_cache(
+ requirements,
+ Path(args.cache_dir).expanduser(),
+ Path(args.source).expanduser() if args.source else None
+ )
+
+if __name__ == "__main__":
+ sys.exit(main())
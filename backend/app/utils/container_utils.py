@@ -14,6 +14,8 @@ COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
 # backend/app/utils/container_utils.py - Container runtime utilities
 
 import asyncio
+import json
+import shutil
 import subprocess
 from typing import List, Optional
 
@@ -35,6 +37,50 @@ async def validate_container_runtime():
  except FileNotFoundError:
  raise RuntimeError(f"{settings.CONTAINER_RUNTIME} not installed or not in PATH")
 
+async def probe_container_runtime(runtime: str) -> dict:
+ """Read version, rootless mode and storage driver of a runtime with a single info call"""
+ # podman and docker both render the whole info structure as JSON
+ info_format = "json" if runtime == "podman" else "{{json .}}"
+ capabilities = {
+ "runtime": runtime,
+ "available": False,
+ "buildah_available": shutil.which("buildah") is not None,
+ "skopeo_available": shutil.which("skopeo") is not None
+ }
+ 
+ try:
+ process = await asyncio.create_subprocess_exec(
+ runtime, "info", "--format", info_format,
+ stdout=asyncio.subprocess.PIPE,
+ stderr=asyncio.subprocess.PIPE
+ )
+ stdout, stderr = await process.communicate()
+ except FileNotFoundError:
+ capabilities["error"] = f"{runtime} not installed or not in PATH"
+ return capabilities
+ 
+ if process.returncode != 0:
+ capabilities["error"] = stderr.decode('utf-8', errors='replace').strip() or f"{runtime} not working properly"
+ return capabilities
+ 
+ try:
+ info = json.loads(stdout)
+ except json.JSONDecodeError:
+ capabilities["error"] = f"Unexpected {runtime} info output"
+ return capabilities
+ 
+ capabilities["available"] = True
+ if runtime == "podman":
+ capabilities["version"] = info.get("version", {}).get("Version")
+ capabilities["rootless"] = info.get("host", {}).get("security", {}).get("rootless")
+ capabilities["storage_driver"] = info.get("store", {}).get("graphDriverName")
+ else:
+ capabilities["version"] = info.get("ServerVersion")
+ capabilities["rootless"] = any("rootless" in option for option in info.get("SecurityOptions") or [])
+ capabilities["storage_driver"] = info.get("Driver")
+ 
+ return capabilities
+
 async def validate_ansible_playbook():
  """Validate that ansible-playbook is available"""
  try:
@@ -185,3 +231,48 @@ async def build_container_image(
  logs.append(error_msg)
  print(error_msg)
  return False, logs
+
+async def get_image_label(image_name: str, label: str, runtime: Optional[str] = None, root: bool = False) -> Optional[str]:
+ """Read a single label from a local image, None if the image or label is missing
+
+ root inspects root's storage (sudo, non-interactive), where the playbook's become builds land.
+ """
+ try:
+ process = await asyncio.create_subprocess_exec(
+ *(["sudo", "-n"] if root else []), runtime or settings.CONTAINER_RUNTIME, "image", "inspect",
+ "--format", f'{{{{ index .Labels "{label}" }}}}',
+ image_name,
+ stdout=asyncio.subprocess.PIPE,
+ stderr=asyncio.subprocess.PIPE
+ )
+ stdout, _ = await process.communicate()
+ 
+ if process.returncode != 0:
+ return None
+ 
+ value = stdout.decode('utf-8', errors='replace').strip()
+ return value if value and value != "<no value>" else None
+ 
+ except FileNotFoundError:
+ return None
+
+async def get_image_size(image_name: str, runtime: Optional[str] = None) -> Optional[int]:
+ """Size of a local image in bytes, None if the image is missing"""
+ try:
+ process = await asyncio.create_subprocess_exec(
+ runtime or settings.CONTAINER_RUNTIME, "image", "inspect",
+ "--format", "{{.Size}}",
+ image_name,
+ stdout=asyncio.subprocess.PIPE,
+ stderr=asyncio.subprocess.PIPE
+ )
+ stdout, _ = await process.communicate()
+ 
+ if process.returncode != 0:
+ return None
+ 
+ value = stdout.decode('utf-8', errors='replace').strip()
+ return int(value) if value.isdigit() else None
+ 
+ except FileNotFoundError:
+ return None
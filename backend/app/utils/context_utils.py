@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/context_utils.py - Incremental build context staging
+
+import errno
+import fcntl
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+FICLONE = 0x40049409 # ioctl that makes dst share src's extents (btrfs, XFS with reflink, ...)
+GENERATED_CONTEXT_DIR = "context" # ansible-builder's generated build context, kept between runs
+
+class SyncStats(NamedTuple):
+ copied: int
+ reflinked: int
+ hardlinked: int
+ unchanged: int
+ removed: int
+ 
+ @property
+ def changed(self) -> int:
+ return self.copied + self.reflinked + self.hardlinked + self.removed
+
+def is_up_to_date(src: os.stat_result, dst: os.stat_result) -> bool:
+ """Same file (hardlink) or same size and modification time"""
+ if (src.st_dev, src.st_ino) == (dst.st_dev, dst.st_ino):
+ return True
+ return src.st_size == dst.st_size and src.st_mtime_ns == dst.st_mtime_ns
+
+def link_or_copy(src: Path, dst: Path) -> str:
+ """Place src at dst as a reflink, else a hardlink, else a copy; returns the method used"""
+ tmp = dst.with_name(f".{dst.name}.staging")
+ tmp.unlink(missing_ok=True)
+ 
+ try:
+ with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+ fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+ shutil.copystat(src, tmp)
+ method = "reflinked"
+ except OSError:
+ tmp.unlink(missing_ok=True)
+ try:
+ os.link(src, tmp)
+ method = "hardlinked"
+ except OSError as e:
+ if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+ raise
+ shutil.copy2(src, tmp)
+ method = "copied"
+ 
+ # Replace rather than overwrite so a hardlinked source is never written through
+ os.replace(tmp, dst)
+ return method
+
+def sync_tree(src_dir: Path, dst_dir: Path, skip: Iterable[str] = ()) -> SyncStats:
+ """Mirror src_dir into dst_dir touching only changed files; top-level names in skip are left alone"""
+ skip = set(skip)
+ counts = {"copied": 0, "reflinked": 0, "hardlinked": 0, "unchanged": 0, "removed": 0}
+ dst_dir.mkdir(parents=True, exist_ok=True)
+ 
+ wanted = set()
+ for root, dirs, files in os.walk(src_dir):
+ rel_root = Path(root).relative_to(src_dir)
+ if rel_root == Path("."):
+ dirs[:] = [d for d in dirs if d not in skip]
+ files = [f for f in files if f not in skip]
+ 
+ (dst_dir / rel_root).mkdir(exist_ok=True)
+ wanted.add(rel_root)
+ for name in files:
+ rel = rel_root / name
+ wanted.add(rel)
+ src, dst = src_dir / rel, dst_dir / rel
+ 
+ if os.path.islink(src):
+ target = os.readlink(src)
+ if not (os.path.islink(dst) and os.readlink(dst) == target):
+ if os.path.lexists(dst):
+ os.unlink(dst)
+ os.symlink(target, dst)
+ counts["copied"] += 1
+ else:
+ counts["unchanged"] += 1
+ continue
+ 
+ try:
+ if is_up_to_date(src.stat(), dst.stat(follow_symlinks=False)):
+ counts["unchanged"] += 1
+ continue
+ except FileNotFoundError:
+ pass
+ 
+ if dst.is_dir() and not dst.is_symlink():
+ shutil.rmtree(dst)
+ counts[link_or_copy(src, dst)] += 1
+ 
+ # Drop files that no longer exist in the source, deepest paths first
+ for root, dirs, files in os.walk(dst_dir, topdown=False):
+ rel_root = Path(root).relative_to(dst_dir)
+ if rel_root.parts and rel_root.parts[0] in skip:
+ continue
+ for name in files + dirs:
+ rel = rel_root / name
+ if rel_root == Path(".") and name in skip:
+ continue
+ if rel in wanted:
+ continue
+ path = dst_dir / rel
+ if path.is_dir() and not path.is_symlink():
+ shutil.rmtree(path)
+ else:
+ path.unlink()
+ counts["removed"] += 1
+ 
+ return SyncStats(**counts)
+
+def write_if_changed(file_path: Path, content: str) -> bool:
+ """Atomically write content unless the file already holds it"""
+ try:
+ if file_path.read_text() == content:
+ return False
+ except (FileNotFoundError, UnicodeDecodeError):
+ pass
+ 
+ tmp = file_path.with_name(f".{file_path.name}.staging")
+ tmp.write_text(content)
+ os.replace(tmp, file_path)
+ return True
@@ -17,7 +17,11 @@ import os
 import tempfile
 import yaml
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
+
+from app.utils.context_utils import GENERATED_CONTEXT_DIR, SyncStats, sync_tree, write_if_changed
+from app.utils.wheelhouse import WHEELHOUSE_MOUNT, inject_wheelhouse
+from app.utils.collection_cache import COLLECTION_CACHE_MOUNT, use_collection_cache
 
 def cleanup_temp_file(file_path: Optional[str]):
  """Safely clean up a temporary file"""
@@ -77,3 +81,134 @@ def get_file_modification_time(file_path: Path) -> Optional[float]:
  return file_path.stat().st_mtime if file_path.exists() else None
  except Exception:
  return None
+
+def read_env_conf(conf_path: Optional[Path] = None) -> dict:
+ """Read KEY=VALUE pairs from ~/.ansible/conf/env.conf (written by the playbooks)"""
+ conf_path = conf_path or Path.home() / ".ansible" / "conf" / "env.conf"
+ values = {}
+ try:
+ with open(conf_path, 'r') as f:
+ for line in f:
+ key, sep, value = line.strip().partition('=')
+ if sep and key:
+ values[key] = value
+ except FileNotFoundError:
+ pass
+ except Exception as e:
+ print(f"[WARNING] Could not read {conf_path}: {e}")
+ return values
+
+def render_ansible_cfg(template_path: Path) -> str:
+ """Render templates/ansible.cfg.j2 the same way the playbook's template task does"""
+ token = os.getenv('RH_CREDENTIALS_TOKEN') or read_env_conf().get('RH_CREDENTIALS_TOKEN', '')
+ with open(template_path, 'r') as f:
+ content = f.read()
+ return content.replace("{{ lookup('env', 'RH_CREDENTIALS_TOKEN') }}", token)
+
+def pin_image_digest(image: str, digest: str) -> str:
+ """repository@digest reference for a tagged image name"""
+ # Drop the tag (a port in the registry host is not a tag)
+ repository = image.rsplit(":", 1)[0] if ":" in image.rsplit("/", 1)[-1] else image
+ return f"{repository}@{digest}"
+
+def prepare_build_context(
+ env_dir: Path,
+ context_dir: Path,
+ template_path: Path,
+ playbook_dir: Path,
+ use_wheelhouse: bool = False,
+ wheelhouse_offline: bool = False,
+ collection_cache: Optional[Path] = None,
+ base_image_digest: Optional[str] = None
+) -> Tuple[Path, SyncStats, List[str]]:
+ """Stage an environment into its persistent ansible-builder workspace (mirrors the playbook's sync/template tasks)"""
+ # Rendered files are written separately, and ansible-builder's generated context/ survives between runs
+ rendered = {"execution-environment.yml"}
+ if template_path.exists():
+ rendered.add("ansible.cfg")
+ stats = sync_tree(env_dir, context_dir, skip=rendered | {GENERATED_CONTEXT_DIR})
+ 
+ notes = []
+ ee_content = _staged_definition(
+ env_dir, playbook_dir, use_wheelhouse, wheelhouse_offline, collection_cache, base_image_digest, notes
+ )
+ write_if_changed(context_dir / "execution-environment.yml", ee_content)
+ 
+ if template_path.exists():
+ write_if_changed(context_dir / "ansible.cfg", render_ansible_cfg(template_path))
+ 
+ return context_dir, stats, notes
+
+def load_build_definition(
+ env_dir: Path,
+ playbook_dir: Path,
+ use_wheelhouse: bool = False,
+ wheelhouse_offline: bool = False,
+ collection_cache: Optional[Path] = None,
+ base_image_digest: Optional[str] = None
+) -> Optional[dict]:
+ """The execution-environment.yml prepare_build_context would stage, parsed, None if it does not parse"""
+ try:
+ ee_definition = yaml.safe_load(_staged_definition(
+ env_dir, playbook_dir, use_wheelhouse, wheelhouse_offline, collection_cache, base_image_digest, []
+ ))
+ except (OSError, yaml.YAMLError):
+ return None
+ return ee_definition if isinstance(ee_definition, dict) else None
+
+def _staged_definition(
+ env_dir: Path,
+ playbook_dir: Path,
+ use_wheelhouse: bool,
+ wheelhouse_offline: bool,
+ collection_cache: Optional[Path],
+ base_image_digest: Optional[str],
+ notes: List[str]
+) -> str:
+ """Content of the execution-environment.yml staged for a build"""
+ # execution-environment.yml references files relative to the playbook directory
+ ee_content = (env_dir / "execution-environment.yml").read_text().replace("{{ playbook_dir }}", str(playbook_dir))
+ if use_wheelhouse or collection_cache or base_image_digest:
+ ee_content = _render_definition(
+ ee_content, env_dir, use_wheelhouse, wheelhouse_offline, collection_cache, base_image_digest, notes
+ )
+ return ee_content
+
+def _render_definition(
+ ee_content: str,
+ env_dir: Path,
+ use_wheelhouse: bool,
+ wheelhouse_offline: bool,
+ collection_cache: Optional[Path],
+ base_image_digest: Optional[str],
+ notes: List[str]
+) -> str:
+ """Pin the base image and point the build at the shared caches, unchanged if the definition can't take them"""
+ try:
+ ee_definition = yaml.safe_load(ee_content)
+ except yaml.YAMLError as e:
+ notes.append(f"[WARNING] Build caches not used, execution-environment.yml did not parse: {e}")
+ return ee_content
+ if not isinstance(ee_definition, dict):
+ return ee_content
+ 
+ base_image = ((ee_definition.get("images") or {}).get("base_image") or {})
+ name = base_image.get("name") or ""
+ if base_image_digest and name and "@" not in name:
+ base_image["name"] = pin_image_digest(name, base_image_digest)
+ notes.append(f"Base image pinned to {base_image['name']}")
+ 
+ if use_wheelhouse:
+ if inject_wheelhouse(ee_definition, wheelhouse_offline):
+ notes.append(f"pip uses the wheelhouse mounted at {WHEELHOUSE_MOUNT}")
+ else:
+ notes.append("[WARNING] Wheelhouse not used, it needs a version 3 execution-environment.yml")
+ 
+ if collection_cache:
+ missing = use_collection_cache(ee_definition, env_dir, collection_cache)
+ if missing:
+ notes.append(f"[WARNING] Collections install from Galaxy, not in the collection cache: {', '.join(missing)}")
+ else:
+ notes.append(f"Collections install offline from the cache mounted at {COLLECTION_CACHE_MOUNT}")
+ 
+ return yaml.dump(ee_definition, default_flow_style=False, sort_keys=False)
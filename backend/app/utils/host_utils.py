@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/host_utils.py - Build host readiness checks
+
+import asyncio
+import getpass
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional
+
+from app.core.config import settings
+from app.utils.file_utils import read_env_conf
+
+async def check_build_host(container_runtime: str) -> List[str]:
+ """Problems that keep this host from building without the bootstrap playbook, empty when ready"""
+ problems = []
+ 
+ if not await host_bootstrap_current():
+ problems.append(f"host state differs from the last bootstrap ({settings.HOST_BOOTSTRAP_STAMP})")
+ 
+ if not shutil.which(settings.ANSIBLE_BUILDER_PATH):
+ problems.append(f"{settings.ANSIBLE_BUILDER_PATH} not found in PATH")
+ 
+ if not shutil.which(container_runtime):
+ problems.append(f"{container_runtime} not found in PATH")
+ elif not await registry_logged_in(container_runtime, settings.RH_REGISTRY_URL):
+ problems.append(f"{container_runtime} is not logged in to {settings.RH_REGISTRY_URL}")
+ 
+ # The fast path runs ansible-builder as this user, so podman runs rootless
+ if container_runtime == "podman" and os.geteuid() != 0:
+ user = getpass.getuser()
+ for mapping_file in (Path("/etc/subuid"), Path("/etc/subgid")):
+ if not has_subid_range(mapping_file, user):
+ problems.append(f"no {mapping_file} range for {user} (rootless podman)")
+ 
+ if Path(settings.ANSIBLE_CFG_TEMPLATE).exists():
+ if not (os.getenv('RH_CREDENTIALS_TOKEN') or read_env_conf().get('RH_CREDENTIALS_TOKEN')):
+ problems.append("RH_CREDENTIALS_TOKEN missing from the environment and ~/.ansible/conf/env.conf")
+ 
+ return problems
+
+async def host_fingerprint() -> Optional[str]:
+ """Fingerprint of the host state the bootstrap sets up, from scripts/host_fingerprint.sh"""
+ playbook_dir = Path(settings.PLAYBOOK_PATH).parent
+ try:
+ process = await asyncio.create_subprocess_exec(
+ str(playbook_dir / "scripts" / "host_fingerprint.sh"),
+ str(playbook_dir / "tasks" / "bootstrap_host.yml"),
+ settings.RH_REGISTRY_URL,
+ stdout=asyncio.subprocess.PIPE,
+ stderr=asyncio.subprocess.DEVNULL
+ )
+ stdout, _ = await process.communicate()
+ except OSError:
+ return None
+ return stdout.decode().strip() if process.returncode == 0 else None
+
+async def host_bootstrap_current() -> bool:
+ """Check the host still matches the stamp build_environments.yml wrote after its bootstrap"""
+ try:
+ stamp = Path(settings.HOST_BOOTSTRAP_STAMP).expanduser().read_text().strip()
+ except OSError:
+ return False
+ return bool(stamp) and stamp == await host_fingerprint()
+
+async def registry_logged_in(container_runtime: str, registry: str) -> bool:
+ """Check whether the runtime holds credentials for a registry"""
+ if container_runtime == "docker":
+ try:
+ config = json.loads((Path.home() / ".docker" / "config.json").read_text())
+ return registry in config.get("auths", {})
+ except (OSError, ValueError):
+ return False
+ 
+ try:
+ process = await asyncio.create_subprocess_exec(
+ container_runtime, "login", "--get-login", registry,
+ stdout=asyncio.subprocess.DEVNULL,
+ stderr=asyncio.subprocess.DEVNULL
+ )
+ return await process.wait() == 0
+ except (FileNotFoundError, PermissionError):
+ return False
+
+def has_subid_range(mapping_file: Path, user: str) -> bool:
+ """Check /etc/subuid or /etc/subgid for an entry of the user (by name or uid)"""
+ try:
+ with open(mapping_file, 'r') as f:
+ return any(line.split(':', 1)[0] in (user, str(os.getuid())) for line in f)
+ except OSError:
+ return False
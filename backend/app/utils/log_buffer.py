@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/log_buffer.py - Bounded build log storage
+
+from collections import deque
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+class LogBuffer:
+ """Fixed-size ring buffer of log lines addressed by a monotonic sequence number"""
+ 
+ def __init__(self, max_lines: int, lines: Iterable[str] = ()):
+ self._lines = deque(maxlen=max(1, max_lines))
+ self._next_seq = 0
+ self.extend(lines)
+ 
+ @property
+ def first_seq(self) -> int:
+ """Sequence number of the oldest line still held"""
+ return self._next_seq - len(self._lines)
+ 
+ @property
+ def next_seq(self) -> int:
+ """Sequence number the next appended line will get (total lines ever appended)"""
+ return self._next_seq
+ 
+ @property
+ def dropped(self) -> int:
+ """Number of lines evicted from the buffer"""
+ return self.first_seq
+ 
+ def append(self, line: str):
+ """Append one line, evicting the oldest when full"""
+ self._lines.append(line)
+ self._next_seq += 1
+ 
+ def extend(self, lines: Iterable[str]):
+ """Append a batch of lines"""
+ if not isinstance(lines, list):
+ lines = list(lines)
+ self._lines.extend(lines)
+ self._next_seq += len(lines)
+ 
+ def read(self, since: int = 0, limit: Optional[int] = None) -> Tuple[List[str], int]:
+ """Return lines with sequence >= since (at most limit) and the cursor to resume from"""
+ start = max(since, self.first_seq)
+ available = self._next_seq - start
+ count = available if limit is None else max(0, min(limit, available))
+ if count <= 0:
+ return [], min(start, self._next_seq)
+ 
+ skip = start - self.first_seq
+ if skip + count == len(self._lines):
+ # Tail reads are the common case, walk from the right end
+ lines = list(islice(reversed(self._lines), count))
+ lines.reverse()
+ else:
+ lines = list(islice(self._lines, skip, skip + count))
+ 
+ return lines, start + count
+ 
+ def __len__(self) -> int:
+ return len(self._lines)
+ 
+ def __iter__(self):
+ return iter(self._lines)
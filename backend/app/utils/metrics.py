@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/metrics.py - Minimal Prometheus text-format instruments
+
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+ """Escape a label value for the exposition format"""
+ return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+ """{name="value",...} or an empty string for unlabelled series"""
+ pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+ if extra:
+ pairs.append(extra)
+ return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+ """Render a sample value, integers without a trailing .0"""
+ if math.isinf(value):
+ return "+Inf" if value > 0 else "-Inf"
+ return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+ """Base class of a metric family with optional labels"""
+ kind = "untyped"
+ 
+ def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+ self.name = name
+ self.documentation = documentation
+ self.label_names = tuple(labels)
+ 
+ def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+ """Label values in declaration order"""
+ return tuple(str(labels.get(name, "")) for name in self.label_names)
+ 
+ def samples(self) -> Iterator[str]:
+ """Sample lines of every labelled series"""
+ return iter(())
+ 
+ def render(self) -> List[str]:
+ """HELP/TYPE header followed by every sample line"""
+ return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+class Counter(Metric):
+ """Monotonically increasing value"""
+ kind = "counter"
+ 
+ def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+ super().__init__(name, documentation, labels)
+ self._values: Dict[Tuple[str, ...], float] = {} if self.label_names else {(): 0.0}
+ 
+ def inc(self, amount: float = 1.0, **labels):
+ """Add `amount` to the series with the given labels"""
+ key = self._key(labels)
+ self._values[key] = self._values.get(key, 0.0) + amount
+ 
+ def samples(self) -> Iterator[str]:
+ for key, value in sorted(self._values.items()):
+ yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+class Gauge(Metric):
+ """Value that can go up and down"""
+ kind = "gauge"
+ 
+ def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+ super().__init__(name, documentation, labels)
+ self._values: Dict[Tuple[str, ...], float] = {} if self.label_names else {(): 0.0}
+ 
+ def set(self, value: float, **labels):
+ """Replace the value of the series with the given labels"""
+ self._values[self._key(labels)] = value
+ 
+ def samples(self) -> Iterator[str]:
+ for key, value in sorted(self._values.items()):
+ yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+class Histogram(Metric):
+ """Cumulative bucket counts, sum and count of observations"""
+ kind = "histogram"
+ 
+ def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+ super().__init__(name, documentation, labels)
+ self.buckets = tuple(sorted(buckets))
+ self._series: Dict[Tuple[str, ...], list] = {}
+ if not self.label_names:
+ self._new_series(())
+ 
+ def _new_series(self, key: Tuple[str, ...]) -> list:
+ """Per-bucket counts (the last one is +Inf) and the sum of observations"""
+ series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+ return series
+ 
+ def observe(self, value: float, **labels):
+ """Count one observation into its bucket"""
+ key = self._key(labels)
+ series = self._series.get(key) or self._new_series(key)
+ series[0][bisect.bisect_left(self.buckets, value)] += 1
+ series[1] += value
+ 
+ @contextmanager
+ def time(self, **labels):
+ """Observe the duration of the enclosed block, also usable as a decorator"""
+ start = time.perf_counter()
+ try:
+ yield
+ finally:
+ self.observe(time.perf_counter() - start, **labels)
+ 
+ def samples(self) -> Iterator[str]:
+ for key, (counts, total) in sorted(self._series.items()):
+ cumulative = 0
+ for bound, count in zip((*self.buckets, math.inf), counts):
+ cumulative += count
+ le = 'le="' + _format_value(bound) + '"'
+ yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+ yield f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}"
+ yield f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}"
+
+def render_metrics(metrics: Sequence[Metric]) -> str:
+ """Prometheus text exposition format (version 0.0.4)"""
+ return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
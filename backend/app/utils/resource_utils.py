@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/resource_utils.py - Process tree resource accounting
+
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+PROC_DIR = Path("/proc")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+class ProcessStat(NamedTuple):
+ ppid: int
+ start_ticks: int
+ cpu_seconds: float # Own user and system time
+ children_cpu_seconds: float # User and system time of reaped children, rolled up by the kernel on wait()
+ rss_bytes: int
+
+def read_process_table() -> Dict[int, ProcessStat]:
+ """Read parent, start time, CPU time and RSS of every visible process from /proc"""
+ table = {}
+ try:
+ entries = os.listdir(PROC_DIR)
+ except OSError:
+ return table
+ 
+ for entry in entries:
+ if not entry.isdigit():
+ continue
+ try:
+ with open(PROC_DIR / entry / "stat", 'r') as f:
+ data = f.read()
+ except OSError:
+ continue # Process exited while scanning
+ 
+ # The command name is parenthesised and may itself contain spaces or parentheses
+ fields = data[data.rfind(')') + 2:].split()
+ try:
+ table[int(entry)] = ProcessStat(
+ ppid=int(fields[1]),
+ start_ticks=int(fields[19]),
+ cpu_seconds=(int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+ children_cpu_seconds=(int(fields[13]) + int(fields[14])) / CLOCK_TICKS,
+ rss_bytes=int(fields[21]) * PAGE_SIZE
+ )
+ except (IndexError, ValueError):
+ continue
+ 
+ return table
+
+def process_tree(root_pids: Iterable[int], table: Dict[int, ProcessStat]) -> List[int]:
+ """All live descendants of the given roots, roots included"""
+ children: Dict[int, List[int]] = {}
+ for pid, stat in table.items():
+ children.setdefault(stat.ppid, []).append(pid)
+ 
+ tree = []
+ pending = [pid for pid in root_pids if pid in table]
+ seen = set()
+ while pending:
+ pid = pending.pop()
+ if pid in seen:
+ continue
+ seen.add(pid)
+ tree.append(pid)
+ pending.extend(children.get(pid, []))
+ return tree
+
+def read_process_io(pid: int) -> Optional[tuple]:
+ """(read_bytes, write_bytes) of one process, None when not permitted (e.g. sudo'ed children)"""
+ try:
+ with open(PROC_DIR / str(pid) / "io", 'r') as f:
+ values = dict(line.split(': ', 1) for line in f.read().splitlines() if ': ' in line)
+ return int(values.get("read_bytes", 0)), int(values.get("write_bytes", 0))
+ except (OSError, ValueError):
+ return None
+
+def read_memory_available() -> int:
+ """MemAvailable of the host in bytes, 0 when /proc/meminfo can't be read"""
+ try:
+ with open(PROC_DIR / "meminfo", 'r') as f:
+ for line in f:
+ if line.startswith("MemAvailable:"):
+ return int(line.split()[1]) * 1024
+ except (OSError, ValueError, IndexError):
+ pass
+ return 0
+
+class ProcessTreeTracker:
+ """Accumulates CPU time, IO bytes and memory of a process tree across samples"""
+ 
+ def __init__(self):
+ # Last counters of every process seen, keyed by (pid, start time) so reused pids are not merged
+ self._counters: Dict[tuple, tuple] = {}
+ # Parent key of every process seen, to tell whose cumulative children counters cover an exited one
+ self._parents: Dict[tuple, tuple] = {}
+ self._settled = set()
+ self.rss_bytes = 0
+ self.peak_rss_bytes = 0
+ self.process_count = 0
+ self.peak_process_count = 0
+ self.samples = 0
+ 
+ def sample(self, root_pids: Iterable[int], table: Dict[int, ProcessStat]):
+ """Add one sample of the trees under root_pids; exited processes keep their last counters"""
+ tree = process_tree(root_pids, table)
+ rss_bytes = 0
+ for pid in tree:
+ stat = table[pid]
+ key = (pid, stat.start_ticks)
+ previous = self._counters.get(key, (0.0, 0, 0))
+ io = read_process_io(pid)
+ read_bytes, write_bytes = io if io else previous[1:]
+ cpu_seconds = stat.cpu_seconds + stat.children_cpu_seconds
+ self._counters[key] = (max(cpu_seconds, previous[0]), read_bytes, write_bytes)
+ if stat.ppid in table:
+ self._parents[key] = (stat.ppid, table[stat.ppid].start_ticks)
+ rss_bytes += stat.rss_bytes
+ self._drop_reaped(table)
+ 
+ self.rss_bytes = rss_bytes
+ self.peak_rss_bytes = max(self.peak_rss_bytes, rss_bytes)
+ self.process_count = len(tree)
+ self.peak_process_count = max(self.peak_process_count, len(tree))
+ self.samples += 1
+ 
+ def _drop_reaped(self, table: Dict[int, ProcessStat]):
+ """Zero the counters of exited processes a live tracked ancestor has reaped
+ 
+ The kernel adds a reaped child's CPU time and IO bytes to its parent's cumulative
+ counters, so keeping the child's own last values would count them twice.
+ """
+ def alive(key):
+ return key[0] in table and table[key[0]].start_ticks == key[1]
+ 
+ for key in self._parents:
+ if key in self._settled or alive(key):
+ continue
+ self._settled.add(key)
+ ancestor = self._parents[key]
+ while ancestor in self._counters and not alive(ancestor):
+ ancestor = self._parents.get(ancestor)
+ if ancestor in self._counters:
+ self._counters[key] = (0.0, 0, 0)
+ 
+ def snapshot(self) -> dict:
+ """Current totals in the layout of the ResourceUsage model"""
+ return {
+ "cpu_seconds": round(sum(counters[0] for counters in self._counters.values()), 2),
+ "read_bytes": sum(counters[1] for counters in self._counters.values()),
+ "write_bytes": sum(counters[2] for counters in self._counters.values()),
+ "rss_bytes": self.rss_bytes,
+ "peak_rss_bytes": self.peak_rss_bytes,
+ "process_count": self.process_count,
+ "peak_process_count": self.peak_process_count,
+ "samples": self.samples
+ }
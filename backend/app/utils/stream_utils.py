@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/stream_utils.py - Chunked line reader for subprocess output
+
+import asyncio
+import codecs
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+
+READ_CHUNK_BYTES = 256 * 1024
+IDLE_POLL_SECONDS = 1.0
+
+class LineSplitter:
+ """Incrementally split byte chunks into stripped, non-empty text lines"""
+ 
+ def __init__(self):
+ # Multi-byte characters split across chunks are completed by the next chunk
+ self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+ self._partial = ""
+ 
+ def feed(self, chunk: bytes) -> List[str]:
+ """Complete lines contained in `chunk` plus any carried-over partial line"""
+ text = self._partial + self._decoder.decode(chunk)
+ lines = text.split('\n')
+ self._partial = lines.pop()
+ return [line for line in map(str.strip, lines) if line]
+ 
+ def flush(self) -> List[str]:
+ """Remaining text once the stream has ended"""
+ text = (self._partial + self._decoder.decode(b"", final=True)).strip()
+ self._partial = ""
+ return [text] if text else []
+
+async def read_line_batches(
+ stream: asyncio.StreamReader,
+ process: Optional[asyncio.subprocess.Process] = None,
+ chunk_size: int = READ_CHUNK_BYTES
+) -> AsyncIterator[List[str]]:
+ """Yield batches of output lines until EOF, or until `process` exited and the pipe went quiet"""
+ splitter = LineSplitter()
+ while True:
+ if process is None:
+ chunk = await stream.read(chunk_size)
+ else:
+ try:
+ chunk = await asyncio.wait_for(stream.read(chunk_size), timeout=IDLE_POLL_SECONDS)
+ except asyncio.TimeoutError:
+ # Grandchildren may hold the pipe open after the process itself is gone
+ if process.returncode is not None:
+ break
+ continue
+ 
+ if not chunk:
+ break
+ 
+ lines = splitter.feed(chunk)
+ if lines:
+ yield lines
+ 
+ lines = splitter.flush()
+ if lines:
+ yield lines
+
+async def open_pipe_reader(fd: int) -> Tuple[asyncio.StreamReader, asyncio.BaseTransport]:
+ """Wrap the read end of an os.pipe() in a StreamReader, close the transport when done"""
+ loop = asyncio.get_running_loop()
+ reader = asyncio.StreamReader()
+ transport, _ = await loop.connect_read_pipe(
+ lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, 'rb', buffering=0)
+ )
+ return reader, transport
+
+async def _benchmark(total_lines: int = 200000, streams: int = 4):
+ """Compare per-line readline ingestion with the chunked reader on in-memory streams"""
+ import time
+ 
+ sample = (
+ b"  Downloading cryptography-42.0.5-cp39-abi3-manylinux_2_28_x86_64.whl (4.6 MB)\n"
+ b"  \xe2\x94\x81\xe2\x94\x81\xe2\x94\x81 4.6/4.6 MB 51.2 MB/s eta 0:00:00\n"
+ b"STEP 4/9: RUN /output/scripts/install-from-bindep && rm -rf /output/wheels\n"
+ )
+ payload = sample * (total_lines // 3)
+ lines_per_stream = payload.count(b"\n")
+ 
+ def make_stream() -> asyncio.StreamReader:
+ reader = asyncio.StreamReader(limit=2 ** 16)
+ for offset in range(0, len(payload), 4096):
+ reader.feed_data(payload[offset:offset + 4096])
+ reader.feed_eof()
+ return reader
+ 
+ async def readline_loop(reader: asyncio.StreamReader) -> int:
+ count = 0
+ while True:
+ line = await asyncio.wait_for(reader.readline(), timeout=1.0)
+ if not line:
+ return count
+ if line.decode('utf-8', errors='replace').strip():
+ count += 1
+ 
+ async def chunked_loop(reader: asyncio.StreamReader) -> int:
+ count = 0
+ async for lines in read_line_batches(reader):
+ count += len(lines)
+ return count
+ 
+ for name, loop_fn in (("readline + wait_for", readline_loop), ("chunked", chunked_loop)):
+ readers = [make_stream() for _ in range(streams)]
+ start = time.perf_counter()
+ counts = await asyncio.gather(*(loop_fn(reader) for reader in readers))
+ elapsed = time.perf_counter() - start
+ assert all(count == lines_per_stream for count in counts), counts
+ print(f"{name:>20}: {sum(counts)} lines from {streams} streams in {elapsed:.3f}s "
+ f"({sum(counts) / elapsed:,.0f} lines/s)")
+ 
+ # Lines far beyond the StreamReader limit and invalid UTF-8 must not break ingestion
+ reader = asyncio.StreamReader(limit=2 ** 16)
+ reader.feed_data(b"x" * (4 * 2 ** 20) + b"\n\xff\xfe broken utf-8\nlast line without newline")
+ reader.feed_eof()
+ lines = [line async for batch in read_line_batches(reader) for line in batch]
+ assert [len(line) for line in lines[:1]] == [4 * 2 ** 20] and len(lines) == 3, [len(l) for l in lines]
+ print(f"{'long line':>20}: {len(lines[0]):,} characters read as one line")
+
+if __name__ == "__main__":
+ # cd backend && python -m app.utils.stream_utils
+ asyncio.run(_benchmark())
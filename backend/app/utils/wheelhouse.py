@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/app/utils/wheelhouse.py - Shared pip wheelhouse for EE builder stages
+
+import argparse
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import yaml
+
+WHEELHOUSE_MOUNT = "/wheelhouse" # Where builds see the host wheelhouse
+PIP_CACHE_SUBDIR = ".pip-cache" # pip's HTTP and built-wheel cache, written back by every build
+# ansible-builder installs these in the builder stage ahead of the environment's own requirements
+BUILDER_STAGE_REQUIREMENTS = ("bindep", "PyYAML", "packaging")
+
+def wheelhouse_env(offline: bool = False) -> List[str]:
+ """Containerfile ENV lines pointing pip at the mounted wheelhouse"""
+ env = [f"ENV PIP_FIND_LINKS={WHEELHOUSE_MOUNT}", f"ENV PIP_CACHE_DIR={WHEELHOUSE_MOUNT}/{PIP_CACHE_SUBDIR}"]
+ if offline:
+ # Every pip run of the builder stage is then served from the wheelhouse alone, which
+ # collect_requirements fills with BUILDER_STAGE_REQUIREMENTS as well as the environments' own
+ env.append("ENV PIP_NO_INDEX=1")
+ return env
+
+def inject_wheelhouse(ee_definition: dict, offline: bool = False) -> bool:
+ """Prepend the wheelhouse ENV lines to a version 3 definition's builder stage, False if unsupported"""
+ if str(ee_definition.get("version")) != "3":
+ return False
+ 
+ # Only the builder stage, ENV set in the base stage would leak into the final image
+ steps = ee_definition.get("additional_build_steps") or {}
+ existing = steps.get("prepend_builder") or []
+ if isinstance(existing, str):
+ existing = existing.splitlines()
+ steps["prepend_builder"] = [*wheelhouse_env(offline), *existing]
+ ee_definition["additional_build_steps"] = steps
+ return True
+
+def wheelhouse_volume_args(wheelhouse: Path) -> List[str]:
+ """podman build arguments mounting the wheelhouse into every RUN step"""
+ return [f"--volume {wheelhouse}:{WHEELHOUSE_MOUNT}:z"]
+
+def _requirement_lines(lines: Iterable) -> List[str]:
+ requirements = []
+ for line in lines:
+ requirement = str(line).split('#', 1)[0].strip()
+ # Option lines (-r, --index-url, ...) and file references only make sense inside their environment
+ if requirement and not requirement.startswith('-') and requirement not in requirements:
+ requirements.append(requirement)
+ return requirements
+
+def _read_lines(file_path: Path) -> List[str]:
+ try:
+ return file_path.read_text().splitlines()
+ except OSError:
+ return []
+
+def environment_requirements(env_dir: Path) -> List[str]:
+ """Python requirements of one environment: requirements.txt, the definition's list or file, shipped requirements files"""
+ lines = _read_lines(env_dir / "requirements.txt")
+ try:
+ definition = yaml.safe_load((env_dir / "execution-environment.yml").read_text()) or {}
+ python = (definition.get("dependencies") or {}).get("python")
+ if isinstance(python, list):
+ lines.extend(python)
+ elif isinstance(python, str) and python != "requirements.txt":
+ lines.extend(_read_lines(env_dir / python))
+ 
+ for entry in definition.get("additional_build_files") or []:
+ src = env_dir / str((entry or {}).get("src", ""))
+ if src.is_file() and src.suffix == ".txt" and "requirements" in src.name:
+ lines.extend(_read_lines(src))
+ except (OSError, yaml.YAMLError, AttributeError):
+ pass
+ return _requirement_lines(lines)
+
+def collect_requirements(environments_dir: Path) -> Dict[str, List[str]]:
+ """Requirement sets to prefetch: ansible-builder's own builder stage installs, then one per environment"""
+ requirement_sets = {"ansible-builder": list(BUILDER_STAGE_REQUIREMENTS)}
+ for env_dir in sorted(p for p in environments_dir.iterdir() if p.is_dir() and not p.name.startswith('.')):
+ requirements = environment_requirements(env_dir)
+ if requirements:
+ requirement_sets[env_dir.name] = requirements
+ return requirement_sets
+
+def populate_wheelhouse(
+ requirement_sets: Dict[str, Iterable[str]],
+ wheelhouse: Path,
+ python: str = sys.executable,
+ source: Optional[Path] = None
+) -> int:
+ """Build or download wheels for each requirement set into the wheelhouse, offline when a source directory is given"""
+ wheelhouse.mkdir(parents=True, exist_ok=True)
+ 
+ returncode = 0
+ # One pip run per set: versions pinned differently by two environments can't resolve together
+ for name, requirements in requirement_sets.items():
+ requirements = list(requirements)
+ if not requirements:
+ continue
+ with tempfile.NamedTemporaryFile('w', suffix='.txt') as requirements_file:
+ requirements_file.write('\n'.join(requirements) + '\n')
+ requirements_file.flush()
+ 
+ cmd = [python, "-m", "pip", "wheel", "--wheel-dir", str(wheelhouse), "--find-links", str(wheelhouse)]
+ if source:
+ cmd.extend(["--no-index", "--find-links", str(source)])
+ cmd.extend(["-r", requirements_file.name])
+ result = subprocess.run(cmd)
+ if result.returncode != 0:
+ print(f"[WARNING] Could not fetch every wheel for {name} (exit code {result.returncode})")
+ returncode = returncode or result.returncode
+ return returncode
+
+def main(argv: Optional[List[str]] = None) -> int:
+ # cd backend && python -m app.utils.wheelhouse [--source DIR]
+ from app.core.config import settings
+ 
+ parser = argparse.ArgumentParser(description="Pre-populate the build wheelhouse from every environment's requirements")
+ parser.add_argument("--wheelhouse", default=settings.WHEELHOUSE_DIR)
+ parser.add_argument("--python", default=settings.WHEELHOUSE_PYTHON, help="Interpreter matching the EE base images")
+ parser.add_argument("--source", help="Local wheel directory to build from without network access")
+ args = parser.parse_args(argv)
+ 
+ requirement_sets = collect_requirements(Path(settings.ENVIRONMENTS_DIR))
+ print(f"Installation Populating {args.wheelhouse} with {sum(len(r) for r in requirement_sets.values())} requirements "
+ f"in {len(requirement_sets)} sets")
+ return populate_wheelhouse(
+ requirement_sets,
+ Path(args.wheelhouse).expanduser(),
+ args.python,
+ Path(args.source).expanduser() if args.source else None
+ )
+
+if __name__ == "__main__":
+ sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/tests/test_build_plan.py - Shared layer keys and build ordering
+
+from app.utils.build_plan import layer_keys, plan_shared_layers, shared_base_keys, shared_layer_group
+
+BASE_IMAGE = "registry.redhat.io/ansible-automation-platform-24/ee-minimal-rhel9:latest"
+
+def _definition(**overrides) -> dict:
+ definition = {
+ "version": 3,
+ "images": {"base_image": {"name": BASE_IMAGE}},
+ "dependencies": {"ansible_core": {"package_pip": "ansible-core==2.16.3"}, "galaxy": "requirements.yml"},
+ "additional_build_steps": {"prepend_base": ["RUN microdnf -y upgrade"]},
+ "options": {"tags": ["env:latest"]},
+ }
+ definition.update(overrides)
+ return definition
+
+def test_layer_keys_ignore_environment_specific_parts():
+ first = layer_keys(_definition())
+ second = layer_keys(_definition(
+ dependencies={"ansible_core": {"package_pip": "ansible-core==2.16.3"}, "python": "requirements.txt"},
+ options={"tags": ["other:latest"]},
+ additional_build_steps={"prepend_base": "RUN microdnf -y upgrade\n", "append_final": ["RUN echo done"]},
+ ))
+ assert first == second
+
+def test_layer_keys_split_base_and_stage_prefixes():
+ plain = layer_keys(_definition())
+ with_builder_step = layer_keys(_definition(additional_build_steps={
+ "prepend_base": ["RUN microdnf -y upgrade"], "prepend_builder": ["RUN pip install -U pip"]
+ }))
+ other_core = layer_keys(_definition(dependencies={"ansible_core": {"package_pip": "ansible-core==2.17.0"}}))
+ 
+ assert with_builder_step.base == plain.base
+ assert with_builder_step.stage != plain.stage
+ assert other_core.base != plain.base
+
+def test_layer_keys_need_a_base_image():
+ assert layer_keys({"version": 3, "dependencies": {}}) is None
+ legacy = layer_keys({"version": 1, "build_arg_defaults": {"EE_BASE_IMAGE": BASE_IMAGE}})
+ assert legacy is not None
+
+def test_shared_base_keys_only_lists_shared_bases():
+ a = layer_keys(_definition())
+ b = layer_keys(_definition(options={"tags": ["b"]}))
+ c = layer_keys(_definition(images={"base_image": {"name": "quay.io/centos/centos:stream9"}}))
+ assert shared_base_keys({"a": a, "b": b, "c": c, "d": None}) == {"a": a.base, "b": a.base}
+ assert shared_layer_group(a.base) == f"shared-{a.base[:12]}"
+
+def test_plan_shared_layers_waits_on_group_leaders():
+ plain = layer_keys(_definition())
+ builder_step = layer_keys(_definition(additional_build_steps={
+ "prepend_base": ["RUN microdnf -y upgrade"], "prepend_builder": ["RUN pip install -U pip"]
+ }))
+ other_base = layer_keys(_definition(images={"base_image": {"name": "quay.io/centos/centos:stream9"}}))
+ 
+ keys = {"a": plain, "b": builder_step, "c": plain, "d": builder_step, "e": other_base, "f": None}
+ # a builds the base stage; b builds its stage prefixes on top; c and d reuse their leader's layers
+ assert plan_shared_layers(keys) == {"b": "a", "c": "a", "d": "b"}
+
+def test_plan_shared_layers_without_sharing():
+ keys = {"a": layer_keys(_definition()), "b": None}
+ assert plan_shared_layers(keys) == {}
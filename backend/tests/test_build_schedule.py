@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/tests/test_build_schedule.py - Longest-first, memory-aware job scheduling
+
+import asyncio
+
+from app.utils.build_schedule import BuildSlots, JobEstimate, lpt_order, makespan, simulate_schedule
+
+GB = 1024 ** 3
+
+def test_lpt_order_longest_first_memory_breaking_ties():
+ estimates = {
+ "small": JobEstimate(60, 1 * GB),
+ "long": JobEstimate(600, 1 * GB),
+ "wide": JobEstimate(60, 4 * GB),
+ }
+ assert lpt_order(estimates) == ["long", "wide", "small"]
+
+def test_simulate_schedule_starts_longest_jobs_first():
+ estimates = {env: JobEstimate(duration, GB) for env, duration in {"a": 10, "b": 8, "c": 6, "d": 4}.items()}
+ schedule = simulate_schedule(estimates, workers=2)
+ assert {env: job.start_seconds for env, job in schedule.items()} == {"a": 0, "b": 0, "c": 8, "d": 10}
+ assert makespan(schedule) == 14
+
+def test_simulate_schedule_respects_memory_budget():
+ estimates = {
+ "big": JobEstimate(100, 6 * GB),
+ "large": JobEstimate(90, 5 * GB),
+ "small": JobEstimate(30, 2 * GB),
+ }
+ schedule = simulate_schedule(estimates, workers=3, memory_budget_bytes=8 * GB)
+ # large does not fit next to big, small does
+ assert schedule["small"].start_seconds == 0
+ assert schedule["large"].start_seconds == 100
+ assert makespan(schedule) == 190
+
+def test_simulate_schedule_runs_an_oversized_job_alone():
+ estimates = {"huge": JobEstimate(50, 16 * GB), "small": JobEstimate(10, GB)}
+ schedule = simulate_schedule(estimates, workers=2, memory_budget_bytes=8 * GB)
+ assert schedule["huge"].start_seconds == 0
+ assert schedule["small"].start_seconds == 50
+
+def test_simulate_schedule_waits_for_dependencies():
+ estimates = {"leader": JobEstimate(10, GB), "follower": JobEstimate(100, GB), "other": JobEstimate(5, GB)}
+ schedule = simulate_schedule(estimates, workers=2, dependencies={"follower": "leader", "ghost": "missing"})
+ assert schedule["follower"].start_seconds == schedule["leader"].finish_seconds == 10
+ assert schedule["other"].start_seconds == 0
+
+def test_simulate_schedule_empty():
+ assert makespan(simulate_schedule({}, workers=4)) == 0.0
+
+def test_build_slots_admit_in_order_and_release_frees_the_slot():
+ estimates = {"a": JobEstimate(30, GB), "b": JobEstimate(20, GB), "c": JobEstimate(10, GB)}
+ 
+ async def run():
+ slots = BuildSlots(estimates, workers=1, ready=estimates)
+ started = []
+ 
+ async def job(env):
+ await slots.acquire(env)
+ started.append(env)
+ await asyncio.sleep(0)
+ await slots.release(env)
+ 
+ # Tasks start in reverse order, the slots still hand out the longest job first
+ await asyncio.wait_for(asyncio.gather(*(job(env) for env in ["c", "b", "a"])), timeout=5)
+ return started
+ 
+ assert asyncio.run(run()) == ["a", "b", "c"]
+
+def test_build_slots_release_withdraws_a_job_that_never_runs():
+ estimates = {"a": JobEstimate(30, GB), "b": JobEstimate(20, GB)}
+ 
+ async def run():
+ slots = BuildSlots(estimates, workers=1, ready=estimates)
+ # a is expected first; withdrawing it must let b through
+ await slots.release("a")
+ await asyncio.wait_for(slots.acquire("b"), timeout=5)
+ await slots.release("b")
+ 
+ asyncio.run(run())
+
+def test_build_slots_keep_jobs_within_the_memory_budget():
+ estimates = {"big": JobEstimate(100, 6 * GB), "large": JobEstimate(90, 5 * GB), "small": JobEstimate(30, 2 * GB)}
+ 
+ async def run():
+ slots = BuildSlots(estimates, workers=3, memory_budget_bytes=8 * GB, ready=estimates)
+ await slots.acquire("big")
+ await asyncio.wait_for(slots.acquire("small"), timeout=5)
+ large = asyncio.ensure_future(slots.acquire("large"))
+ await asyncio.sleep(0.01)
+ assert not large.done()
+ 
+ await slots.release("big")
+ await asyncio.wait_for(large, timeout=5)
+ 
+ asyncio.run(run())
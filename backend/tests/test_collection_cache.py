@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/tests/test_collection_cache.py - Collection cache version matching and resolution
+
+import pytest
+
+from app.utils.collection_cache import CachedCollection, resolve_from_cache, version_key, version_matches
+
+def _cached(name: str, version: str, **dependencies) -> CachedCollection:
+ file_name = f"{name.replace('.', '-')}-{version}.tar.gz"
+ return CachedCollection(name, version, file_name, {dep.replace('__', '.'): c for dep, c in dependencies.items()})
+
+def test_version_key_orders_semantic_versions():
+ versions = ["1.10.0", "1.2.0", "2.0.0-beta.1", "2.0.0", "1.2"]
+ assert sorted(versions, key=version_key)[2:] == ["1.10.0", "2.0.0-beta.1", "2.0.0"]
+ assert version_key("1.10.0") > version_key("1.9.9")
+ assert version_key("2.0.0-beta.1") < version_key("2.0.0")
+ assert version_key("1.2") == version_key("1.2.0")
+
+@pytest.mark.parametrize("version, requirement, expected", [
+ ("1.2.3", None, True),
+ ("1.2.3", "*", True),
+ ("2.0.0-rc.1", "*", False),
+ ("1.2.3", "1.2.3", True),
+ ("1.2.3", "==1.2.4", False),
+ ("1.2.3", "!=1.2.3", False),
+ ("1.5.0", ">=1.5.0,<2.0.0", True),
+ ("2.0.0", ">=1.5.0,<2.0.0", False),
+ ("1.4.9", ">=1.5.0, <2.0.0", False),
+ ("1.10.0", ">1.9.0", True),
+ ("1.2.3", "<=1.2", False),
+ ("1.2.3", "~1.2", False),
+])
+def test_version_matches(version, requirement, expected):
+ assert version_matches(version, requirement) is expected
+
+def test_resolve_picks_newest_matching_version_and_dependencies():
+ cache = {
+ "community.general": [_cached("community.general", "8.0.0"), _cached("community.general", "7.5.0")],
+ "ansible.posix": [_cached("ansible.posix", "1.5.4")],
+ "ansible.utils": [_cached("ansible.utils", "3.0.0", ansible__posix=">=1.0.0")],
+ }
+ galaxy = {"collections": [
+ {"name": "community.general", "version": "<8.0.0"},
+ "ansible.utils",
+ ]}
+ 
+ picked, missing = resolve_from_cache(galaxy, cache)
+ assert missing == []
+ assert {c.name: c.version for c in picked} == {
+ "community.general": "7.5.0", "ansible.utils": "3.0.0", "ansible.posix": "1.5.4"
+ }
+
+def test_resolve_reports_what_the_cache_cannot_satisfy():
+ cache = {"ansible.posix": [_cached("ansible.posix", "1.5.4")]}
+ galaxy = {"collections": [
+ {"name": "ansible.posix", "version": ">=2.0.0"},
+ {"name": "community.docker"},
+ {"name": "https://github.com/org/repo.git", "type": "git"},
+ ]}
+ 
+ picked, missing = resolve_from_cache(galaxy, cache)
+ assert picked == []
+ assert sorted(missing) == sorted(["ansible.posix:>=2.0.0", "community.docker:*", "https://github.com/org/repo.git"])
+
+def test_resolve_reports_conflicting_constraints():
+ cache = {
+ "ansible.posix": [_cached("ansible.posix", "1.5.4")],
+ "ansible.utils": [_cached("ansible.utils", "3.0.0", ansible__posix=">=2.0.0")],
+ }
+ galaxy = {"collections": ["ansible.posix", "ansible.utils"]}
+ 
+ picked, missing = resolve_from_cache(galaxy, cache)
+ assert missing == ["ansible.posix:>=2.0.0"]
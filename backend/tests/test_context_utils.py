@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/tests/test_context_utils.py - Build context sync and link fallbacks
+
+import errno
+import os
+
+import pytest
+
+from app.utils import context_utils
+from app.utils.context_utils import link_or_copy, sync_tree, write_if_changed
+
+def _no_reflink(*args):
+ raise OSError(errno.EOPNOTSUPP, "reflink not supported")
+
+def _link_error(code):
+ def link(*args):
+ raise OSError(code, os.strerror(code))
+ return link
+
+def test_link_or_copy_falls_back_to_hardlink(tmp_path, monkeypatch):
+ monkeypatch.setattr(context_utils.fcntl, "ioctl", _no_reflink)
+ src, dst = tmp_path / "src.txt", tmp_path / "dst.txt"
+ src.write_text("content")
+ 
+ assert link_or_copy(src, dst) == "hardlinked"
+ assert dst.read_text() == "content"
+ assert os.path.samefile(src, dst)
+ assert not list(tmp_path.glob(".*.staging"))
+
+@pytest.mark.parametrize("code", [errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP])
+def test_link_or_copy_falls_back_to_copy(tmp_path, monkeypatch, code):
+ monkeypatch.setattr(context_utils.fcntl, "ioctl", _no_reflink)
+ monkeypatch.setattr(context_utils.os, "link", _link_error(code))
+ src, dst = tmp_path / "src.txt", tmp_path / "dst.txt"
+ src.write_text("content")
+ os.utime(src, ns=(1_000_000_000, 1_000_000_000))
+ 
+ assert link_or_copy(src, dst) == "copied"
+ assert dst.read_text() == "content"
+ assert not os.path.samefile(src, dst)
+ assert dst.stat().st_mtime_ns == src.stat().st_mtime_ns
+
+def test_link_or_copy_raises_unexpected_link_errors(tmp_path, monkeypatch):
+ monkeypatch.setattr(context_utils.fcntl, "ioctl", _no_reflink)
+ monkeypatch.setattr(context_utils.os, "link", _link_error(errno.EACCES))
+ src, dst = tmp_path / "src.txt", tmp_path / "dst.txt"
+ src.write_text("content")
+ 
+ with pytest.raises(PermissionError):
+ link_or_copy(src, dst)
+ assert not dst.exists()
+
+def test_link_or_copy_replaces_instead_of_writing_through(tmp_path, monkeypatch):
+ monkeypatch.setattr(context_utils.fcntl, "ioctl", _no_reflink)
+ src, dst = tmp_path / "src.txt", tmp_path / "dst.txt"
+ src.write_text("old")
+ link_or_copy(src, dst)
+ 
+ src.unlink()
+ src.write_text("new")
+ link_or_copy(src, dst)
+ assert dst.read_text() == "new"
+
+def test_sync_tree_copies_updates_and_removes(tmp_path):
+ src, dst = tmp_path / "src", tmp_path / "dst"
+ (src / "sub").mkdir(parents=True)
+ (src / "a.txt").write_text("a")
+ (src / "sub" / "b.txt").write_text("b")
+ os.symlink("a.txt", src / "link")
+ 
+ stats = sync_tree(src, dst)
+ assert stats.changed == 3 and stats.unchanged == 0
+ assert (dst / "sub" / "b.txt").read_text() == "b"
+ assert os.readlink(dst / "link") == "a.txt"
+ 
+ stats = sync_tree(src, dst)
+ assert stats.changed == 0 and stats.unchanged == 3
+ 
+ (src / "sub" / "b.txt").unlink()
+ (dst / "stale.txt").write_text("stale")
+ stats = sync_tree(src, dst)
+ assert stats.removed == 2
+ assert not (dst / "stale.txt").exists()
+ assert not (dst / "sub" / "b.txt").exists()
+ assert (dst / "sub").is_dir()
+
+def test_sync_tree_leaves_skipped_top_level_names_alone(tmp_path):
+ src, dst = tmp_path / "src", tmp_path / "dst"
+ (src / "context").mkdir(parents=True)
+ (src / "nested").mkdir()
+ (src / "execution-environment.yml").write_text("source")
+ (src / "context" / "Containerfile").write_text("source")
+ (src / "nested" / "execution-environment.yml").write_text("nested")
+ (dst / "context").mkdir(parents=True)
+ (dst / "context" / "Containerfile").write_text("generated")
+ (dst / "execution-environment.yml").write_text("rendered")
+ 
+ stats = sync_tree(src, dst, skip={"execution-environment.yml", "context"})
+ assert stats.removed == 0
+ assert (dst / "execution-environment.yml").read_text() == "rendered"
+ assert (dst / "context" / "Containerfile").read_text() == "generated"
+ # Only top-level names are skipped
+ assert (dst / "nested" / "execution-environment.yml").read_text() == "nested"
+
+def test_write_if_changed(tmp_path):
+ path = tmp_path / "ansible.cfg"
+ assert write_if_changed(path, "[defaults]\n")
+ mtime = path.stat().st_mtime_ns
+ assert not write_if_changed(path, "[defaults]\n")
+ assert path.stat().st_mtime_ns == mtime
+ assert write_if_changed(path, "[galaxy]\n")
+ assert path.read_text() == "[galaxy]\n"
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/tests/test_file_utils.py - Image reference helpers
+
+import pytest
+
+from app.utils.file_utils import pin_image_digest
+
+DIGEST = "sha256:" + "0" * 64
+
+@pytest.mark.parametrize("image, expected", [
+ ("quay.io/ansible/awx-ee:latest", "quay.io/ansible/awx-ee"),
+ ("quay.io/ansible/awx-ee", "quay.io/ansible/awx-ee"),
+ ("localhost:5000/ns/img:tag", "localhost:5000/ns/img"),
+ ("localhost:5000/ns/img", "localhost:5000/ns/img"),
+ ("registry.example.com:8443/img:1.0", "registry.example.com:8443/img"),
+ ("ubi9:latest", "ubi9"),
+])
+def test_pin_image_digest(image, expected):
+ assert pin_image_digest(image, DIGEST) == f"{expected}@{DIGEST}"
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/tests/test_log_buffer.py - LogBuffer cursors and eviction
+
+from app.utils.log_buffer import LogBuffer
+
+def test_read_returns_cursor_to_resume_from():
+ buffer = LogBuffer(10, ["a", "b", "c"])
+ assert buffer.read() == (["a", "b", "c"], 3)
+ assert buffer.read(since=1) == (["b", "c"], 3)
+ assert buffer.read(since=3) == ([], 3)
+ 
+ buffer.append("d")
+ assert buffer.read(since=3) == (["d"], 4)
+
+def test_read_limit_pages_through_the_buffer():
+ buffer = LogBuffer(10, [str(i) for i in range(5)])
+ lines, cursor = buffer.read(limit=2)
+ assert (lines, cursor) == (["0", "1"], 2)
+ lines, cursor = buffer.read(since=cursor, limit=2)
+ assert (lines, cursor) == (["2", "3"], 4)
+ assert buffer.read(since=cursor, limit=2) == (["4"], 5)
+ assert buffer.read(limit=0) == ([], 0)
+
+def test_eviction_keeps_sequence_numbers():
+ buffer = LogBuffer(3)
+ buffer.extend(str(i) for i in range(5))
+ assert len(buffer) == 3
+ assert list(buffer) == ["2", "3", "4"]
+ assert (buffer.first_seq, buffer.next_seq, buffer.dropped) == (2, 5, 2)
+ assert buffer.read(since=3) == (["3", "4"], 5)
+
+def test_cursor_behind_evicted_lines_skips_ahead():
+ buffer = LogBuffer(2, ["a", "b", "c", "d"])
+ # Lines 0 and 1 are gone, a reader that stopped there resumes at the oldest line held
+ assert buffer.read(since=1) == (["c", "d"], 4)
+ assert buffer.read(since=1, limit=1) == (["c"], 3)
+
+def test_cursor_ahead_of_the_buffer_is_clamped():
+ buffer = LogBuffer(5, ["a", "b"])
+ assert buffer.read(since=10) == ([], 2)
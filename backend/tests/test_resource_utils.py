@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/tests/test_resource_utils.py - Process tree resource accounting
+
+import pytest
+
+from app.utils import resource_utils
+from app.utils.resource_utils import ProcessStat, ProcessTreeTracker, process_tree
+
+MB = 1024 ** 2
+
+@pytest.fixture
+def process_io(monkeypatch):
+ """(read_bytes, write_bytes) reported per pid, missing pids read as not permitted"""
+ io = {}
+ monkeypatch.setattr(resource_utils, "read_process_io", io.get)
+ return io
+
+def test_process_tree_follows_descendants_only():
+ table = {
+ 1: ProcessStat(0, 1, 0.0, 0.0, 0),
+ 100: ProcessStat(1, 10, 0.0, 0.0, 0),
+ 200: ProcessStat(100, 20, 0.0, 0.0, 0),
+ 300: ProcessStat(200, 30, 0.0, 0.0, 0),
+ 400: ProcessStat(1, 40, 0.0, 0.0, 0),
+ }
+ assert sorted(process_tree([100], table)) == [100, 200, 300]
+ assert process_tree([999], table) == []
+
+def test_tracker_sums_the_tree_and_tracks_peaks(process_io):
+ process_io.update({100: (1000, 2000), 200: (10, 20)})
+ tracker = ProcessTreeTracker()
+ tracker.sample([100], {
+ 100: ProcessStat(1, 10, 1.0, 0.0, 50 * MB),
+ 200: ProcessStat(100, 20, 2.5, 0.0, 150 * MB),
+ })
+ tracker.sample([100], {100: ProcessStat(1, 10, 1.5, 2.5, 60 * MB)})
+ 
+ usage = tracker.snapshot()
+ assert usage["cpu_seconds"] == 4.0
+ assert (usage["read_bytes"], usage["write_bytes"]) == (1000, 2000)
+ assert (usage["rss_bytes"], usage["peak_rss_bytes"]) == (60 * MB, 200 * MB)
+ assert (usage["process_count"], usage["peak_process_count"], usage["samples"]) == (1, 2, 2)
+
+def test_tracker_does_not_count_reaped_children_twice(process_io):
+ process_io.update({100: (0, 0), 200: (4096, 8192)})
+ tracker = ProcessTreeTracker()
+ tracker.sample([100], {
+ 100: ProcessStat(1, 10, 1.0, 0.0, MB),
+ 200: ProcessStat(100, 20, 5.0, 0.0, MB),
+ })
+ assert tracker.snapshot()["cpu_seconds"] == 6.0
+ 
+ # The shell reaped the child, the kernel rolled its time into the shell's children counters
+ process_io[100] = (4096, 8192)
+ tracker.sample([100], {100: ProcessStat(1, 10, 1.0, 5.0, MB)})
+ 
+ usage = tracker.snapshot()
+ assert usage["cpu_seconds"] == 6.0
+ assert (usage["read_bytes"], usage["write_bytes"]) == (4096, 8192)
+
+def test_tracker_keeps_counters_of_processes_no_tracked_ancestor_reaped(process_io):
+ process_io.update({100: (0, 0), 200: (10, 20), 300: (30, 40)})
+ tracker = ProcessTreeTracker()
+ tracker.sample([100], {
+ 100: ProcessStat(1, 10, 1.0, 0.0, MB),
+ 200: ProcessStat(100, 20, 2.0, 0.0, MB),
+ 300: ProcessStat(200, 30, 3.0, 0.0, MB),
+ })
+ # The whole tree is gone between samples, nothing tracked survived to reap it
+ tracker.sample([100], {})
+ 
+ usage = tracker.snapshot()
+ assert usage["cpu_seconds"] == 6.0
+ assert (usage["read_bytes"], usage["write_bytes"]) == (40, 60)
+ assert usage["process_count"] == 0
+
+def test_tracker_keeps_reused_pids_apart(process_io):
+ tracker = ProcessTreeTracker()
+ tracker.sample([100], {
+ 100: ProcessStat(1, 10, 1.0, 0.0, MB),
+ 200: ProcessStat(100, 20, 2.0, 0.0, MB),
+ })
+ # pid 200 was reaped and reused by a new child before the next sample
+ tracker.sample([100], {
+ 100: ProcessStat(1, 10, 1.0, 2.0, MB),
+ 200: ProcessStat(100, 90, 0.5, 0.0, MB),
+ })
+ assert tracker.snapshot()["cpu_seconds"] == 3.5
+
+def test_tracker_keeps_last_io_when_unreadable(process_io):
+ process_io[100] = (100, 200)
+ tracker = ProcessTreeTracker()
+ table = {100: ProcessStat(1, 10, 1.0, 0.0, MB)}
+ tracker.sample([100], table)
+ del process_io[100]
+ tracker.sample([100], table)
+ assert (tracker.snapshot()["read_bytes"], tracker.snapshot()["write_bytes"]) == (100, 200)
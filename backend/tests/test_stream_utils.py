@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+User-configurable variables - modify as needed
+"""
+import os
+import getpass
+
+# User configuration
+USER = os.getenv('USER', getpass.getuser())
+USER_EMAIL = os.getenv('USER_EMAIL', f"{USER}@{os.getenv('COMPANY_DOMAIN', 'example.com')}")
+COMPANY_NAME = os.getenv('COMPANY_NAME', 'Your Company')
+COMPANY_DOMAIN = os.getenv('COMPANY_DOMAIN', 'example.com')
+
+# backend/tests/test_stream_utils.py - Line splitting of chunked subprocess output
+
+import asyncio
+
+from app.utils.stream_utils import LineSplitter, read_line_batches
+
+def _read_batches(chunks: list, chunk_size: int) -> list:
+ """Batches read_line_batches yields for a stream fed with `chunks`"""
+ async def collect():
+ reader = asyncio.StreamReader()
+ for chunk in chunks:
+ reader.feed_data(chunk)
+ reader.feed_eof()
+ return [batch async for batch in read_line_batches(reader, chunk_size=chunk_size)]
+ return asyncio.run(collect())
+
+def test_splitter_carries_partial_lines():
+ splitter = LineSplitter()
+ assert splitter.feed(b"first li") == []
+ assert splitter.feed(b"ne\nsecond") == ["first line"]
+ assert splitter.feed(b" line\n\n  \nthird") == ["second line"]
+ assert splitter.flush() == ["third"]
+ assert splitter.flush() == []
+
+def test_splitter_completes_multibyte_characters_across_chunks():
+ splitter = LineSplitter()
+ encoded = "café ━\n".encode()
+ assert splitter.feed(encoded[:4]) == []
+ assert splitter.feed(encoded[4:]) == ["café ━"]
+
+def test_splitter_replaces_invalid_utf8():
+ splitter = LineSplitter()
+ assert splitter.feed(b"\xff\xfe broken\n") == ["�� broken"]
+
+def test_read_line_batches_joins_lines_split_across_reads():
+ batches = _read_batches([b"one\ntw", b"o\nthree\nfo", b"ur"], chunk_size=4)
+ assert [line for batch in batches for line in batch] == ["one", "two", "three", "four"]
+ assert all(batches)
+
+def test_read_line_batches_yields_trailing_partial_line_at_eof():
+ batches = _read_batches([b"no newline at the end"], chunk_size=1024)
+ assert batches == [["no newline at the end"]]
+
+def test_read_line_batches_keeps_lines_longer_than_a_chunk():
+ long_line = b"x" * 10000
+ batches = _read_batches([long_line + b"\nshort\n"], chunk_size=1000)
+ assert [line for batch in batches for line in batch] == [long_line.decode(), "short"]
@@ -0,0 +1,104 @@
+# callback_plugins/ee_builder_events.py - JSON event side channel for the builder API
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+ name: ee_builder_events
+ type: notification
+ short_description: Write task and loop item results as JSON lines for the EE-DE Builder API
+ description:
+ - Active only when EE_BUILDER_EVENTS_FD names an open file descriptor inherited from the API.
+ - Each line is one JSON object, so results are keyed by task, register name and loop item instead of log text.
+ requirements:
+ - EE_BUILDER_EVENTS_FD set by the backend when it runs build_environments.yml
+'''
+
+import json
+import os
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+class CallbackModule(CallbackBase):
+ CALLBACK_VERSION = 2.0
+ CALLBACK_TYPE = 'notification'
+ CALLBACK_NAME = 'ee_builder_events'
+ CALLBACK_NEEDS_ENABLED = False
+ 
+ def __init__(self):
+ super(CallbackModule, self).__init__()
+ self._stream = None
+ fd = os.getenv('EE_BUILDER_EVENTS_FD')
+ if fd:
+ try:
+ self._stream = os.fdopen(int(fd), 'w', buffering=1)
+ except (OSError, ValueError) as e:
+ self._display.warning(f"ee_builder_events disabled: {e}")
+ 
+ def _emit(self, event, **fields):
+ if self._stream is None:
+ return
+ try:
+ self._stream.write(json.dumps({"event": event, "time": time.time(), **fields}, default=str) + "\n")
+ except (OSError, ValueError):
+ # The API stopped listening, keep the playbook running
+ self._stream = None
+ 
+ def _task_fields(self, result):
+ task = result._task
+ return {"task": task.get_name(), "register": task.register, "host": result._host.get_name()}
+ 
+ def _item_event(self, result, status):
+ data = result._result
+ loop_var = data.get('ansible_loop_var', 'item')
+ self._emit(
+ "item",
+ status=status,
+ item=data.get(loop_var),
+ rc=data.get('rc'),
+ changed=data.get('changed', False),
+ msg=data.get('msg') if status == 'failed' else None,
+ stdout_lines=data.get('stdout_lines'),
+ **self._task_fields(result)
+ )
+ 
+ def _task_event(self, result, status):
+ data = result._result
+ self._emit(
+ "task",
+ status=status,
+ rc=data.get('rc'),
+ msg=data.get('msg') if status in ('failed', 'unreachable') else None,
+ **self._task_fields(result)
+ )
+ 
+ def v2_playbook_on_task_start(self, task, is_conditional):
+ self._emit("task_start", task=task.get_name(), register=task.register)
+ 
+ def v2_runner_item_on_ok(self, result):
+ self._item_event(result, 'ok')
+ 
+ def v2_runner_item_on_failed(self, result):
+ self._item_event(result, 'failed')
+ 
+ def v2_runner_item_on_skipped(self, result):
+ self._item_event(result, 'skipped')
+ 
+ def v2_runner_on_ok(self, result):
+ # Loop tasks report their items separately
+ if 'results' not in result._result:
+ self._task_event(result, 'ok')
+ 
+ def v2_runner_on_failed(self, result, ignore_errors=False):
+ if 'results' not in result._result:
+ self._task_event(result, 'ignored' if ignore_errors else 'failed')
+ 
+ def v2_runner_on_unreachable(self, result):
+ self._task_event(result, 'unreachable')
+ 
+ def v2_playbook_on_stats(self, stats):
+ self._emit("stats", failures=sum(stats.failures.values()), ok=sum(stats.ok.values()))
+ if self._stream is not None:
+ self._stream.close()
+ self._stream = None
@@ -103,8 +103,7 @@ const App: React.FC = () => {
     cancelBuild,
     getProgressValue,
     cleanup: cleanupBuilds,
-    startCustomEEBuild,
-    pollBuildStatus
+    startCustomEEBuild
   } = useBuilds();
 
   const {
@@ -1,5 +1,5 @@
 // src/components/BuildManager.tsx
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Button,
   Modal,
@@ -28,7 +28,8 @@ interface BuildManagerProps {
 
 interface BuildStatus {
   build_id: string;
-  status: 'running' | 'completed' | 'failed' | 'cancelled';
+  status: 'queued' | 'running' | 'completed' | 'failed' | 'cancelled' | 'timed_out';
+  timeout_reason?: string;
   environments: string[];
   start_time: string;
   end_time?: string;
@@ -47,40 +48,56 @@ export const BuildManager: React.FC<BuildManagerProps> = ({
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [error, setError] = useState<string>('');
   const [containerRuntime, setContainerRuntime] = useState('podman');
+  // Log offset received so far; a re-opened stream resumes here instead of replaying the log
+  const logCursor = useRef(0);
+  const onBuildCompleteRef = useRef(onBuildComplete);
+  onBuildCompleteRef.current = onBuildComplete;
 
-  // Poll build status every 2 seconds when building
+  // Stream new log lines and status changes while building
   useEffect(() => {
-    let pollInterval: NodeJS.Timeout;
-    
-    if (isBuilding && buildStatus?.build_id) {
-      pollInterval = setInterval(async () => {
-        try {
-          const response = await fetch(`/api/builds/${buildStatus.build_id}/status`);
-          if (response.ok) {
-            const status: BuildStatus = await response.json();
-            setBuildStatus(status);
-            
-            if (status.status === 'completed' || status.status === 'failed') {
-              setIsBuilding(false);
-              if (status.status === 'completed') {
-                onBuildComplete();
-              }
-            }
-          }
-        } catch (error) {
-          console.error('Error polling build status:', error);
-          setError('Error checking build status');
-          setIsBuilding(false);
-        }
-      }, 2000);
+    if (!isBuilding || !buildStatus?.build_id) {
+      return;
     }
 
-    return () => {
-      if (pollInterval) {
-        clearInterval(pollInterval);
+    const eventSource = new EventSource(`/api/builds/${buildStatus.build_id}/stream?since=${logCursor.current}`);
+
+    eventSource.addEventListener('log', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      // Skip lines already shown, a batch may overlap the cursor after a reconnect
+      const lines: string[] = data.lines.slice(Math.max(logCursor.current - data.first, 0));
+      logCursor.current = Math.max(logCursor.current, data.offset);
+      if (lines.length > 0) {
+        setBuildStatus(prev => prev ? { ...prev, logs: [...prev.logs, ...lines] } : prev);
       }
+    });
+
+    eventSource.addEventListener('status', (event) => {
+      const status = JSON.parse((event as MessageEvent).data);
+      setBuildStatus(prev => prev ? {
+        ...prev,
+        status: status.status,
+        return_code: status.return_code,
+        successful_builds: status.successful_builds,
+        failed_builds: status.failed_builds,
+        timeout_reason: status.timeout_reason
+      } : prev);
+
+      if (status.status !== 'queued' && status.status !== 'running') {
+        setIsBuilding(false);
+        if (status.status === 'completed') {
+          onBuildCompleteRef.current();
+        }
+      }
+    });
+
+    eventSource.addEventListener('end', () => {
+      eventSource.close();
+    });
+
+    return () => {
+      eventSource.close();
     };
-  }, [isBuilding, buildStatus?.build_id, onBuildComplete]);
+  }, [isBuilding, buildStatus?.build_id]);
 
   const startBuild = async () => {
     if (selectedEnvironments.length === 0) {
@@ -92,6 +109,7 @@ export const BuildManager: React.FC<BuildManagerProps> = ({
     setIsModalOpen(true);
     setError('');
     setBuildStatus(null);
+    logCursor.current = 0;
 
     try {
       const response = await fetch('/api/builds/start', {
@@ -113,7 +131,7 @@ export const BuildManager: React.FC<BuildManagerProps> = ({
       const result = await response.json();
       setBuildStatus({
         build_id: result.build_id,
-        status: 'running',
+        status: result.status === 'queued' ? 'queued' : 'running',
         environments: result.environments,
         start_time: new Date().toISOString(),
         logs: ['Build started...'],
@@ -148,11 +166,13 @@ export const BuildManager: React.FC<BuildManagerProps> = ({
     if (!buildStatus) return null;
     
     switch (buildStatus.status) {
+      case 'queued':
       case 'running':
         return <Spinner size="sm" />;
       case 'completed':
         return <CheckCircleIcon color="green" />;
       case 'failed':
+      case 'timed_out':
         return <ExclamationCircleIcon color="red" />;
       default:
         return null;
@@ -168,6 +188,7 @@ export const BuildManager: React.FC<BuildManagerProps> = ({
       case 'completed':
         return 'success';
       case 'failed':
+      case 'timed_out':
         return 'danger';
       default:
         return 'info';
@@ -275,6 +296,8 @@ export const BuildManager: React.FC<BuildManagerProps> = ({
                 `Successfully built ${buildStatus.environments.length} environments`}
               {buildStatus.status === 'failed' && 
                 `Build failed with return code ${buildStatus.return_code}`}
+              {buildStatus.status === 'timed_out' && 
+                `Build stopped: ${buildStatus.timeout_reason}`}
               {buildStatus.status === 'running' && 
                 'Build in progress...'}
             </Alert>
@@ -0,0 +1,169 @@
+// src/hooks/useBuilds.ts
+import { useState, useRef, useEffect, useCallback } from 'react';
+import { Build } from '../types';
+
+const STREAM_RETRY_MS = 3000; // Reopen delay once the browser gave up on the event stream
+
+interface StreamStatus {
+  status: string;
+  return_code?: number;
+  timeout_reason?: string;
+  successful_builds: string[];
+  failed_builds: string[];
+  environment_status: Record<string, string>;
+}
+
+export const useBuilds = () => {
+  const [building, setBuilding] = useState(false);
+  const [currentBuild, setCurrentBuild] = useState<Build | null>(null);
+  const [buildDebugInfo, setBuildDebugInfo] = useState<string | null>(null);
+  const [environmentCount, setEnvironmentCount] = useState(0);
+  const [finishedCount, setFinishedCount] = useState(0);
+
+  const eventSourceRef = useRef<EventSource | null>(null);
+  const retryTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
+  // Log offset received so far; a re-opened stream resumes here instead of replaying the log
+  const logCursor = useRef(0);
+
+  const cleanup = useCallback(() => {
+    if (retryTimerRef.current) {
+      clearTimeout(retryTimerRef.current);
+      retryTimerRef.current = null;
+    }
+    eventSourceRef.current?.close();
+    eventSourceRef.current = null;
+  }, []);
+
+  useEffect(() => cleanup, [cleanup]);
+
+  // Follow a build's log lines and status changes over the server-sent event stream
+  const followBuild = useCallback((buildId: string) => {
+    cleanup();
+    const eventSource = new EventSource(`/api/builds/${buildId}/stream?since=${logCursor.current}`);
+    eventSourceRef.current = eventSource;
+
+    eventSource.addEventListener('log', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      // Skip lines already shown, a batch may overlap the cursor after a reconnect
+      const lines: string[] = data.lines.slice(Math.max(logCursor.current - data.first, 0));
+      logCursor.current = Math.max(logCursor.current, data.offset);
+      if (lines.length > 0) {
+        setCurrentBuild(prev => prev ? { ...prev, logs: [...(prev.logs || []), ...lines] } : prev);
+      }
+    });
+
+    eventSource.addEventListener('status', (event) => {
+      const status: StreamStatus = JSON.parse((event as MessageEvent).data);
+      const environments = Object.keys(status.environment_status || {});
+      if (environments.length > 0) {
+        setEnvironmentCount(environments.length);
+      }
+      setFinishedCount(status.successful_builds.length + status.failed_builds.length);
+      setCurrentBuild(prev => prev ? {
+        ...prev,
+        status: status.status,
+        images: status.successful_builds,
+        build_time_seconds: Math.round((Date.now() - new Date(prev.started_at).getTime()) / 1000)
+      } : prev);
+      setBuildDebugInfo(JSON.stringify(status, null, 2));
+
+      if (status.status !== 'queued' && status.status !== 'running') {
+        setBuilding(false);
+      }
+    });
+
+    eventSource.addEventListener('end', () => {
+      cleanup();
+    });
+
+    // The browser reconnects on its own with Last-Event-ID; only a closed stream needs reopening
+    eventSource.onerror = () => {
+      if (eventSource.readyState === EventSource.CLOSED && eventSourceRef.current === eventSource) {
+        retryTimerRef.current = setTimeout(() => followBuild(buildId), STREAM_RETRY_MS);
+      }
+    };
+  }, [cleanup]);
+
+  const resetBuild = (id: string, environments: string[]) => {
+    logCursor.current = 0;
+    setEnvironmentCount(environments.length);
+    setFinishedCount(0);
+    setBuildDebugInfo(null);
+    setCurrentBuild({
+      id,
+      status: 'starting',
+      started_at: new Date().toISOString(),
+      logs: [],
+      images: []
+    } as Build);
+  };
+
+  const startBuild = async (environments: string[]) => {
+    cleanup();
+    setBuilding(true);
+    resetBuild('initializing', environments);
+
+    try {
+      const response = await fetch('/api/builds/start', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ environments, container_runtime: 'podman' })
+      });
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.detail || `HTTP ${response.status}: ${response.statusText}`);
+      }
+
+      const result = await response.json();
+      setCurrentBuild(prev => prev ? { ...prev, id: result.build_id } : prev);
+      followBuild(result.build_id);
+      return result;
+    } catch (error) {
+      setBuilding(false);
+      setCurrentBuild(null);
+      throw error;
+    }
+  };
+
+  // Builds started elsewhere (e.g. a custom EE created with build_immediately)
+  const startCustomEEBuild = (buildId: string, environments: string[] = []) => {
+    setBuilding(true);
+    resetBuild(buildId, environments);
+    followBuild(buildId);
+  };
+
+  const cancelBuild = async () => {
+    if (!currentBuild || currentBuild.id === 'initializing') return;
+
+    try {
+      const response = await fetch(`/api/builds/${currentBuild.id}`, { method: 'DELETE' });
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+      }
+      // The stream delivers the final status and closes itself
+    } catch (error) {
+      console.error('Error cancelling build:', error);
+    }
+  };
+
+  const getProgressValue = () => {
+    if (!currentBuild) return 0;
+    if (currentBuild.status === 'completed') return 100;
+    if (environmentCount === 0) return 0;
+    return Math.round((finishedCount / environmentCount) * 100);
+  };
+
+  return {
+    building,
+    currentBuild,
+    buildDebugInfo,
+    setBuilding,
+    setCurrentBuild,
+    startBuild,
+    cancelBuild,
+    getProgressValue,
+    cleanup,
+    startCustomEEBuild
+  };
+};
@@ -0,0 +1,40 @@
+#!/bin/bash
+# host_fingerprint.sh
+# Prints a fingerprint of the build host state set up by tasks/bootstrap_host.yml:
+# the packages it installs, pip user packages, collections, rootless podman mappings and root's registry login.
+# build_environments.yml and the backend compare it to the bootstrap stamp to skip the bootstrap.
+# Usage: host_fingerprint.sh <bootstrap tasks file> [registry]
+
+set -uo pipefail
+
+BOOTSTRAP_TASKS="${1:?usage: $0 <bootstrap tasks file> [registry]}"
+REGISTRY="${2:-registry.redhat.io}"
+BUILD_USER="${USER:-$(id -un)}"
+# Packages the bootstrap's dnf tasks install; unrelated system updates leave the fingerprint alone
+BOOTSTRAP_PACKAGES=(
+  ansible-core python3 python3-pip python3.11 python3.11-pip git podman rpm-build gcc make
+  libffi-devel openssl-devel python3-devel jq rsync libselinux-python3 redhat-rpm-config
+  ansible-collection-community-general
+)
+
+{
+  echo "== bootstrap"
+  sha256sum < "$BOOTSTRAP_TASKS"
+  echo "== rpm"
+  command -v rpm >/dev/null && rpm -q --qf '%{NAME}-%{VERSION}-%{RELEASE}.%{ARCH}\n' "${BOOTSTRAP_PACKAGES[@]}" 2>&1 | sort
+  echo "== pip"
+  command -v pip3 >/dev/null && pip3 list --user --format=freeze 2>/dev/null | sort
+  echo "== collections"
+  command -v ansible-galaxy >/dev/null && ansible-galaxy collection list community.general 2>/dev/null | grep '^community\.general '
+  echo "== subids"
+  grep -h "^$BUILD_USER:" /etc/subuid /etc/subgid 2>/dev/null
+  stat -c '%n %a %U' /usr/bin/newuidmap /usr/bin/newgidmap 2>/dev/null
+  echo "== registry"
+  # The bootstrap logs in as root and playbook builds run as root, so root's auth file is the one that matters
+  # Without passwordless sudo root's login can't be read, which must not look like a logout
+  if ! sudo -n true 2>/dev/null; then
+    echo "login-unknown-sudo"
+  else
+    sudo -n podman login --get-login "$REGISTRY" 2>/dev/null || echo "not logged in ($?)"
+  fi
+} | sha256sum | cut -d' ' -f1
@@ -0,0 +1,30 @@
+#!/bin/bash
+# pull_base_image.sh
+# Pulls the base image named in an execution-environment.yml unless it is already present.
+# build_environments.yml starts it in the background for every environment while the build contexts
+# are staged, then runs it again right before each build, where it returns at once or waits for the
+# pull still in flight. Pulls of the same image are serialised with a lock file.
+# An image argument (the repository@digest reference the build is pinned to) overrides the file's tag.
+# Usage: pull_base_image.sh <execution-environment.yml> [container runtime] [image]
+
+set -uo pipefail
+
+EE_FILE="${1:?usage: $0 <execution-environment.yml> [container runtime] [image]}"
+RUNTIME="${2:-podman}"
+IMAGE="${3:-}"
+
+# Version 3 images.base_image.name, or the older EE_BASE_IMAGE build arg
+[ -n "$IMAGE" ] || IMAGE=$(grep -A3 -E 'base_image:|EE_BASE_IMAGE:' "$EE_FILE" \
+  | sed -n -E "s/.*(name|EE_BASE_IMAGE):[[:space:]]*['\"]?([^'\"[:space:]]+).*/\2/p" | head -1)
+if [ -z "$IMAGE" ] || [[ "$IMAGE" == *"{{"* ]]; then
+  exit 0
+fi
+
+exec 9>"/tmp/ee-base-image-$(printf '%s' "$IMAGE" | sha256sum | cut -c1-16).lock"
+flock 9
+
+if "$RUNTIME" image inspect "$IMAGE" >/dev/null 2>&1; then
+  exit 0
+fi
+echo "Trying to pull $IMAGE"
+"$RUNTIME" pull --quiet "$IMAGE"